@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+استخراج نتائج قائمة من الطلاب دفعة واحدة (لمسؤولي الأقسام)
+
+يستخدمه الأمر /batch في البوت، ويمكن تشغيله من سطر الأوامر:
+    python batch.py 1124693617 1124693618 --format csv -o results.csv
+    python batch.py --file ids.txt --engine tiered --concurrency 4
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+import engines
+
+DEFAULT_PASSWORD = "123456"
+
+# أعمدة ملف CSV الثابتة؛ تُضاف بينها حقول البيانات الأساسية لكل الطلاب
+CSV_HEAD = ['student_id', 'success', 'error']
+CSV_TAIL = ['المادة', 'التقدير']
+
+
+def parse_ids(text, id_length=0):
+    """
+    تحليل قائمة الطلاب من نص أو ملف
+
+    كل سطر يحتوي على رقم جامعي، أو رقم جامعي وكلمة مرور مفصولين بمسافة أو فاصلة.
+    السطر الذي يحتوي على أكثر من جزأين (أو جزأين بطول الرقم الجامعي) يُعامل
+    كقائمة أرقام جامعية بكلمة المرور الافتراضية.
+
+    Args:
+        text: النص المطلوب تحليله
+        id_length: طول الرقم الجامعي المقبول (0 لتعطيل التحقق)
+
+    Returns:
+        tuple: (قائمة (الرقم الجامعي، كلمة المرور) بدون تكرار، قائمة المدخلات المرفوضة)
+    """
+    entries = []
+    invalid = []
+    seen = set()
+    for line in text.splitlines():
+        parts = line.replace(',', ' ').replace(';', ' ').split()
+        if not parts or parts[0].startswith('#'):
+            continue
+
+        # "رقم كلمة_مرور" ما لم يكن الجزء الثاني رقماً جامعياً بالطول المحدد
+        if len(parts) == 2 and not (id_length and _valid_id(parts[1], id_length)):
+            pairs = [(parts[0], parts[1])]
+        else:
+            pairs = [(part, DEFAULT_PASSWORD) for part in parts]
+
+        for student_id, password in pairs:
+            if not _valid_id(student_id, id_length):
+                invalid.append(student_id)
+            elif student_id not in seen:
+                seen.add(student_id)
+                entries.append((student_id, password))
+    return entries, invalid
+
+
+def _valid_id(value, id_length):
+    return value.isdigit() and (not id_length or len(value) == id_length)
+
+
+async def run_batch(entries, fetch, concurrency=4, on_progress=None):
+    """
+    استخراج نتائج جميع الطلاب بعدد محدود من العمليات المتزامنة
+
+    Args:
+        entries: قائمة (الرقم الجامعي، كلمة المرور)
+        fetch: دالة غير متزامنة fetch(student_id, password) تعيد بيانات الطالب
+        concurrency: أقصى عدد طلاب يُستخرجون في نفس الوقت
+        on_progress: دالة غير متزامنة اختيارية on_progress(done, total, failed)
+
+    Returns:
+        list: بيانات الطلاب بنفس ترتيب القائمة (الأخطاء تُسجل في 'error')
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = [None] * len(entries)
+    done = 0
+    failed = 0
+
+    async def worker(index, student_id, password):
+        nonlocal done, failed
+        async with semaphore:
+            try:
+                data = await fetch(student_id, password)
+            except Exception as e:
+                data = {'success': False, 'error': str(e) or type(e).__name__}
+        data.setdefault('student_id', student_id)
+        results[index] = data
+        done += 1
+        if not data.get('success'):
+            failed += 1
+        if on_progress is not None:
+            await on_progress(done, len(entries), failed)
+
+    await asyncio.gather(*(
+        worker(index, student_id, password)
+        for index, (student_id, password) in enumerate(entries)
+    ))
+    return results
+
+
+def to_csv(results):
+    """
+    تحويل النتائج إلى CSV: صف لكل مادة، مع البيانات الأساسية في كل صف
+
+    Returns:
+        bytes: ملف CSV بترميز UTF-8 مع BOM حتى يعرضه Excel بالعربية
+    """
+    info_keys = []
+    for data in results:
+        for key in data.get('student_info') or {}:
+            if key not in info_keys:
+                info_keys.append(key)
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_HEAD + info_keys + CSV_TAIL)
+    for data in results:
+        head = [data.get('student_id', ''), int(bool(data.get('success'))), data.get('error', '')]
+        info = data.get('student_info') or {}
+        info_row = [info.get(key, '') for key in info_keys]
+        courses = data.get('results') or [{}]
+        for result in courses:
+            writer.writerow(head + info_row + [result.get('المادة', ''), result.get('التقدير', '')])
+    return output.getvalue().encode('utf-8-sig')
+
+
+def to_json(results):
+    """
+    Returns:
+        bytes: قائمة بيانات الطلاب بصيغة JSON
+    """
+    return json.dumps(results, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def summary(results):
+    """
+    Returns:
+        str: ملخص قصير لعدد الطلاب الناجحين والفاشلين
+    """
+    ok = sum(1 for data in results if data.get('success'))
+    return f"✅ {ok} طالب  ❌ {len(results) - ok} فشل  (المجموع {len(results)})"
+
+
+def _engine_fetch(engine, concurrency):
+    """
+    دالة استخراج غير متزامنة للمحرك المطلوب
+
+    Returns:
+        tuple: (fetch، دالة إغلاق غير متزامنة)
+    """
+    if engines.is_async(engine):
+        client = engines.create_engine(engine, max_connections=concurrency)
+        return client.get_all_data, client.close
+
+    threads = ThreadPoolExecutor(max_workers=concurrency)
+
+    def scrape(student_id, password):
+        scraper = engines.create_engine(engine)
+        try:
+            return scraper.get_all_data(student_id, password)
+        finally:
+            scraper.close()
+
+    async def fetch(student_id, password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(threads, scrape, student_id, password)
+
+    async def close():
+        threads.shutdown(wait=False)
+
+    return fetch, close
+
+
+async def _run_cli(args):
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            text = f.read()
+    elif args.ids:
+        text = '\n'.join(args.ids)
+    else:
+        text = sys.stdin.read()
+
+    entries, invalid = parse_ids(text, args.id_length)
+    if invalid:
+        print(f"تم تجاهل {len(invalid)} رقم غير صالح: {', '.join(invalid[:10])}", file=sys.stderr)
+    if not entries:
+        print("لا توجد أرقام جامعية صالحة", file=sys.stderr)
+        return 1
+
+    fetch, close = _engine_fetch(args.engine, args.concurrency)
+    start = time.monotonic()
+
+    async def progress(done, total, failed):
+        print(f"\r{done}/{total} (فشل {failed})", end='', file=sys.stderr, flush=True)
+
+    # رسائل المحركات تذهب إلى stderr حتى لا تختلط بملف الإخراج
+    with redirect_stdout(sys.stderr):
+        try:
+            results = await run_batch(entries, fetch, args.concurrency, progress)
+        finally:
+            await close()
+    print(f"\n{summary(results)} خلال {time.monotonic() - start:.1f} ث", file=sys.stderr)
+
+    payload = to_json(results) if args.format == 'json' else to_csv(results)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(payload)
+    else:
+        sys.stdout.buffer.write(payload)
+    return 0
+
+
+def main():
+    """استخراج دفعة من سطر الأوامر"""
+    parser = argparse.ArgumentParser(description="استخراج نتائج قائمة من الطلاب")
+    parser.add_argument('ids', nargs='*', help="الأرقام الجامعية (أو استخدم --file أو stdin)")
+    parser.add_argument('--file', help="ملف يحتوي على رقم جامعي (وكلمة مرور اختيارية) في كل سطر")
+    parser.add_argument('--engine', choices=list(engines.ENGINES), default=engines.DEFAULT_ENGINE)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--output', '-o', help="ملف الإخراج (افتراضياً stdout)")
+    parser.add_argument('--id-length', type=int, default=0, help="طول الرقم الجامعي المقبول (0 لتعطيل التحقق)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run_cli(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مقارنة سرعة استخراج البيانات من صفحة الطالب: الطريقة السابقة (BeautifulSoup
+كامل مع المرور على جميع الجداول) مقابل محللات page_parser.
+
+مثال:
+    python bench_parser.py                        # صفحات مولدة من mock_portal
+    python bench_parser.py /tmp/student_page.html # صفحة محفوظة من البوابة
+"""
+
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+import page_parser
+from mock_portal import MockPortal
+
+# جداول إضافية متداخلة لمحاكاة صفحات البوابة الكبيرة
+NOISE_TABLE = (
+    "<table><tr><td><table><tr><th>القائمة</th></tr>"
+    + "".join(f"<tr><td><a href='#'>رابط {i}</a></td></tr>" for i in range(20))
+    + "</table></td></tr></table>"
+)
+
+
+def baseline_extract(html):
+    """الطريقة السابقة في scraper_simple: تحليل كامل ثم المرور على كل الجداول مرتين"""
+    soup = BeautifulSoup(html, 'lxml')
+    student_info = {}
+    tables = soup.find_all('table')
+    if tables:
+        for row in tables[0].find_all('tr'):
+            cells = row.find_all('td')
+            if len(cells) == 4:
+                value1 = cells[0].get_text(strip=True)
+                key1 = cells[1].get_text(strip=True)
+                value2 = cells[2].get_text(strip=True)
+                key2 = cells[3].get_text(strip=True)
+                if key1 and value1:
+                    student_info[key1] = value1
+                if key2 and value2:
+                    student_info[key2] = value2
+
+    soup = BeautifulSoup(html, 'lxml')
+    results = []
+    for table in soup.find_all('table'):
+        header_text = ' '.join([h.get_text() for h in table.find_all('th')])
+        if 'Grade' in header_text or 'Course' in header_text or 'التقدير' in header_text:
+            for row in table.find_all('tr')[1:]:
+                cells = row.find_all('td')
+                if len(cells) >= 2:
+                    grade = cells[0].get_text(strip=True)
+                    course = cells[1].get_text(strip=True)
+                    if grade and course:
+                        results.append({'التقدير': grade, 'المادة': course})
+    return student_info, results
+
+
+def backend_extract(backend):
+    def extract(html):
+        page = page_parser.parse(html, backend)
+        return page_parser.extract_student_info(page), page_parser.extract_results(page)
+    return extract
+
+
+def available_backends():
+    backends = []
+    if page_parser.LexborHTMLParser is not None:
+        backends.append('selectolax')
+    if page_parser.lxml is not None:
+        backends.append('lxml')
+    backends.append('bs4')
+    return backends
+
+
+def generated_fixtures():
+    """صفحات بأحجام مختلفة من البوابة الوهمية"""
+    fixtures = {}
+    for courses, noise in ((8, 0), (40, 5), (120, 30)):
+        portal = MockPortal(courses=courses)
+        html = portal.student_page("1124693617")
+        portal.server.server_close()
+        html = html.replace("<h3>", NOISE_TABLE * noise + "<h3>")
+        fixtures[f"{courses} مادة + {noise} جدول إضافي"] = html
+    return fixtures
+
+
+def measure(func, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مقارنة سرعة محللات صفحة الطالب")
+    parser.add_argument('files', nargs='*', help="صفحات HTML محفوظة (اختياري)")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.files:
+        fixtures = {}
+        for path in args.files:
+            with open(path, encoding='utf-8') as f:
+                fixtures[path] = f.read()
+    else:
+        fixtures = generated_fixtures()
+
+    engines = [('baseline', baseline_extract)] + [(b, backend_extract(b)) for b in available_backends()]
+
+    for name, html in fixtures.items():
+        print(f"\n=== {name} ({len(html) / 1024:.0f} KB) ===")
+        expected = baseline_extract(html)
+        base_time = None
+        for engine, func in engines:
+            elapsed = measure(func, html, args.repeat)
+            base_time = base_time or elapsed
+            same = "✓" if func(html) == expected else "✗ مخرجات مختلفة"
+            print(f"{engine:>12}: {elapsed * 1000:8.3f} ms  ({base_time / elapsed:5.1f}x)  {same}")
+
+
+if __name__ == "__main__":
+    main()
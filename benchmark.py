@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء محركات الاستخراج على البوابة الوهمية المحلية (mock_portal.py)
+
+يشغل كل محرك في عملية منفصلة حتى يكون قياس الذاكرة (peak RSS) مستقلاً،
+ويعرض p50/p95/p99 والإنتاجية لكل مستوى من مستويات التزامن.
+
+مثال:
+    python benchmark.py --engines simple,async,bot --requests 100 --concurrency 1,8,32 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+
+from mock_portal import MockPortal
+
+ENGINES = ['simple', 'scraper', 'async', 'selenium', 'selenium-full', 'bot', 'startup']
+
+# وحدات ثقيلة يجب ألا يحملها البوت قبل أن يحتاجها
+HEAVY_MODULES = ['selenium', 'webdriver_manager', 'scraper_selenium']
+
+
+def percentile(values, p):
+    """النسبة المئوية p من قائمة أزمنة"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def student_ids(count):
+    return [str(1000000000 + i) for i in range(count)]
+
+
+def descendants(pid):
+    """معرّفات كل العمليات المتفرعة من pid (chromedriver ثم Chrome وعملياته) عبر /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # الحقل الرابع بعد اسم العملية بين القوسين هو ppid
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    found = []
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def tree_rss_mb(pid):
+    """مجموع VmRSS لكل العمليات المتفرعة من pid بالميغابايت"""
+    total = 0
+    for child in descendants(pid):
+        try:
+            with open(f'/proc/{child}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total / 1024
+
+
+class TreeRssSampler:
+    """أخذ عينات دورية من ذاكرة العمليات الفرعية الحية
+
+    RUSAGE_CHILDREN لا يحسب إلا الأبناء المباشرين بعد انتهائهم، و Chrome ابن
+    لـ chromedriver لا للبنشمارك، فتُجمع الذاكرة من شجرة العمليات أثناء عملها.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            self.peak_mb = max(self.peak_mb, tree_rss_mb(os.getpid()))
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        # عينة أخيرة قبل إغلاق المجمع
+        self.peak_mb = max(self.peak_mb, tree_rss_mb(os.getpid()))
+
+
+def run_threaded(lookup, requests, concurrency):
+    """تشغيل lookup(student_id) بعدد خيوط محدد وإرجاع الأزمنة وعدد الأخطاء"""
+    latencies = []
+    errors = 0
+
+    def timed(student_id):
+        start = time.perf_counter()
+        try:
+            ok = lookup(student_id)
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, ok in pool.map(timed, student_ids(requests)):
+            latencies.append(elapsed)
+            errors += 0 if ok else 1
+    return latencies, errors
+
+
+def bench_engine(name, requests, concurrency):
+    """قياس محرك متزامن من سجل المحركات (engines.py): محرك جديد لكل طلب"""
+    import engines
+
+    def lookup(student_id):
+        scraper = engines.create_engine(name)
+        try:
+            return scraper.get_all_data(student_id, "123456")['success']
+        finally:
+            scraper.close()
+
+    return run_threaded(lookup, requests, concurrency)
+
+
+def bench_async(requests, concurrency):
+    """قياس العميل غير المتزامن: جميع الطلبات على حلقة أحداث واحدة"""
+    from scraper_async import AsyncPortalClient
+
+    async def run_all():
+        client = AsyncPortalClient(max_connections=concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def lookup(student_id):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    ok = (await client.get_all_data(student_id, "123456"))['success']
+                except Exception:
+                    ok = False
+                return time.perf_counter() - start, ok
+
+        try:
+            return await asyncio.gather(*[lookup(i) for i in student_ids(requests)])
+        finally:
+            await client.close()
+
+    results = asyncio.run(run_all())
+    return [r[0] for r in results], sum(1 for r in results if not r[1])
+
+
+def bench_selenium(requests, concurrency, lean=True, page_loads=None, sampler=None):
+    """قياس Selenium بالوضع الخفيف أو بالإعدادات الكاملة السابقة
+
+    يُمرر sampler لقياس ذاكرة chromedriver و Chrome ما دام المجمع مفتوحاً.
+    """
+    import scraper_selenium
+    from driver_pool import DriverPool
+
+    pool = DriverPool(size=concurrency, lean=lean)
+    pool.start()
+    try:
+        def lookup(student_id):
+            scraper = scraper_selenium.StudentPortalScraper(pool=pool)
+            ok = scraper.get_all_data(student_id, "123456")['success']
+            if page_loads is not None and 'page_load' in scraper.timings:
+                page_loads.append(scraper.timings['page_load'])
+            return ok
+
+        if sampler is None:
+            return run_threaded(lookup, requests, concurrency)
+        with sampler:
+            return run_threaded(lookup, requests, concurrency)
+    finally:
+        pool.close()
+
+
+class FakeMessage:
+    """رسالة تلغرام وهمية تحفظ آخر نص أُرسل للمستخدم"""
+
+    message_id = 0
+
+    def __init__(self, text):
+        self.text = text
+        self.final = None
+
+    async def reply_text(self, text, **kwargs):
+        return self
+
+    async def edit_text(self, text, **kwargs):
+        self.final = text
+
+
+async def send_lookup(student_bot, student_id, chat_id):
+    """
+    تمرير رسالة طالب عبر handle_message
+
+    Returns:
+        tuple: (الزمن بالثواني، هل نجح الاستعلام)
+    """
+    message = FakeMessage(student_id)
+    update = SimpleNamespace(
+        message=message,
+        effective_chat=SimpleNamespace(id=chat_id, type='private'),
+        effective_user=SimpleNamespace(id=chat_id),
+    )
+    start = time.perf_counter()
+    await student_bot.handle_message(update, None)
+    elapsed = time.perf_counter() - start
+    return elapsed, bool(message.final) and not message.final.startswith("❌")
+
+
+def bench_bot(requests, concurrency):
+    """قياس مسار handle_message الكامل بتحديثات تلغرام وهمية"""
+    import bot
+
+    student_bot = bot.StudentBot("0:benchmark")
+    # قياس الاستخراج نفسه وليس الذاكرة المؤقتة
+    student_bot.cache.ttl = -1
+    student_bot.executor = bot.ScrapeExecutor(max_workers=concurrency)
+
+    async def lookup(student_id, index, semaphore):
+        async with semaphore:
+            return await send_lookup(student_bot, student_id, index)
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+        student_bot.portal = bot.AsyncPortalClient(max_connections=concurrency)
+        try:
+            return await asyncio.gather(*[
+                lookup(student_id, i, semaphore) for i, student_id in enumerate(student_ids(requests))
+            ])
+        finally:
+            await student_bot.portal.close()
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        student_bot.executor.shutdown()
+        student_bot.pool.close()
+    return [r[0] for r in results], sum(1 for r in results if not r[1])
+
+
+def bench_startup():
+    """
+    قياس التشغيل البارد للبوت: الاستيراد، الإنشاء، وأول استعلامين
+
+    يعمل في عملية جديدة لا يوجد فيها شيء محمّل مسبقاً.
+
+    Returns:
+        dict: الأزمنة بالثواني والوحدات الثقيلة المحملة بعد كل خطوة
+    """
+    report = {'engine': 'startup'}
+
+    start = time.perf_counter()
+    import bot
+    report['import'] = time.perf_counter() - start
+    report['heavy_after_import'] = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    start = time.perf_counter()
+    student_bot = bot.StudentBot("0:benchmark")
+    report['init'] = time.perf_counter() - start
+
+    async def run():
+        application = SimpleNamespace()
+        start = time.perf_counter()
+        await student_bot.post_init(application)
+        report['post_init'] = time.perf_counter() - start
+        try:
+            report['first_lookup'], first_ok = await send_lookup(student_bot, student_ids(1)[0], 1)
+            report['second_lookup'], second_ok = await send_lookup(student_bot, student_ids(2)[1], 2)
+            report['errors'] = [first_ok, second_ok].count(False)
+        finally:
+            await student_bot.post_shutdown(application)
+
+    asyncio.run(run())
+    report['heavy_after_lookup'] = [m for m in HEAVY_MODULES if m in sys.modules]
+    report['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return report
+
+
+def worker(engine, requests, levels):
+    """تشغيل محرك واحد على جميع مستويات التزامن (داخل عملية منفصلة)"""
+    if engine == 'startup':
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            report = bench_startup()
+        print(json.dumps(report))
+        return
+
+    report = {'engine': engine, 'levels': []}
+    children_peak = 0.0
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for concurrency in levels:
+            page_loads = []
+            start = time.perf_counter()
+            if engine in ('simple', 'scraper', 'legacy'):
+                latencies, errors = bench_engine(engine, requests, concurrency)
+            elif engine == 'async':
+                latencies, errors = bench_async(requests, concurrency)
+            elif engine in ('selenium', 'selenium-full'):
+                sampler = TreeRssSampler()
+                latencies, errors = bench_selenium(
+                    requests, concurrency, lean=(engine == 'selenium'),
+                    page_loads=page_loads, sampler=sampler
+                )
+                children_peak = max(children_peak, sampler.peak_mb)
+            else:
+                latencies, errors = bench_bot(requests, concurrency)
+            wall = time.perf_counter() - start
+
+            report['levels'].append({
+                'concurrency': concurrency,
+                'requests': requests,
+                'errors': errors,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'throughput': requests / wall if wall else 0.0,
+                'page_load': sum(page_loads) / len(page_loads) if page_loads else None,
+            })
+
+    # ru_maxrss بالكيلوبايت على Linux؛ ذاكرة Selenium الفعلية في شجرة chromedriver
+    report['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    report['children_rss_mb'] = max(
+        children_peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    )
+    print(json.dumps(report))
+
+
+def print_report(report):
+    print(f"\n=== {report['engine']} ===")
+    if 'error' in report:
+        print(f"❌ فشل التشغيل: {report['error']}")
+        return
+    if report['engine'] == 'startup':
+        for step, label in (('import', 'استيراد bot.py'), ('init', 'إنشاء StudentBot'),
+                            ('post_init', 'post_init'), ('first_lookup', 'أول استعلام'),
+                            ('second_lookup', 'ثاني استعلام')):
+            print(f"{label:<18} {report[step] * 1000:>8.0f}ms")
+        print(f"وحدات ثقيلة بعد الاستيراد: {', '.join(report['heavy_after_import']) or 'لا شيء'}")
+        print(f"وحدات ثقيلة بعد الاستعلام: {', '.join(report['heavy_after_lookup']) or 'لا شيء'}")
+        print(f"استعلامات فاشلة: {report['errors']}  أقصى ذاكرة: {report['peak_rss_mb']:.1f} MB")
+        return
+    print(f"{'تزامن':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'طلب/ث':>8} {'أخطاء':>6}")
+    for level in report['levels']:
+        print(
+            f"{level['concurrency']:>6} {level['p50'] * 1000:>7.0f}ms {level['p95'] * 1000:>7.0f}ms "
+            f"{level['p99'] * 1000:>7.0f}ms {level['throughput']:>8.1f} {level['errors']:>6}"
+        )
+        if level.get('page_load') is not None:
+            print(f"{'':>6} متوسط تحميل صفحة الدخول: {level['page_load'] * 1000:.0f}ms")
+    print(f"أقصى ذاكرة: {report['peak_rss_mb']:.1f} MB (المتصفح والعمليات الفرعية: {report['children_rss_mb']:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء محركات الاستخراج على بوابة وهمية")
+    parser.add_argument('--engines', default='simple,scraper,async,bot', help=f"من: {','.join(ENGINES)}")
+    parser.add_argument('--requests', type=int, default=50, help="عدد الطلبات لكل مستوى تزامن")
+    parser.add_argument('--concurrency', default='1,4,16', help="مستويات التزامن مفصولة بفواصل")
+    parser.add_argument('--latency', type=float, default=0.05, help="تأخير البوابة لكل طلب بالثواني")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--courses', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help="طباعة النتائج بصيغة JSON")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    if args.worker:
+        worker(args.worker, args.requests, levels)
+        return
+
+    portal = MockPortal(
+        latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, courses=args.courses
+    ).start()
+    env = dict(os.environ, PORTAL_URL=portal.url)
+
+    reports = []
+    try:
+        for engine in args.engines.split(','):
+            proc = subprocess.run(
+                [sys.executable, __file__, '--worker', engine,
+                 '--requests', str(args.requests), '--concurrency', args.concurrency],
+                env=env, capture_output=True, text=True
+            )
+            try:
+                report = json.loads(proc.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                lines = proc.stderr.strip().splitlines()
+                report = {'engine': engine, 'error': lines[-1] if lines else f"exit {proc.returncode}"}
+            reports.append(report)
+            if not args.json:
+                print_report(report)
+    finally:
+        portal.stop()
+
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,55 @@
 """
 
 import os
+import sys
+import time
+import uuid
+import signal
+import subprocess
+import asyncio
 import logging
+from cryptography.fernet import Fernet
 from telegram import Update
+from telegram.error import Forbidden
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
-# استخدام selenium scraper
-from scraper_selenium import StudentPortalScraper
-SCRAPER_TYPE = "selenium"
-print("استخدام scraper_selenium")
+import batch
+import engines
+import metrics
+import progress
+import scrape_worker
+
+from engines import tier_stats, record_tier
+from models import format_results_message
+from progress import ProgressiveReply
+from scraper_async import AsyncPortalClient
+from results_cache import ResultsCache, make_key
+from session_store import SessionStore
+from results_watcher import ResultsWatcher, SubscriptionStore
+from results_store import ResultsStore
+from single_flight import SingleFlight
+from portal_guard import PortalGuard, CircuitOpen, PORTAL_FAILURES
+from driver_pool import DriverPool, PoolExhausted
+from scrape_queue import ScrapeExecutor, UserQueueFull
+from job_queue import JobQueue, QueueFull
+from scheduler import FairScheduler, RateLimited, INTERACTIVE, BACKGROUND
+# محرك الاستخراج من الإعدادات (افتراضياً tiered: requests أولاً ثم selenium عند الحاجة)
+SCRAPER_ENGINE = engines.resolve(os.getenv('SCRAPER_ENGINE', 'tiered'))
+if engines.is_async(SCRAPER_ENGINE):
+    # الاستخراج يعمل داخل خيوط المنفذ؛ العميل غير المتزامن يُفعّل عبر ASYNC_HTTP
+    raise ValueError(f"SCRAPER_ENGINE={SCRAPER_ENGINE} غير مدعوم في البوت، استخدم ASYNC_HTTP=1")
+print(f"استخدام محرك الاستخراج {SCRAPER_ENGINE}")
+# المحركات التي يسبقها المسار غير المتزامن (aiohttp) في حلقة الأحداث
+ASYNC_FIRST_ENGINES = ('tiered', 'simple')
+# المحركات التي تستخدم مجمع المتصفحات
+BROWSER_ENGINES = ('tiered', 'selenium')
+
+# وضع العمال: البوت يضيف الاستعلامات إلى طابور دائم وتنفذها عمليات منفصلة
+JOB_QUEUE = os.getenv('JOB_QUEUE', '0') == '1'
+# عدد عمليات العمال التي يشغلها البوت (0 إذا كانت تعمل كخدمة مستقلة عبر scrape_worker.py)
+SCRAPE_WORKERS = int(os.getenv('SCRAPE_WORKERS', '2'))
+# المدة بين محاولتين لتسليم ردود المهام التي اكتملت بعد إعادة تشغيل البوت
+ORPHAN_DELIVERY_INTERVAL = 5
 
 # إعداد السجل
 logging.basicConfig(
@@ -22,12 +63,196 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# طول الرقم الجامعي المقبول (مثال: 1124693617)
+STUDENT_ID_LENGTH = int(os.getenv('STUDENT_ID_LENGTH', '10'))
+
+# أمر /batch: من يسمح لهم (معرفات تلغرام مفصولة بفواصل، فارغ لتعطيل الأمر) وحدود الدفعة
+BATCH_ADMINS = {int(uid) for uid in os.getenv('BATCH_ADMINS', '').replace(' ', '').split(',') if uid}
+BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', '200'))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '3'))
+# أقل مدة بين تعديلات رسالة التقدم (حدود تلغرام لتعديل الرسائل)
+BATCH_PROGRESS_INTERVAL = 3
+
+# متابعة النتائج: المدة بين فحصين لنفس الطالب (0 لتعطيل الميزة) وأقصى عدد طلاب لكل محادثة
+WATCH_INTERVAL = int(os.getenv('WATCH_INTERVAL', '1800'))
+WATCH_MAX_PER_CHAT = int(os.getenv('WATCH_MAX_PER_CHAT', '3'))
+
+NO_HISTORY = "لا يوجد سجل محفوظ لهذا الطالب بهذه البيانات. استعلم عن نتائجك أولاً."
+
+# أنواع التحديثات التي يعالجها البوت فعلياً
+ALLOWED_UPDATES = [Update.MESSAGE]
+
+INVALID_FORMAT = (
+    "❌ تنسيق خاطئ!\n\n"
+    "أرسل رقمك الجامعي فقط، أو:\n"
+    "`رقم_جامعي كلمة_المرور`"
+)
+
+
+def parse_lookup(text):
+    """
+    تحليل رسالة الطالب والتحقق منها قبل أي اتصال بالبوابة
+    
+    Args:
+        text: نص الرسالة
+    
+    Returns:
+        tuple: (الرقم الجامعي، كلمة المرور، رسالة الخطأ أو None)
+    """
+    parts = text.split()
+    
+    if len(parts) == 1:
+        # رقم جامعي فقط
+        student_id, password = parts[0], "123456"
+    elif len(parts) == 2:
+        # رقم جامعي وكلمة مرور
+        student_id, password = parts
+    else:
+        return None, None, INVALID_FORMAT
+    
+    # التحقق من صحة الرقم الجامعي
+    if not student_id.isdigit():
+        return None, None, INVALID_FORMAT
+    if STUDENT_ID_LENGTH and len(student_id) != STUDENT_ID_LENGTH:
+        return None, None, f"❌ الرقم الجامعي يجب أن يتكون من {STUDENT_ID_LENGTH} أرقام!"
+    
+    return student_id, password, None
+
+
+def requester_id(update):
+    """
+    معرف المستخدم صاحب الطلب (طابور المنفذ لكل مستخدم وليس لكل محادثة، حتى لا
+    يتشارك أعضاء المجموعة طابوراً واحداً)
+    """
+    user = update.effective_user
+    return user.id if user is not None else update.effective_chat.id
+
+
+def format_time(timestamp):
+    """تنسيق وقت محفوظ في قاعدة البيانات"""
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+def format_changes(changes):
+    """تنسيق قائمة التغييرات من ResultsStore"""
+    lines = []
+    for change in changes:
+        if change['التقدير السابق']:
+            lines.append(f"• {change['المادة']}: {change['التقدير السابق']} ← *{change['التقدير']}*")
+        else:
+            lines.append(f"• {change['المادة']}: *{change['التقدير']}* (جديد)")
+    return "\n".join(lines) + "\n"
+
+
 class StudentBot:
     """فئة بوت التلغرام"""
     
     def __init__(self, token):
         self.token = token
-        logger.info(f"تم تهيئة البوت باستخدام {SCRAPER_TYPE} scraper")
+        # مجمع متصفحات جاهزة بدلاً من تشغيل Chrome لكل رسالة
+        self.pool = DriverPool(size=int(os.getenv('DRIVER_POOL_SIZE', '2')))
+        # تنفيذ الاستخراج في خيوط منفصلة حتى لا تتوقف حلقة الأحداث
+        self.executor = ScrapeExecutor(
+            max_workers=int(os.getenv('SCRAPE_CONCURRENCY', str(self.pool.size))),
+            max_pending_per_user=int(os.getenv('MAX_PENDING_PER_USER', '3'))
+        )
+        # ذاكرة مؤقتة للنتائج حتى لا يتكرر تسجيل الدخول لنفس الطالب
+        self.cache = ResultsCache(
+            ttl=int(os.getenv('CACHE_TTL', '300')),
+            max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '1000')),
+            max_bytes=int(os.getenv('CACHE_MAX_MB', '16')) * 1024 * 1024,
+            db_path=os.getenv('CACHE_DB_PATH') or None
+        )
+        # قاعدة بيانات دائمة لكل النتائج المستخرجة مع سجل التغييرات
+        self.store = ResultsStore(os.getenv('RESULTS_DB_PATH', 'results.db'))
+        # جلسات البوابة المشفرة لتجاوز تسجيل الدخول في الاستعلامات المتكررة
+        self.sessions = SessionStore(
+            key=os.getenv('SESSION_KEY') or None,
+            ttl=int(os.getenv('SESSION_TTL', '1800')),
+            db_path=os.getenv('SESSION_DB_PATH') or None
+        )
+        # متابعة نتائج المشتركين في الخلفية بدلاً من الاستعلام اليدوي المتكرر
+        self.watcher = None
+        if WATCH_INTERVAL > 0:
+            self.watcher = ResultsWatcher(
+                SubscriptionStore(
+                    db_path=os.getenv('WATCH_DB_PATH', 'subscriptions.db'),
+                    key=os.getenv('SESSION_KEY') or None
+                ),
+                fetch=self.refresh_data,
+                notify=self.notify_change,
+                interval=WATCH_INTERVAL,
+                rate=float(os.getenv('WATCH_RATE', '0.5'))
+            )
+        self.application = None
+        # الطلبات المتزامنة لنفس الطالب تنتظر عملية استخراج واحدة
+        self.inflight = SingleFlight()
+        # عميل HTTP غير متزامن للمسار السريع (يُنشأ داخل حلقة الأحداث في post_init)
+        self.portal = None
+        # حارس مشترك يحد من الضغط على البوابة ويوقف الطلبات عند تعطلها
+        self.guard = PortalGuard(
+            max_concurrent=int(os.getenv('PORTAL_MAX_SESSIONS', '8')),
+            rate=float(os.getenv('PORTAL_RATE', '5')),
+            burst=int(os.getenv('PORTAL_BURST', '10')),
+            failure_threshold=int(os.getenv('CIRCUIT_FAILURES', '5')),
+            reset_timeout=int(os.getenv('CIRCUIT_RESET', '30'))
+        )
+        # جدولة عادلة أمام الاستخراج: حد لكل محادثة، واستعلامات المستخدمين قبل تحديثات الخلفية
+        self.scheduler = FairScheduler(
+            max_concurrent=int(os.getenv('SCHED_MAX_CONCURRENT') or os.getenv('PORTAL_MAX_SESSIONS', '8')),
+            user_rate=float(os.getenv('USER_RATE', '6')) / 60,
+            user_burst=int(os.getenv('USER_BURST', '3')),
+            background_share=float(os.getenv('BACKGROUND_SHARE', '0.5'))
+        )
+        # طابور المهام لعمليات العمال (اختياري)
+        self.jobs = None
+        self.workers = None
+        self.delivery_task = None
+        # معرف هذا التشغيل: ردود منتظريه يسلمها بنفسه، والباقي يُسلم كردود يتيمة
+        self.boot_id = uuid.uuid4().hex
+        if JOB_QUEUE:
+            self.job_key = os.getenv('SESSION_KEY') or Fernet.generate_key().decode()
+            if not os.getenv('SESSION_KEY'):
+                logger.warning(
+                    "لم يتم تحديد SESSION_KEY، لا يمكن تشغيل عمال مستقلين "
+                    "أو استكمال المهام المعلقة بعد إعادة التشغيل"
+                )
+            self.jobs = JobQueue(
+                os.getenv('JOB_DB_PATH', 'jobs.db'),
+                key=self.job_key,
+                lease=int(os.getenv('JOB_LEASE', '180')),
+                max_pending=int(os.getenv('JOB_QUEUE_MAX', '500')),
+                max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+            )
+        self.metrics_runner = None
+        self._register_gauges()
+        logger.info(f"تم تهيئة البوت باستخدام محرك {SCRAPER_ENGINE}")
+    
+    def _register_gauges(self):
+        """مقاييس حالة المكونات المشتركة تُقرأ عند كل طلب /metrics"""
+        metrics.gauge_callback('scrape_running', 'Scrapes running in the executor',
+                               lambda: self.executor.stats()['running'])
+        metrics.gauge_callback('scrape_queued', 'Scrapes waiting for a worker',
+                               lambda: self.executor.stats()['queued'])
+        metrics.gauge_callback('driver_pool_in_use', 'Browsers currently checked out',
+                               lambda: self.pool.stats()['in_use'])
+        metrics.gauge_callback('driver_pool_waiting', 'Threads waiting for a browser',
+                               lambda: self.pool.stats()['waiting'])
+        metrics.gauge_callback('portal_in_flight', 'Sessions currently admitted to the portal',
+                               lambda: self.guard.stats()['in_flight'])
+        metrics.gauge_callback('portal_circuit_open', 'Whether the portal circuit breaker is open',
+                               lambda: self.guard.stats()['state'] != 'closed')
+        metrics.gauge_callback('results_cache_hit_rate', 'Results cache hit rate',
+                               lambda: self.cache.stats()['hit_rate'])
+        metrics.gauge_callback('scheduler_waiting_interactive', 'User lookups waiting for a scrape slot',
+                               lambda: self.scheduler.stats()['waiting']['interactive'])
+        metrics.gauge_callback('scheduler_waiting_background', 'Background refreshes waiting for a scrape slot',
+                               lambda: self.scheduler.stats()['waiting']['background'])
+        if self.jobs is not None:
+            metrics.gauge_callback('job_queue_pending', 'Jobs waiting for a worker process',
+                                   lambda: self.jobs.stats()['pending'])
+            metrics.gauge_callback('job_queue_running', 'Jobs claimed by worker processes',
+                                   lambda: self.jobs.stats()['running'])
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """معالج أمر /start"""
@@ -71,6 +296,12 @@ class StudentBot:
 *الأوامر:*
 /start - بدء البوت
 /get_results - الحصول على النتائج
+/refresh - تحديث النتائج من البوابة مباشرة
+/history - سجل تقديراتك المحفوظة
+/changes - آخر ما تغير في نتائجك
+/subscribe - إشعار تلقائي عند ظهور نتائج جديدة
+/unsubscribe - إلغاء المتابعة
+/batch - نتائج قائمة من الطلاب كملف CSV/JSON (للمسؤولين)
 /help - عرض المساعدة
 
 *ملاحظة:*
@@ -94,84 +325,706 @@ class StudentBot:
         """معالج الرسائل النصية"""
         text = update.message.text.strip()
         
-        # تجاهل الرسائل الفارغة
-        if not text:
+        # التحقق من الرسالة قبل أي اتصال بالشبكة
+        student_id, password, error = parse_lookup(text)
+        if error:
+            # في المجموعات نتجاهل كل رسالة ليست رقماً جامعياً صحيحاً (رقم هاتف أو
+            # سنة أو غيرها) بدلاً من الرد عليها، ونرد فقط في المحادثات الخاصة
+            if update.effective_chat.type == 'private':
+                await update.message.reply_text(error, parse_mode='Markdown')
             return
         
         # إرسال رسالة انتظار
         wait_msg = await update.message.reply_text("⏳ جاري تسجيل الدخول واستخراج النتائج...\nقد يستغرق هذا بضع ثوانٍ...")
         
-        scraper = None
+        await self.lookup(update, wait_msg, student_id, password)
+    
+    async def refresh_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """معالج أمر /refresh لتجاهل الذاكرة المؤقتة واستخراج النتائج من جديد"""
+        student_id, password, error = parse_lookup(' '.join(context.args or []))
+        if error:
+            await update.message.reply_text(
+                "❌ الاستخدام: `/refresh رقم_جامعي [كلمة_المرور]`",
+                parse_mode='Markdown'
+            )
+            return
+        
+        wait_msg = await update.message.reply_text("🔄 جاري تحديث النتائج من البوابة...")
+        await self.lookup(update, wait_msg, student_id, password, force=True)
+    
+    async def subscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """معالج أمر /subscribe لمتابعة نتائج طالب وإرسال إشعار عند تغيرها"""
+        if self.watcher is None:
+            await update.message.reply_text("⚠️ متابعة النتائج غير مفعلة حالياً")
+            return
+        
+        student_id, password, error = parse_lookup(' '.join(context.args or []))
+        if error:
+            await update.message.reply_text(
+                "❌ الاستخدام: `/subscribe رقم_جامعي [كلمة_المرور]`",
+                parse_mode='Markdown'
+            )
+            return
+        
+        chat_id = update.effective_chat.id
+        subscribed = await asyncio.to_thread(self.watcher.store.for_chat, chat_id)
+        if student_id not in subscribed and len(subscribed) >= WATCH_MAX_PER_CHAT:
+            await update.message.reply_text(
+                f"❌ الحد الأقصى {WATCH_MAX_PER_CHAT} طلاب لكل محادثة. استخدم /unsubscribe أولاً"
+            )
+            return
+        
+        wait_msg = await update.message.reply_text("⏳ جاري التحقق من بيانات الطالب...")
+        try:
+            # التأكد من صحة بيانات الدخول وأخذ لقطة النتائج الحالية كأساس للمقارنة
+            data = await self.get_data(chat_id, student_id, password, user_id=requester_id(update))
+        except RateLimited as e:
+            await wait_msg.edit_text(f"⏳ {str(e)}")
+            return
+        except Exception as e:
+            logger.warning(f"تعذر الاشتراك للطالب {student_id}: {e!r}")
+            await wait_msg.edit_text("⚠️ تعذر الوصول إلى البوابة حالياً، حاول الاشتراك لاحقاً")
+            return
+        
+        if not data['success']:
+            await wait_msg.edit_text(format_results_message(data), parse_mode='Markdown')
+            return
+        
+        await asyncio.to_thread(self.watcher.subscribe, chat_id, student_id, password, data)
+        await wait_msg.edit_text(
+            f"🔔 تم الاشتراك في متابعة نتائج الطالب {student_id}.\n"
+            "سيصلك إشعار تلقائياً عند ظهور نتائج جديدة، لا حاجة للاستعلام المتكرر.\n"
+            "لإلغاء المتابعة: /unsubscribe"
+        )
+    
+    async def unsubscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """معالج أمر /unsubscribe لإلغاء متابعة طالب أو جميع الطلاب"""
+        if self.watcher is None:
+            await update.message.reply_text("⚠️ متابعة النتائج غير مفعلة حالياً")
+            return
+        
+        student_id = context.args[0] if context.args else None
+        removed = await asyncio.to_thread(self.watcher.store.remove, update.effective_chat.id, student_id)
+        if removed:
+            await update.message.reply_text(f"🔕 تم إلغاء متابعة {removed} طالب")
+        else:
+            await update.message.reply_text("لا توجد متابعة لإلغائها")
+    
+    async def notify_change(self, subscription, data):
+        """إرسال إشعار بالنتائج الجديدة إلى المحادثة المشتركة"""
+        changes = await asyncio.to_thread(self.store.changes, subscription.student_id)
+        try:
+            await self.application.bot.send_message(
+                chat_id=subscription.chat_id,
+                text=f"🔔 *نتائج جديدة للطالب {subscription.student_id}*\n\n"
+                     + format_changes(changes) + "\n"
+                     + format_results_message(data),
+                parse_mode='Markdown'
+            )
+        except Forbidden:
+            # المستخدم حظر البوت: لا فائدة من متابعة الفحص
+            logger.info(f"إلغاء اشتراكات المحادثة {subscription.chat_id} بعد حظر البوت")
+            await asyncio.to_thread(self.watcher.store.remove, subscription.chat_id)
+    
+    async def lookup(self, update, wait_msg, student_id, password, force=False):
+        """
+        إرسال نتائج الطالب من الذاكرة المؤقتة أو باستخراجها من البوابة
+        
+        Args:
+            update: التحديث الوارد من تلغرام
+            wait_msg: رسالة الانتظار التي سيتم تعديلها بالنتيجة
+            student_id: الرقم الجامعي
+            password: كلمة المرور
+            force: تجاهل الذاكرة المؤقتة
+        """
+        trace = metrics.start_trace(student_id=student_id, force=force)
+        outcome = 'error'
+        # رسالة الانتظار تعرض المراحل المكتملة (تسجيل الدخول ثم البيانات الأساسية) حتى تصل النتائج
+        reply = ProgressiveReply(wait_msg)
+        
+        async def on_position(position):
+            await reply.edit(f"⏳ طلبك في الطابور، ترتيبك: {position}\nسيتم تحديث هذه الرسالة تلقائياً...")
+        
         try:
-            # تحليل الرسالة
-            parts = text.split()
+            try:
+                with progress.listen(reply):
+                    data = await self.get_data(
+                        update.effective_chat.id, student_id, password, force,
+                        reply_to=wait_msg.message_id, on_position=on_position,
+                        user_id=requester_id(update)
+                    )
+            finally:
+                # لا يصل تعديل تدريجي بعد النتيجة النهائية
+                await reply.close()
+            outcome = trace.fields.get('source') or (data.get('tier', 'ok') if data['success'] else 'login_failed')
+            with metrics.span('format'):
+                message = format_results_message(data)
+            with metrics.span('telegram_send'):
+                await wait_msg.edit_text(message, parse_mode='Markdown')
             
-            if len(parts) == 1:
-                # رقم جامعي فقط
-                student_id = parts[0]
-                password = "123456"
-            elif len(parts) == 2:
-                # رقم جامعي وكلمة مرور
-                student_id = parts[0]
-                password = parts[1]
-            else:
+            metrics.annotate(progress_edits=reply.edits)
+            logger.info(f"تم إرسال النتائج للطالب: {student_id}")
+            
+        except (UserQueueFull, PoolExhausted, QueueFull, RateLimited) as e:
+            outcome = type(e).__name__
+            await wait_msg.edit_text(f"⏳ {str(e)}")
+        except (CircuitOpen, *PORTAL_FAILURES) as e:
+            outcome = type(e).__name__
+            logger.warning(f"البوابة غير متاحة للطالب {student_id}: {e!r}")
+            # عرض آخر نتيجة محفوظة حتى لو انتهت صلاحيتها
+            stale = self.stale_data(student_id, password)
+            if stale is not None:
                 await wait_msg.edit_text(
-                    "❌ تنسيق خاطئ!\n\n"
-                    "أرسل رقمك الجامعي فقط، أو:\n"
-                    "`رقم_جامعي كلمة_المرور`",
+                    "⚠️ بوابة الجامعة لا تستجيب حالياً، هذه آخر نتائج محفوظة:\n\n"
+                    + format_results_message(stale),
                     parse_mode='Markdown'
                 )
-                return
-            
-            # التحقق من صحة الرقم الجامعي
-            if not student_id.isdigit():
+            else:
                 await wait_msg.edit_text(
-                    "❌ الرقم الجامعي يجب أن يحتوي على أرقام فقط!"
+                    "⚠️ بوابة الجامعة لا تستجيب حالياً بسبب الضغط.\n"
+                    "الرجاء المحاولة مرة أخرى بعد دقائق."
                 )
-                return
-            
-            logger.info(f"محاولة استخراج بيانات الطالب: {student_id}")
-            
-            # استخراج البيانات
-            scraper = StudentPortalScraper()
-            data = scraper.get_all_data(student_id, password)
-            
-            # تنسيق وإرسال النتيجة
-            message = scraper.format_results_message(data)
-            await wait_msg.edit_text(message, parse_mode='Markdown')
-            
-            logger.info(f"تم إرسال النتائج للطالب: {student_id}")
-            
         except Exception as e:
             logger.error(f"خطأ في معالجة الرسالة: {str(e)}", exc_info=True)
             await wait_msg.edit_text(
-                f"❌ حدث خطأ أثناء استخراج البيانات:\n{str(e)}\n\n"
+                "❌ حدث خطأ أثناء استخراج البيانات.\n\n"
                 "الرجاء المحاولة مرة أخرى أو التواصل مع الدعم."
             )
         finally:
-            # التأكد من إغلاق المتصفح إذا كان selenium
-            if scraper and SCRAPER_TYPE == "selenium":
-                try:
-                    scraper.close()
-                except:
-                    pass
+            metrics.finish_trace(trace, outcome)
+            if self.jobs is not None:
+                # وصل الرد (أو رسالة الخطأ): لا حاجة لتسليمه بعد إعادة التشغيل
+                await asyncio.to_thread(self.jobs.ack, update.effective_chat.id, wait_msg.message_id)
+    
+    async def get_data(self, chat_id, student_id, password, force=False, reply_to=None,
+                       lane=INTERACTIVE, on_position=None, user_id=None):
+        """
+        بيانات الطالب من الذاكرة المؤقتة، أو باستخراجها (مع دمج الطلبات المتزامنة)
+        
+        كل طلب يمر بحدوده الخاصة قبل الانضمام إلى الاستخراج المشترك: دور المستخدم
+        في المنفذ (طلباته بالترتيب)، ثم معدل المحادثة ودورها في المجدول العادل مع
+        إشعارات الترتيب. لا يحتجز الطلب مكاناً في المجدول وهو ينتظر طلبه السابق،
+        ولا يصل خطأ حدود طلب إلى من انضم إليه. طلبات الخلفية (المتابعة و /batch)
+        بلا دور مستخدم، فتتوزع بحدود مسار الخلفية في المجدول فقط.
+        
+        Args:
+            reply_to: رسالة الانتظار، تُحفظ مع المهمة في وضع العمال لاستكمال الرد
+                إذا أعيد تشغيل البوت قبل اكتمالها
+            lane: مسار الجدولة (INTERACTIVE لاستعلامات المستخدمين، BACKGROUND للمتابعة والدفعات)
+            on_position: دالة غير متزامنة تستقبل ترتيب الطلب أثناء انتظاره في الطابور
+            user_id: المستخدم صاحب الطلب لطابور المنفذ (افتراضياً المحادثة)
+        
+        Returns:
+            dict: جميع بيانات الطالب والنتائج
+        
+        Raises:
+            UserQueueFull: إذا كان لدى المستخدم طلبات معلقة كثيرة
+            RateLimited: إذا تجاوزت المحادثة معدل الطلبات
+        """
+        key = make_key(student_id, password)
+        
+        def cached():
+            data = None if force else self.cache.get(key)
+            if data is not None:
+                logger.info(f"تم العثور على نتائج الطالب في الذاكرة المؤقتة: {student_id}")
+                metrics.annotate(source='cache')
+            return data
+        
+        data = cached()
+        if data is not None:
+            return data
+        
+        async def fetch():
+            result = await self.fetch_results(chat_id, student_id, password, reply_to)
+            changed = self.cache.set(key, result)
+            # يُسجل دائماً: يحدّث بصمة كلمة المرور ووقت آخر تحديث والبيانات الأساسية،
+            # ويتجاوز مقارنة التقديرات بنفسه إذا لم تتغير النتائج
+            changes = await asyncio.to_thread(self.store.record, result, password)
+            if changed and changes and self.watcher is not None:
+                # المشتركون في الطالب يُبلغون الآن بدلاً من موعد فحصهم التالي
+                await self.watcher.publish(student_id, password, result)
+            return result
+        
+        user_id = chat_id if user_id is None else user_id
+        queue_key = None if lane == BACKGROUND else user_id
+        async with self.executor.queue(queue_key), self.scheduler.slot(chat_id, lane, on_position):
+            # طلب سبقه في الطابور لنفس الطالب ربما أكمل الاستخراج
+            data = cached()
+            if data is not None:
+                return data
+            logger.info(f"محاولة استخراج بيانات الطالب: {student_id}")
+            return await self.inflight.do(key, fetch)
+    
+    async def refresh_data(self, chat_id, student_id, password):
+        """get_data لتحديثات الخلفية (مراقب النتائج): بأولوية أقل من استعلامات المستخدمين"""
+        return await self.get_data(chat_id, student_id, password, lane=BACKGROUND)
+    
+    def stale_data(self, student_id, password):
+        """
+        آخر نتائج معروفة عند تعطل البوابة: الذاكرة المؤقتة ثم قاعدة البيانات
+        
+        Returns:
+            dict: البيانات، أو None إذا لم يُستخرج الطالب من قبل بنفس كلمة المرور
+        """
+        stale = self.cache.get(make_key(student_id, password), allow_stale=True)
+        if stale is None and self.store.authorized(student_id, password):
+            stale = self.store.latest(student_id)
+        return stale
+    
+    async def history_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """معالج أمر /history لعرض سجل تقديرات الطالب من قاعدة البيانات"""
+        student_id, password, error = parse_lookup(' '.join(context.args or []))
+        if error:
+            await update.message.reply_text(
+                "❌ الاستخدام: `/history رقم_جامعي [كلمة_المرور]`",
+                parse_mode='Markdown'
+            )
+            return
+        if not self.store.authorized(student_id, password):
+            await update.message.reply_text(NO_HISTORY)
+            return
+        
+        history = self.store.history(student_id)
+        latest = self.store.latest(student_id)
+        message = f"🗂 *سجل نتائج الطالب {student_id}*\n"
+        message += f"آخر تحديث: {format_time(latest['updated_at'])}\n\n"
+        for entry in history:
+            message += f"• {format_time(entry['first_seen'])} - {entry['المادة']}: *{entry['التقدير']}*"
+            if entry['التقدير السابق']:
+                message += f" (كان {entry['التقدير السابق']})"
+            message += "\n"
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    async def changes_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """معالج أمر /changes لعرض آخر ما تغير في نتائج الطالب"""
+        student_id, password, error = parse_lookup(' '.join(context.args or []))
+        if error:
+            await update.message.reply_text(
+                "❌ الاستخدام: `/changes رقم_جامعي [كلمة_المرور]`",
+                parse_mode='Markdown'
+            )
+            return
+        if not self.store.authorized(student_id, password):
+            await update.message.reply_text(NO_HISTORY)
+            return
+        
+        changes = self.store.changes(student_id)
+        if not changes:
+            await update.message.reply_text("لا توجد تغييرات مسجلة لهذا الطالب")
+            return
+        message = f"🆕 *آخر تغييرات الطالب {student_id}* ({format_time(changes[0]['first_seen'])})\n\n"
+        message += format_changes(changes)
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    async def batch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        معالج أمر /batch لاستخراج نتائج قائمة من الطلاب
+        
+        الأرقام تُرسل بعد الأمر، أو في ملف نصي (مع الأمر في وصف الملف أو بالرد عليه).
+        أول وسيط اختياري يحدد صيغة الملف الناتج: csv (افتراضياً) أو json.
+        """
+        # الدفعة تعيد بيانات شخصية لمئات الطلاب: متاحة لمسؤولين محددين فقط
+        if update.effective_user is None or update.effective_user.id not in BATCH_ADMINS:
+            await update.message.reply_text("⛔ هذا الأمر متاح لمسؤولي الأقسام فقط")
+            return
+        
+        args = list(context.args or [])
+        if not args and update.message.caption:
+            # الأمر في وصف ملف مرفق: CommandHandler لا يحلل الوصف
+            args = update.message.caption.split()[1:]
+        fmt = 'csv'
+        if args and args[0].lower() in ('csv', 'json'):
+            fmt = args.pop(0).lower()
+        
+        text = '\n'.join(args)
+        document = update.message.document
+        if document is None and update.message.reply_to_message:
+            document = update.message.reply_to_message.document
+        if document is not None:
+            file = await document.get_file()
+            content = await file.download_as_bytearray()
+            text += '\n' + content.decode('utf-8-sig', errors='replace')
+        
+        entries, invalid = batch.parse_ids(text, STUDENT_ID_LENGTH)
+        if not entries:
+            await update.message.reply_text(
+                "❌ الاستخدام: `/batch [csv|json] رقم1 رقم2 ...`\n"
+                "أو أرسل ملفاً نصياً (رقم جامعي وكلمة مرور اختيارية في كل سطر) مع الأمر في الوصف.",
+                parse_mode='Markdown'
+            )
+            return
+        if len(entries) > BATCH_MAX_IDS:
+            await update.message.reply_text(f"❌ الحد الأقصى {BATCH_MAX_IDS} طالب في الدفعة الواحدة")
+            return
+        
+        notice = f"\n⚠️ تم تجاهل {len(invalid)} رقم غير صالح" if invalid else ""
+        progress_msg = await update.message.reply_text(
+            f"⏳ جاري استخراج نتائج {len(entries)} طالب...{notice}"
+        )
+        last_edit = time.monotonic()
+        
+        async def on_progress(done, total, failed):
+            nonlocal last_edit
+            # تعديل رسالة واحدة بحد أقصى مرة كل BATCH_PROGRESS_INTERVAL ثانية
+            if done < total and time.monotonic() - last_edit < BATCH_PROGRESS_INTERVAL:
+                return
+            last_edit = time.monotonic()
+            try:
+                await progress_msg.edit_text(f"⏳ تم {done}/{total} (فشل {failed}){notice}")
+            except Exception as e:
+                logger.warning(f"تعذر تحديث رسالة التقدم: {str(e)}")
+        
+        chat_id = update.effective_chat.id
+        
+        async def fetch(student_id, password):
+            try:
+                return await self.get_data(chat_id, student_id, password, lane=BACKGROUND)
+            except (CircuitOpen, *PORTAL_FAILURES):
+                stale = self.stale_data(student_id, password)
+                if stale is None:
+                    raise
+                stale['stale'] = True
+                return stale
+        
+        start = time.monotonic()
+        results = await batch.run_batch(entries, fetch, BATCH_CONCURRENCY, on_progress)
+        elapsed = time.monotonic() - start
+        logger.info(f"دفعة من {len(entries)} طالب خلال {elapsed:.1f} ث")
+        
+        payload = batch.to_json(results) if fmt == 'json' else batch.to_csv(results)
+        await update.message.reply_document(
+            document=payload,
+            filename=f"results_{time.strftime('%Y%m%d_%H%M%S')}.{fmt}",
+            caption=f"{batch.summary(results)}\n⏱ {elapsed:.0f} ث"
+        )
+        await progress_msg.edit_text(f"✅ اكتملت الدفعة: {batch.summary(results)}{notice}")
+    
+    async def fetch_results(self, chat_id, student_id, password, reply_to=None):
+        """
+        استخراج النتائج: المسار غير المتزامن أولاً ثم المتصفح في المنفذ عند الحاجة،
+        أو عبر طابور المهام وعمليات العمال في وضع JOB_QUEUE
+        
+        هذا هو العمل المشترك بين الطلبات المدمجة (get_data تتحقق من حدود كل طلب
+        قبله)، فلا يمر إلا بحارس البوابة.
+        
+        Returns:
+            dict: جميع بيانات الطالب والنتائج
+        
+        Raises:
+            CircuitOpen: إذا كانت البوابة متوقفة مؤقتاً بعد أعطال متكررة
+            QueueFull: إذا تجاوز طابور المهام حده
+            JobFailed: إذا فشلت المهمة في جميع المحاولات
+        """
+        async with self.guard.admit():
+            if self.jobs is not None:
+                job_id = await asyncio.to_thread(
+                    self.jobs.enqueue, student_id, password, chat_id, reply_to, self.boot_id
+                )
+                with metrics.span('job_wait'):
+                    data = await self.jobs.wait(job_id)
+                if data.get('tier'):
+                    record_tier(data['tier'])
+                return data
+            
+            if self.portal is None:
+                # استخراج البيانات في خيط منفصل
+                return await self.executor.run(self.scrape, student_id, password)
+            
+            has_browser = SCRAPER_ENGINE in BROWSER_ENGINES
+            try:
+                data = await self.portal.get_all_data(student_id, password)
+            except PORTAL_FAILURES:
+                # البوابة نفسها لا تستجيب، المتصفح لن يساعد
+                raise
+            except Exception as e:
+                if not has_browser:
+                    raise
+                logger.warning(f"فشل المسار غير المتزامن للطالب {student_id}: {str(e)}")
+            else:
+                # فشل تسجيل الدخول لن يتغير في المتصفح، والمحرك بلا متصفح لا يملك
+                # مستوى أعلى: الجدول الفارغ هو النتيجة نفسها
+                if not data['success'] or data['results'] or not has_browser:
+                    data['tier'] = 'http'
+                    record_tier('http')
+                    return data
+            
+            # الجدول يُحمّل عبر JavaScript: الرجوع إلى المتصفح مباشرة دون إعادة تجربة HTTP
+            return await self.executor.run(self.scrape, student_id, password, False)
+    
+    def scrape(self, student_id, password, http_first=True):
+        """
+        استخراج نتائج الطالب (دالة متزامنة تعمل داخل المنفذ)
+        
+        Returns:
+            dict: جميع بيانات الطالب والنتائج
+        """
+        scraper = engines.create_engine(
+            SCRAPER_ENGINE, pool=self.pool, http_first=http_first, sessions=self.sessions
+        )
+        try:
+            data = scraper.get_all_data(student_id, password)
+            if 'tier' not in data:
+                # المحركات ذات المستوى الواحد: المستوى هو اسم المحرك
+                data['tier'] = SCRAPER_ENGINE
+                record_tier(SCRAPER_ENGINE)
+            logger.info(
+                f"أزمنة استخراج الطالب {student_id} ({data.get('tier')}): "
+                f"{getattr(scraper, 'timings', {})}"
+            )
+            return data
+        finally:
+            # التأكد من إغلاق المتصفح وإعادته إلى المجمع
+            try:
+                scraper.close()
+            except:
+                pass
+    
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """معالج أمر /stats لعرض حالة مجمع المتصفحات"""
+        stats = self.pool.stats()
+        message = (
+            "📈 *حالة مجمع المتصفحات*\n"
+            f"• المشغول: {stats['in_use']}/{stats['size']}\n"
+            f"• المتاح: {stats['idle']}\n"
+            f"• في الانتظار: {stats['waiting']}\n"
+            f"• متوسط الانتظار: {stats['avg_wait']:.2f} ث\n"
+            f"• أقصى انتظار: {stats['max_wait']:.2f} ث\n"
+            f"• متصفحات مستبدلة: {stats['replaced']}\n"
+        )
+        queue_stats = self.executor.stats()
+        message += (
+            "\n⚙️ *طابور الاستخراج*\n"
+            f"• قيد التنفيذ: {queue_stats['running']}/{queue_stats['max_workers']}\n"
+            f"• في الطابور: {queue_stats['queued']}\n"
+            f"• خُدمت عبر HTTP: {tier_stats.get('http', 0)}\n"
+            f"• خُدمت عبر Selenium: {tier_stats.get('selenium', 0)}\n"
+        )
+        for tier, count in tier_stats.items():
+            if tier not in ('http', 'selenium'):
+                message += f"• خُدمت عبر {tier}: {count}\n"
+        cache_stats = self.cache.stats()
+        message += (
+            "\n🗂 *الذاكرة المؤقتة*\n"
+            f"• النتائج المحفوظة: {cache_stats['entries']}\n"
+            f"• الإصابات: {cache_stats['hits']}\n"
+            f"• الإخفاقات: {cache_stats['misses']}\n"
+            f"• نسبة الإصابة: {cache_stats['hit_rate']:.0%}\n"
+            f"• طلبات مدمجة مع طلب جارٍ: {self.inflight.stats()['coalesced']}\n"
+        )
+        session_stats = self.sessions.stats()
+        message += (
+            "\n🔑 *جلسات البوابة*\n"
+            f"• الجلسات المحفوظة: {session_stats['entries']}\n"
+            f"• مرات تجاوز تسجيل الدخول: {session_stats['reused']}\n"
+            f"• جلسات منتهية: {session_stats['expired']}\n"
+        )
+        store_stats = self.store.stats()
+        message += (
+            "\n💾 *قاعدة البيانات*\n"
+            f"• الطلاب: {store_stats['students']}\n"
+            f"• سجلات التقديرات: {store_stats['grades']}\n"
+        )
+        if self.watcher is not None:
+            watch_stats = self.watcher.stats()
+            message += (
+                "\n🔔 *متابعة النتائج*\n"
+                f"• المشتركون: {watch_stats['subscriptions']}\n"
+                f"• الفحوصات: {watch_stats['checks']}\n"
+                f"• إشعارات مرسلة: {watch_stats['changes']}\n"
+                f"• فحوصات فاشلة: {watch_stats['errors']}\n"
+            )
+        if self.jobs is not None:
+            job_stats = self.jobs.stats()
+            if self.workers is None:
+                workers = "خدمة مستقلة"
+            elif self.workers.poll() is None:
+                workers = f"{SCRAPE_WORKERS} عملية"
+            else:
+                workers = f"متوقفون (رمز الخروج {self.workers.returncode})"
+            message += (
+                "\n🏭 *طابور المهام*\n"
+                f"• العمال: {workers}\n"
+                f"• في الانتظار: {job_stats['pending']}/{self.jobs.max_pending}\n"
+                f"• قيد التنفيذ: {job_stats['running']}\n"
+                f"• مكتملة: {job_stats['done']}\n"
+                f"• فاشلة: {job_stats['failed']}\n"
+            )
+        sched_stats = self.scheduler.stats()
+        message += (
+            "\n🚦 *الجدولة*\n"
+            f"• قيد التنفيذ: {sched_stats['running']['interactive']} مستخدمين، "
+            f"{sched_stats['running']['background']} خلفية (الحد {sched_stats['max_concurrent']})\n"
+            f"• في الانتظار: {sched_stats['waiting']['interactive']} مستخدمين، "
+            f"{sched_stats['waiting']['background']} خلفية\n"
+            f"• متوسط الانتظار: {sched_stats['avg_wait']:.2f} ث (الأقصى {sched_stats['max_wait']:.1f} ث)\n"
+            f"• طلبات تجاوزت الحد: {sched_stats['rate_limited']}\n"
+        )
+        guard_stats = self.guard.stats()
+        message += (
+            "\n🛡 *حماية البوابة*\n"
+            f"• حالة الدائرة: {guard_stats['state']}\n"
+            f"• جلسات جارية: {guard_stats['in_flight']}/{guard_stats['max_concurrent']}\n"
+            f"• طلبات مرفوضة: {guard_stats['rejected']}\n"
+            f"• أعطال متتالية: {guard_stats['consecutive_failures']}\n"
+        )
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    async def post_init(self, application: Application):
+        """تشغيل المتصفحات مسبقاً في الخلفية وتجهيز عميل HTTP ومراقب النتائج عند بدء البوت"""
+        self.application = application
+        if self.jobs is not None:
+            # الاستخراج في عمليات العمال، البوت يستقبل التحديثات فقط
+            if SCRAPE_WORKERS > 0:
+                self.start_workers()
+            self.delivery_task = asyncio.create_task(self.deliver_orphans())
+        elif os.getenv('ASYNC_HTTP', '1') == '1' and SCRAPER_ENGINE in ASYNC_FIRST_ENGINES:
+            self.portal = AsyncPortalClient(
+                max_connections=int(os.getenv('PORTAL_MAX_CONNECTIONS', '20')),
+                timeout=int(os.getenv('PORTAL_TIMEOUT', '10')),
+                sessions=self.sessions
+            )
+        if self.jobs is None and SCRAPER_ENGINE in BROWSER_ENGINES:
+            # تشغيل Chrome في الخلفية: المسار السريع يخدم أول الطلبات دون انتظار المتصفحات
+            self.pool.start_background()
+        # في وضع webhook تُقدم /metrics على نفس خادم الويب
+        metrics_port = os.getenv('METRICS_PORT')
+        if metrics_port and os.getenv('BOT_MODE', 'polling').lower() != 'webhook':
+            self.metrics_runner = await metrics.start_metrics_server(int(metrics_port))
+        if self.watcher is not None:
+            self.watcher.start()
+    
+    def start_workers(self):
+        """تشغيل عملية مستقلة تشغل العمال وتوقفهم (لا ترث شيئاً من عملية البوت)"""
+        self.workers = subprocess.Popen(
+            [sys.executable, scrape_worker.__file__, '--workers', str(SCRAPE_WORKERS),
+             '--db', os.getenv('JOB_DB_PATH', 'jobs.db'), '--engine', SCRAPER_ENGINE, '--exit-with-parent'],
+            env=dict(os.environ, SESSION_KEY=self.job_key)
+        )
+        logger.info(f"تم تشغيل {SCRAPE_WORKERS} عملية عامل")
+    
+    async def deliver_orphans(self):
+        """
+        تسليم نتائج المهام التي انتظرها تشغيل سابق للبوت، ومراقبة عملية العمال
+
+        المهام تبقى في الطابور بعد إعادة التشغيل ويكملها العمال، فتُعدل رسالة
+        الانتظار القديمة بالنتيجة (مرة واحدة على الأقل). إذا توقفت عملية العمال
+        تُشغل من جديد حتى لا تبقى المهام بلا منفذ.
+        """
+        last_prune = 0.0
+        while True:
+            try:
+                if self.workers is not None and self.workers.poll() is not None:
+                    logger.error(
+                        f"توقفت عملية العمال (رمز الخروج {self.workers.returncode})، إعادة تشغيلها"
+                    )
+                    self.start_workers()
+                orphans = await asyncio.to_thread(self.jobs.orphans, self.boot_id)
+                for chat_id, reply_to, data, error in orphans:
+                    text = format_results_message(data) if data else (
+                        "❌ حدث خطأ أثناء استخراج البيانات.\n\n"
+                        "الرجاء المحاولة مرة أخرى أو التواصل مع الدعم."
+                    )
+                    try:
+                        await self.application.bot.edit_message_text(
+                            text, chat_id=chat_id, message_id=reply_to, parse_mode='Markdown'
+                        )
+                    except Exception as e:
+                        logger.warning(f"تعذر تسليم نتيجة معلقة للمحادثة {chat_id}: {e!r}")
+                    await asyncio.to_thread(self.jobs.ack, chat_id, reply_to)
+                if time.monotonic() - last_prune > 600:
+                    await asyncio.to_thread(self.jobs.prune)
+                    last_prune = time.monotonic()
+            except Exception as e:
+                logger.error(f"خطأ في تسليم النتائج المعلقة: {str(e)}", exc_info=True)
+            await asyncio.sleep(ORPHAN_DELIVERY_INTERVAL)
+    
+    async def post_shutdown(self, application: Application):
+        """إغلاق المتصفحات عند إيقاف البوت"""
+        if self.delivery_task is not None:
+            self.delivery_task.cancel()
+        if self.workers is not None:
+            # العمال ينهون مهامهم الحالية، وغير المكتمل يعود للطابور
+            self.workers.send_signal(signal.SIGTERM)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.workers.wait, 40)
+            except subprocess.TimeoutExpired:
+                self.workers.kill()
+        if self.watcher is not None:
+            await self.watcher.stop()
+            self.watcher.store.close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        if self.portal:
+            await self.portal.close()
+        self.executor.shutdown()
+        self.pool.close()
+        self.cache.close()
+        if self.jobs is not None:
+            self.jobs.close()
+        self.sessions.close()
+        self.store.close()
     
     def run(self):
         """تشغيل البوت"""
         # إنشاء التطبيق
-        application = Application.builder().token(self.token).build()
+        application = (
+            Application.builder()
+            .token(self.token)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+            # معالجة التحديثات بالتوازي حتى يرد البوت أثناء الاستخراج
+            .concurrent_updates(True)
+            .build()
+        )
         
         # إضافة معالجات الأوامر
         application.add_handler(CommandHandler("start", self.start))
         application.add_handler(CommandHandler("help", self.help_command))
         application.add_handler(CommandHandler("get_results", self.get_results))
+        application.add_handler(CommandHandler("stats", self.stats_command))
+        application.add_handler(CommandHandler("refresh", self.refresh_command))
+        application.add_handler(CommandHandler("batch", self.batch_command))
+        application.add_handler(CommandHandler("history", self.history_command))
+        application.add_handler(CommandHandler("changes", self.changes_command))
+        application.add_handler(CommandHandler("subscribe", self.subscribe_command))
+        application.add_handler(CommandHandler("unsubscribe", self.unsubscribe_command))
+        # ملف أرقام جامعية مع /batch في وصفه
+        application.add_handler(MessageHandler(
+            filters.Document.ALL & filters.CaptionRegex(r'^/batch(@\w+)?(\s|$)'), self.batch_command
+        ))
         
         # إضافة معالج الرسائل النصية
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         
-        # بدء البوت
-        logger.info("بدء تشغيل البوت...")
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        # بدء البوت: polling افتراضياً أو webhook حسب متغيرات البيئة
+        mode = os.getenv('BOT_MODE', 'polling').lower()
+        logger.info(f"بدء تشغيل البوت في وضع {mode}...")
+        
+        if mode == 'webhook':
+            self.run_webhook(application)
+        else:
+            application.run_polling(allowed_updates=ALLOWED_UPDATES)
+    
+    def run_webhook(self, application):
+        """تشغيل البوت عبر Webhook مع خادم HTTP مدمج"""
+        from webhook_server import run_webhook
+        
+        webhook_url = os.getenv('WEBHOOK_URL')
+        if not webhook_url and os.getenv('RAILWAY_PUBLIC_DOMAIN'):
+            webhook_url = f"https://{os.getenv('RAILWAY_PUBLIC_DOMAIN')}"
+        if not webhook_url:
+            raise RuntimeError("وضع webhook يتطلب تعيين WEBHOOK_URL")
+        
+        asyncio.run(run_webhook(
+            application,
+            webhook_url=webhook_url,
+            port=int(os.getenv('PORT', '8080')),
+            path=os.getenv('WEBHOOK_PATH', '/telegram'),
+            secret_token=os.getenv('WEBHOOK_SECRET') or None,
+            allowed_updates=ALLOWED_UPDATES,
+            post_init=self.post_init,
+            post_shutdown=self.post_shutdown,
+        ))
 
 
 def main():
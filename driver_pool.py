@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مجمع متصفحات Chrome جاهزة لإعادة الاستخدام بين طلبات الطلاب
+"""
+
+import logging
+import queue
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """لم يتوفر متصفح خلال مهلة الانتظار"""
+
+
+class DriverPool:
+    """مجمع محدود الحجم من متصفحات Chrome المشغلة مسبقاً"""
+
+    def __init__(self, size=2, headless=True, acquire_timeout=60, factory=None, lean=None):
+        """
+        Args:
+            size: عدد المتصفحات في المجمع
+            headless: تشغيل المتصفحات بدون واجهة
+            lean: الوضع الخفيف للمتصفح (افتراضياً حسب BROWSER_PROFILE)
+            acquire_timeout: أقصى مدة انتظار (بالثواني) للحصول على متصفح
+            factory: دالة لإنشاء متصفح جديد (افتراضياً create_driver)
+        """
+        self.size = size
+        self.headless = headless
+        self.acquire_timeout = acquire_timeout
+        self.lean = lean
+        self.factory = factory or self._create_driver
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # إحصائيات المجمع
+        self.in_use = 0
+        self.waiting = 0
+        self.created = 0
+        self.replaced = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        """
+        تشغيل جميع المتصفحات مسبقاً حتى تكون جاهزة لأول طلب
+
+        آمنة للتشغيل في خيط خلفي أثناء خدمة الطلبات: لا تتجاوز حجم المجمع.
+        """
+        for _ in range(self.size):
+            if self._closed or not self._slots.acquire(blocking=False):
+                break
+            try:
+                with self._lock:
+                    if self._idle.qsize() + self.in_use >= self.size:
+                        break
+                driver = self._new_driver()
+                if self._closed:
+                    self._quit(driver)
+                    break
+                self._idle.put(driver)
+            except Exception as e:
+                logger.error(f"فشل تشغيل متصفح للمجمع: {str(e)}")
+            finally:
+                self._slots.release()
+        logger.info(f"تم تجهيز {self._idle.qsize()} متصفح في المجمع")
+
+    def start_background(self):
+        """تجهيز المتصفحات في خيط خلفي حتى لا يتأخر بدء البوت"""
+        thread = threading.Thread(target=self.start, name='driver-pool-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def _create_driver(self):
+        # Selenium يُستورد عند أول متصفح فقط
+        from scraper_selenium import create_driver
+        return create_driver(self.headless, self.lean)
+
+    def _new_driver(self):
+        with metrics.span('driver_launch', engine='selenium'):
+            driver = self.factory()
+        with self._lock:
+            self.created += 1
+        return driver
+
+    def _is_alive(self, driver):
+        """التحقق من أن المتصفح ما زال يستجيب"""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """
+        الحصول على متصفح من المجمع
+
+        Returns:
+            webdriver.Chrome: متصفح جاهز للاستخدام
+
+        Raises:
+            PoolExhausted: إذا لم يتوفر متصفح خلال acquire_timeout
+        """
+        if self._closed:
+            raise RuntimeError("مجمع المتصفحات مغلق")
+
+        start = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            got_slot = self._slots.acquire(timeout=self.acquire_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        if not got_slot:
+            raise PoolExhausted("جميع المتصفحات مشغولة حالياً، حاول مرة أخرى بعد قليل")
+
+        try:
+            try:
+                driver = self._idle.get_nowait()
+                if not self._is_alive(driver):
+                    logger.warning("تم استبدال متصفح معطل في المجمع")
+                    self._quit(driver)
+                    driver = self._new_driver()
+                    with self._lock:
+                        self.replaced += 1
+            except queue.Empty:
+                driver = self._new_driver()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - start
+        metrics.observe('driver_acquire', waited, engine='selenium')
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return driver
+
+    def release(self, driver):
+        """
+        إعادة المتصفح إلى المجمع بعد مسح بيانات الطالب السابق
+
+        Args:
+            driver: المتصفح المأخوذ من acquire
+        """
+        try:
+            if self._closed or not self._reset(driver):
+                self._quit(driver)
+                with self._lock:
+                    if not self._closed:
+                        self.replaced += 1
+            else:
+                self._idle.put(driver)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def _reset(self, driver):
+        """مسح الكوكيز والتخزين المحلي حتى لا تتسرب جلسة طالب لآخر"""
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logger.warning(f"فشل تنظيف المتصفح، سيتم استبداله: {str(e)}")
+            return False
+
+    def stats(self):
+        """
+        إحصائيات إشغال المجمع ووقت الانتظار
+
+        Returns:
+            dict: الحجم، المشغول، المتاح، المنتظرون، ومتوسط/أقصى انتظار
+        """
+        with self._lock:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': self._idle.qsize(),
+                'waiting': self.waiting,
+                'created': self.created,
+                'replaced': self.replaced,
+                'acquired': self.acquired,
+                'avg_wait': self.total_wait / self.acquired if self.acquired else 0.0,
+                'max_wait': self.max_wait,
+            }
+
+    def close(self):
+        """إغلاق جميع المتصفحات"""
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+واجهة موحدة لمحركات الاستخراج وسجل يختار المحرك من الإعدادات وقت التشغيل
+
+    engine = engines.create_engine('tiered', pool=pool, sessions=sessions)
+    data = engine.get_all_data(student_id, password)
+
+المحركات تُسجل كمسار نصي ولا تُستورد إلا عند أول استخدام، حتى لا يحمّل
+البوت Selenium مثلاً عندما لا يحتاجه.
+"""
+
+import importlib
+import inspect
+import os
+import threading
+
+import progress
+from models import LookupResult, format_results_message
+
+
+# اسم المحرك ← "الوحدة:الفئة"
+ENGINES = {
+    'tiered': 'scraper_tiered:StudentPortalScraper',
+    'simple': 'scraper_simple:StudentPortalScraper',
+    'selenium': 'scraper_selenium:StudentPortalScraper',
+    'legacy': 'scraper:StudentPortalScraper',
+    'async': 'scraper_async:AsyncPortalClient',
+}
+
+# أسماء بديلة مستخدمة سابقاً في benchmark.py
+ALIASES = {'scraper': 'legacy'}
+
+DEFAULT_ENGINE = os.getenv('SCRAPER_ENGINE', 'tiered')
+
+# عدد الطلبات التي خدمها كل مستوى (http أو selenium أو اسم المحرك) منذ تشغيل البوت
+tier_stats = {'http': 0, 'selenium': 0}
+_stats_lock = threading.Lock()
+
+
+def record_tier(tier):
+    """تسجيل المستوى الذي خدم الطلب"""
+    with _stats_lock:
+        tier_stats[tier] = tier_stats.get(tier, 0) + 1
+
+
+class PortalUnavailable(ConnectionError):
+    """
+    البوابة لا تستجيب (انتهاء المهلة، رفض الاتصال، أو خطأ 5xx)
+
+    المحركات المتزامنة ترفعه بدلاً من إعادة False من login، فيصل إلى حارس
+    البوابة (يرث ConnectionError من PORTAL_FAILURES) ولا يظهر كفشل تسجيل دخول.
+    """
+
+
+class Engine:
+    """
+    الواجهة المشتركة لمحركات الاستخراج المتزامنة
+
+    المحرك يطبق login و get_student_info و get_results (أو يعيد تعريف
+    get_all_data بالكامل)، ويحصل على البقية من هذه الفئة.
+    """
+
+    name = None
+
+    def login(self, student_id, password="123456"):
+        raise NotImplementedError
+
+    def get_student_info(self):
+        raise NotImplementedError
+
+    def get_results(self):
+        raise NotImplementedError
+
+    def get_all_data(self, student_id, password="123456"):
+        """
+        استخراج جميع بيانات الطالب
+
+        كل مرحلة تنتهي تُعلن عبر progress.report حتى يعرضها البوت تدريجياً.
+
+        Args:
+            student_id: الرقم الجامعي
+            password: كلمة المرور
+
+        Returns:
+            dict: جميع بيانات الطالب والنتائج
+        """
+        if not self.login(student_id, password):
+            return LookupResult.failure().to_dict()
+        progress.report(progress.LOGGED_IN)
+
+        student_info = self.get_student_info()
+        progress.report(progress.STUDENT_INFO, student_info)
+
+        return {
+            'success': True,
+            'student_id': student_id,
+            'student_info': student_info,
+            'results': self.get_results()
+        }
+
+    def lookup(self, student_id, password="123456"):
+        """
+        Returns:
+            LookupResult: نفس get_all_data كسجل
+        """
+        return LookupResult.from_dict(self.get_all_data(student_id, password))
+
+    def close(self):
+        """تحرير الموارد (الجلسة أو المتصفح)"""
+
+    def format_results_message(self, data):
+        """تنسيق البيانات لإرسالها عبر التلغرام"""
+        return format_results_message(data)
+
+
+def resolve(name=None):
+    """
+    Returns:
+        str: الاسم المعتمد للمحرك
+
+    Raises:
+        ValueError: إذا لم يكن المحرك مسجلاً
+    """
+    name = ALIASES.get(name or DEFAULT_ENGINE, name or DEFAULT_ENGINE)
+    if name not in ENGINES:
+        raise ValueError(f"محرك غير معروف: {name} (المتاح: {', '.join(ENGINES)})")
+    return name
+
+
+def engine_class(name=None):
+    """استيراد فئة المحرك عند أول طلب"""
+    module_name, _, class_name = ENGINES[resolve(name)].partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def is_async(name=None):
+    """هل get_all_data في المحرك دالة غير متزامنة"""
+    return inspect.iscoroutinefunction(engine_class(name).get_all_data)
+
+
+def register(name, path):
+    """تسجيل محرك إضافي بمسار "الوحدة:الفئة" """
+    ENGINES[name] = path
+
+
+def create_engine(name=None, **options):
+    """
+    إنشاء محرك بالإعدادات المشتركة
+
+    الخيارات التي لا يقبلها المحرك تُتجاهل، فيمكن تمرير pool و sessions
+    و http_first لأي محرك.
+
+    Args:
+        name: اسم المحرك (افتراضياً SCRAPER_ENGINE أو tiered)
+        **options: معاملات الإنشاء
+
+    Returns:
+        المحرك الجاهز
+    """
+    cls = engine_class(name)
+    accepted = inspect.signature(cls.__init__).parameters
+    return cls(**{key: value for key, value in options.items() if key in accepted})
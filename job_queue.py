@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+طابور مهام استخراج دائم في SQLite مشترك بين البوت وعمليات العمال
+
+البوت يضيف مهمة لكل استعلام وينتظر نتيجتها، وعمليات العمال (scrape_worker.py)
+تحجز المهام وتنفذ get_all_data وتكتب النتيجة في نفس الملف:
+
+- التسليم مرة واحدة على الأقل: المهمة المحجوزة لها مهلة (lease)، وإذا توقف
+  العامل قبل إنهائها تعود إلى الطابور بعد انتهاء المهلة.
+- منع التكرار: مهمة نشطة واحدة فقط لكل طالب وكلمة مرور، والطلبات المتكررة
+  تنضم إليها كمنتظرين.
+- الضغط العكسي: إضافة مهمة جديدة تفشل بـ QueueFull إذا تجاوز الطابور max_pending.
+
+الردود تُسجل لكل منتظر (المحادثة والرسالة) حتى يكملها البوت بعد إعادة تشغيله.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from engines import PortalUnavailable
+from results_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    password BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_key ON jobs (key) WHERE status IN ('pending', 'running');
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS job_waiters (
+    job_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    reply_to INTEGER,
+    owner TEXT NOT NULL,
+    delivered INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_id, chat_id)
+);
+CREATE INDEX IF NOT EXISTS job_waiters_pending ON job_waiters (delivered, owner);
+"""
+
+
+class QueueFull(Exception):
+    """طابور المهام تجاوز الحد المسموح"""
+
+
+class JobFailed(Exception):
+    """فشلت المهمة بعد جميع المحاولات"""
+
+
+class Job:
+    """مهمة محجوزة لدى عامل"""
+
+    __slots__ = ('id', 'student_id', 'password', 'attempts')
+
+    def __init__(self, job_id, student_id, password, attempts):
+        self.id = job_id
+        self.student_id = student_id
+        self.password = password
+        self.attempts = attempts
+
+
+class JobQueue:
+    """طابور المهام؛ كل عملية تفتح نسختها الخاصة على نفس الملف"""
+
+    def __init__(self, db_path='jobs.db', key=None, lease=180, max_pending=500, max_attempts=3):
+        """
+        Args:
+            db_path: مسار ملف SQLite المشترك بين البوت والعمال
+            key: مفتاح Fernet لتشفير كلمات المرور (يجب أن يكون نفسه في جميع العمليات)
+            lease: مدة حجز المهمة بالثواني قبل إعادتها للطابور إذا لم تكتمل
+            max_pending: أقصى عدد مهام في الانتظار قبل رفض الجديدة
+            max_attempts: أقصى عدد محاولات للمهمة قبل اعتبارها فاشلة
+        """
+        if not key:
+            raise ValueError("طابور المهام يحتاج SESSION_KEY مشتركاً بين البوت والعمال")
+        self._fernet = Fernet(key)
+        self.lease = lease
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # isolation_level=None: المعاملات تُدار يدوياً عبر BEGIN IMMEDIATE
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    @contextmanager
+    def _write(self):
+        """معاملة كتابة تحجز القاعدة فوراً (لا يحجز عاملان نفس المهمة)"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def enqueue(self, student_id, password, chat_id=None, reply_to=None, owner=''):
+        """
+        إضافة مهمة استخراج، أو الانضمام إلى مهمة نشطة لنفس الطالب
+
+        Args:
+            chat_id: المحادثة التي تنتظر الرد
+            reply_to: رسالة الانتظار التي تُعدل بالنتيجة (بدونها لا يُسجل منتظر)
+            owner: معرف عملية البوت التي ستسلم الرد بنفسها
+
+        Returns:
+            int: رقم المهمة
+
+        Raises:
+            QueueFull: إذا تجاوز الطابور max_pending
+        """
+        key = make_key(student_id, password)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status IN ('pending', 'running')", (key,)
+            ).fetchone()
+            if row is not None:
+                job_id = row[0]
+            else:
+                pending = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+                if pending >= self.max_pending:
+                    raise QueueFull("الخدمة تحت ضغط كبير حالياً، حاول مرة أخرى بعد دقائق")
+                job_id = db.execute(
+                    "INSERT INTO jobs (key, student_id, password, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, student_id, self._fernet.encrypt(password.encode('utf-8')), now, now)
+                ).lastrowid
+            if reply_to is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO job_waiters (job_id, chat_id, reply_to, owner) "
+                    "VALUES (?, ?, ?, ?)",
+                    (job_id, chat_id, reply_to, owner)
+                )
+        return job_id
+
+    def claim(self, worker):
+        """
+        حجز أقدم مهمة في الانتظار، أو مهمة انتهت مهلة عاملها
+
+        Returns:
+            Job: المهمة، أو None إذا كان الطابور فارغاً
+        """
+        now = time.time()
+        with self._write() as db:
+            while True:
+                row = db.execute(
+                    "SELECT id, student_id, password, attempts FROM jobs "
+                    "WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY id LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, student_id, token, attempts = row
+                error = None
+                if attempts >= self.max_attempts:
+                    # توقف العامل أثناء آخر محاولة
+                    error = "انتهت مهلة العامل"
+                else:
+                    try:
+                        password = self._fernet.decrypt(token).decode('utf-8')
+                    except InvalidToken:
+                        # مهمة أضيفت بمفتاح مؤقت قبل إعادة التشغيل
+                        error = "تعذر فك تشفير المهمة"
+                if error is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        (error, now, job_id)
+                    )
+                    continue
+                db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                    "lease_until = ?, updated_at = ? WHERE id = ?",
+                    (worker, now + self.lease, now, job_id)
+                )
+                return Job(job_id, student_id, password, attempts + 1)
+
+    def complete(self, job_id, data):
+        """حفظ نتيجة get_all_data للمهمة"""
+        with self._write() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (json.dumps(data, ensure_ascii=False), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error, retry=True):
+        """
+        تسجيل فشل محاولة: تعود المهمة للطابور حتى max_attempts
+
+        Args:
+            retry: False لإنهاء المهمة فوراً (مثلاً عندما تكون البوابة معطلة)
+
+        Returns:
+            bool: True إذا ستُعاد المحاولة
+        """
+        with self._write() as db:
+            attempts = db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            retry = retry and attempts < self.max_attempts
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                ('pending' if retry else 'failed', error, time.time(), job_id)
+            )
+        return retry
+
+    def result(self, job_id):
+        """
+        Returns:
+            dict: بيانات الطالب إذا اكتملت المهمة، أو None إذا لم تكتمل بعد
+
+        Raises:
+            PortalUnavailable: إذا فشلت المهمة لأن البوابة لا تستجيب
+            JobFailed: إذا فشلت المهمة نهائياً لأي سبب آخر
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            raise JobFailed(f"المهمة {job_id} غير موجودة")
+        status, result, error = row
+        if status == 'done':
+            return json.loads(result)
+        if status == 'failed':
+            # عطل البوابة يصل إلى البوت كما هو حتى يحسبه حارس البوابة
+            if error and error.startswith(f"{PortalUnavailable.__name__}:"):
+                raise PortalUnavailable(error)
+            raise JobFailed(error)
+        return None
+
+    async def wait(self, job_id, poll=0.2, timeout=None):
+        """
+        انتظار نتيجة المهمة دون حجز حلقة الأحداث (قراءة SQLite في خيط منفصل)
+
+        Args:
+            timeout: أقصى مدة انتظار بالثواني (افتراضياً lease × max_attempts،
+                أطول مدة تبقى فيها المهمة محجوزة إذا توقف عمالها في كل محاولة)
+
+        Raises:
+            JobFailed: إذا فشلت المهمة، أو انتهت المهلة (لا يوجد عمال مثلاً)
+        """
+        if timeout is None:
+            timeout = self.lease * self.max_attempts
+        deadline = time.monotonic() + timeout
+        while True:
+            data = await asyncio.to_thread(self.result, job_id)
+            if data is not None:
+                return data
+            if time.monotonic() >= deadline:
+                raise JobFailed(f"انتهت مهلة انتظار المهمة {job_id}")
+            await asyncio.sleep(poll)
+
+    def ack(self, chat_id, reply_to):
+        """تأكيد تسليم الرد على رسالة الانتظار"""
+        with self._write() as db:
+            db.execute(
+                "UPDATE job_waiters SET delivered = 1 WHERE chat_id = ? AND reply_to = ?",
+                (chat_id, reply_to)
+            )
+
+    def orphans(self, owner, limit=50):
+        """
+        ردود مكتملة لم تُسلم لأن عملية البوت التي انتظرتها توقفت
+
+        Args:
+            owner: معرف عملية البوت الحالية (منتظروها يستلمون الرد بأنفسهم)
+
+        Returns:
+            list: [(المحادثة، رسالة الانتظار، البيانات أو None، الخطأ)]
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT w.chat_id, w.reply_to, j.result, j.error "
+                "FROM job_waiters w JOIN jobs j ON j.id = w.job_id "
+                "WHERE w.delivered = 0 AND w.owner != ? AND j.status IN ('done', 'failed') "
+                "ORDER BY w.job_id LIMIT ?",
+                (owner, limit)
+            ).fetchall()
+        return [
+            (chat_id, reply_to, json.loads(result) if result else None, error)
+            for chat_id, reply_to, result, error in rows
+        ]
+
+    def prune(self, max_age=3600):
+        """
+        حذف المهام المنتهية الأقدم من max_age بعد تسليم ردودها
+
+        Returns:
+            int: عدد المهام المحذوفة
+        """
+        cutoff = time.time() - max_age
+        with self._write() as db:
+            deleted = db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ? "
+                "AND NOT EXISTS (SELECT 1 FROM job_waiters w WHERE w.job_id = jobs.id AND w.delivered = 0)",
+                (cutoff,)
+            ).rowcount
+            db.execute("DELETE FROM job_waiters WHERE job_id NOT IN (SELECT id FROM jobs)")
+        return deleted
+
+    def stats(self):
+        """
+        Returns:
+            dict: عدد المهام حسب الحالة
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        stats = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        stats.update(dict(rows))
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس زمن كل مرحلة من مراحل الاستعلام وتصديره كسجلات منظمة ومقاييس Prometheus
+
+    with metrics.span('page_load', engine='http'):
+        ...
+
+كل span يُسجل في مدرج تكراري (histogram) حسب المرحلة والمحرك، ويزيد عداد
+الأخطاء إذا خرج باستثناء، ويضاف زمنه إلى تتبع الاستعلام الحالي (Trace) الذي
+يُكتب في السجل كسطر JSON واحد عند انتهاء الاستعلام.
+"""
+
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+logger = logging.getLogger('metrics')
+
+# حدود المدرجات بالثواني: من استعلام الذاكرة المؤقتة حتى تسجيل دخول Selenium بطيء
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    """عداد تراكمي"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """قيمة حالية ترتفع وتنخفض"""
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class GaugeCallback(_Metric):
+    """مقياس تُقرأ قيمته من دالة عند كل تصدير (مثل إشغال مجمع المتصفحات)"""
+    kind = 'gauge'
+
+    def __init__(self, name, description, func):
+        super().__init__(name, description)
+        self.func = func
+
+    def render(self):
+        try:
+            value = float(self.func())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge",
+                f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    """مدرج تكراري بحدود ثابتة"""
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(e[0]), e[1], e[2])) for key, e in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels + ('le',), key + (repr(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels + ('le',), key + ('+Inf',))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram(
+    'lookup_stage_seconds', 'Duration of each lookup stage', ('engine', 'stage')
+)
+STAGE_IN_FLIGHT = Gauge(
+    'lookup_stage_in_flight', 'Lookups currently inside each stage', ('engine', 'stage')
+)
+STAGE_ERRORS = Counter(
+    'lookup_stage_errors_total', 'Exceptions raised inside each stage', ('engine', 'stage', 'error')
+)
+LOOKUP_SECONDS = Histogram(
+    'lookup_seconds', 'End-to-end lookup duration by outcome', ('outcome',)
+)
+LOOKUPS_IN_FLIGHT = Gauge('lookups_in_flight', 'Lookups currently being served')
+
+
+def render():
+    """
+    Returns:
+        str: جميع المقاييس بصيغة Prometheus النصية
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def gauge_callback(name, description, func):
+    """تسجيل مقياس تُقرأ قيمته من func عند كل تصدير"""
+    for metric in REGISTRY:
+        if metric.name == name:
+            REGISTRY.remove(metric)
+            break
+    return GaugeCallback(name, description, func)
+
+
+class Trace:
+    """أزمنة مراحل استعلام واحد"""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.stages = {}
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds, 4)
+
+
+_current = contextvars.ContextVar('lookup_trace', default=None)
+
+
+def start_trace(**fields):
+    """
+    بدء تتبع استعلام جديد في السياق الحالي (ينتقل تلقائياً إلى المهام الفرعية)
+
+    Returns:
+        Trace: التتبع الذي يُمرر إلى finish_trace
+    """
+    trace = Trace(**fields)
+    _current.set(trace)
+    LOOKUPS_IN_FLIGHT.inc()
+    return trace
+
+
+def finish_trace(trace, outcome):
+    """
+    إنهاء التتبع: تسجيل الزمن الكلي وكتابة سطر JSON في السجل
+
+    Args:
+        outcome: نتيجة الاستعلام (cache أو http أو selenium أو نوع الخطأ)
+    """
+    total = time.monotonic() - trace.start
+    LOOKUPS_IN_FLIGHT.dec()
+    LOOKUP_SECONDS.observe(total, outcome=outcome)
+    record = dict(trace.fields, event='lookup', outcome=outcome,
+                  total=round(total, 4), stages=trace.stages)
+    logger.info(json.dumps(record, ensure_ascii=False))
+
+
+def annotate(**fields):
+    """إضافة حقول إلى تتبع الاستعلام الحالي (مثل source='cache')"""
+    trace = _current.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+def observe(stage, seconds, engine='bot'):
+    """تسجيل مرحلة قيس زمنها مسبقاً (مثل انتظار الطابور)"""
+    STAGE_SECONDS.observe(seconds, engine=engine, stage=stage)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage if engine == 'bot' else f"{engine}.{stage}", seconds)
+
+
+@contextmanager
+def span(stage, engine='bot'):
+    """
+    قياس مرحلة: مدرج الزمن، عدد الاستعلامات داخلها، والأخطاء حسب نوعها
+
+    Args:
+        stage: اسم المرحلة
+        engine: المحرك الذي ينفذ المرحلة (bot أو http أو requests أو selenium)
+    """
+    STAGE_IN_FLIGHT.inc(engine=engine, stage=stage)
+    start = time.monotonic()
+    try:
+        yield
+    except BaseException as e:
+        STAGE_ERRORS.inc(engine=engine, stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        STAGE_IN_FLIGHT.dec(engine=engine, stage=stage)
+        observe(stage, time.monotonic() - start, engine)
+
+
+def bind_context(func, *args):
+    """
+    دالة تُنفذ في خيط آخر بنفس السياق الحالي (حتى تصل مراحلها إلى نفس التتبع)
+
+    run_in_executor لا ينقل contextvars تلقائياً.
+    """
+    return functools.partial(contextvars.copy_context().run, func, *args)
+
+
+async def metrics_handler(request):
+    """نقطة /metrics لخادم aiohttp"""
+    return web.Response(text=render(), content_type='text/plain', charset='utf-8')
+
+
+async def start_metrics_server(port):
+    """
+    تشغيل خادم مستقل لنقطة /metrics (في وضع polling لا يوجد خادم ويب)
+
+    Returns:
+        web.AppRunner: يُغلق عبر cleanup() عند الإيقاف
+    """
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', port).start()
+    logger.info(f"نقطة /metrics تستمع على المنفذ {port}")
+    return runner
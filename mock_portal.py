@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بوابة طلاب وهمية محلية لاختبار الأداء بدون الاتصال بالبوابة الحقيقية
+
+تحاكي نموذج تسجيل الدخول (action/username/password) وجدول البيانات الأساسية
+وجدول النتائج بعناوين 'Grade'/'Course'/'التقدير'، مع تأخير وأعطال قابلة للضبط.
+تقبل أيضاً الحقول القديمة (user/pass) حتى يمكن قياس scraper.py.
+"""
+
+import argparse
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="ar" dir="rtl"><head><meta charset="utf-8"><title>بوابة الطلاب</title></head>
+<body>
+<form method="post" action="index.php">
+  <input type="hidden" name="action" value="login">
+  <input type="text" name="username" placeholder="الرقم الجامعي">
+  <input type="password" name="password" placeholder="كلمة المرور">
+  <input type="submit" name="submit" value="دخول">
+</form>
+</body></html>"""
+
+STUDENT_PAGE = """<!DOCTYPE html>
+<html lang="ar" dir="rtl"><head><meta charset="utf-8"><title>بوابة الطلاب</title></head>
+<body>
+<a href="index.php?logout=1">تسجيل الخروج</a>
+<a href="index.php?page=result">النتيجة</a>
+<h3>البيانات الاساسية</h3>
+<table>
+<tr><td>{student_id}</td><td>الرقم الجامعي</td><td>طالب تجريبي</td><td>الاسم</td></tr>
+<tr><td>كلية الحاسوب</td><td>الكلية</td><td>علوم الحاسوب</td><td>القسم</td></tr>
+<tr><td>المستوى الثالث</td><td>المستوى</td><td>منتظم</td><td>الحالة</td></tr>
+</table>
+<table>
+<tr><th>التقدير Grade</th><th>المادة Course</th></tr>
+{rows}
+</table>
+</body></html>"""
+
+GRADES = ['A', 'B+', 'B', 'C+', 'C', 'D']
+
+
+class _Server(ThreadingHTTPServer):
+    # طابور اتصالات كبير حتى لا تظهر تأخيرات إعادة محاولة TCP عند التزامن العالي
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class MockPortal:
+    """خادم HTTP محلي يحاكي بوابة الطلاب"""
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 courses=8, password="123456"):
+        """
+        Args:
+            port: المنفذ المحلي (0 لاختيار منفذ متاح)
+            latency: تأخير كل طلب بالثواني
+            jitter: تذبذب عشوائي يضاف إلى التأخير
+            failure_rate: نسبة الطلبات التي تفشل بخطأ 500
+            courses: عدد المواد في جدول النتائج
+            password: كلمة المرور المقبولة
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.courses = courses
+        self.password = password
+        self.sessions = {}
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self.server = _Server(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/portal/students"
+
+    def start(self):
+        """تشغيل الخادم في خيط خلفي"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def student_page(self, student_id):
+        rows = "\n".join(
+            f"<tr><td>{GRADES[i % len(GRADES)]}</td><td>مادة تجريبية {i + 1}</td></tr>"
+            for i in range(self.courses)
+        )
+        return STUDENT_PAGE.format(student_id=student_id, rows=rows)
+
+    def _handler(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _delay_or_fail(self):
+                with portal._lock:
+                    portal.requests += 1
+                delay = portal.latency + random.uniform(0, portal.jitter)
+                if delay:
+                    time.sleep(delay)
+                if random.random() < portal.failure_rate:
+                    with portal._lock:
+                        portal.failures += 1
+                    self._send(500, "<html><body>Internal Server Error</body></html>")
+                    return True
+                return False
+
+            def _send(self, status, html, cookie=None):
+                body = html.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                if cookie:
+                    self.send_header('Set-Cookie', f"PHPSESSID={cookie}; Path=/")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _session(self):
+                for part in self.headers.get('Cookie', '').split(';'):
+                    name, _, value = part.strip().partition('=')
+                    if name == 'PHPSESSID':
+                        return portal.sessions.get(value)
+                return None
+
+            def do_GET(self):
+                if self._delay_or_fail():
+                    return
+                path = urlparse(self.path).path
+                student_id = self._session()
+                if path.endswith('/index.php') and student_id:
+                    self._send(200, portal.student_page(student_id))
+                else:
+                    self._send(200, LOGIN_PAGE)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                if self._delay_or_fail():
+                    return
+
+                # الحقول الصحيحة مع قبول الحقول القديمة لقياس scraper.py
+                student_id = (form.get('username') or form.get('user') or [''])[0]
+                password = (form.get('password') or form.get('pass') or [''])[0]
+
+                if student_id.isdigit() and password == portal.password:
+                    token = secrets.token_hex(16)
+                    with portal._lock:
+                        portal.sessions[token] = student_id
+                    self._send(200, portal.student_page(student_id), cookie=token)
+                else:
+                    self._send(200, LOGIN_PAGE)
+
+        return Handler
+
+
+def main():
+    """تشغيل البوابة الوهمية من سطر الأوامر"""
+    parser = argparse.ArgumentParser(description="بوابة طلاب وهمية لاختبار الأداء")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help="تأخير كل طلب بالثواني")
+    parser.add_argument('--jitter', type=float, default=0.0, help="تذبذب عشوائي إضافي بالثواني")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="نسبة الطلبات الفاشلة (0-1)")
+    parser.add_argument('--courses', type=int, default=8, help="عدد المواد في جدول النتائج")
+    args = parser.parse_args()
+
+    portal = MockPortal(args.port, args.latency, args.jitter, args.failure_rate, args.courses)
+    print(f"البوابة الوهمية تعمل على: {portal.url}")
+    print(f"لاستخدامها: export PORTAL_URL={portal.url}")
+    try:
+        portal.server.serve_forever()
+    except KeyboardInterrupt:
+        portal.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نموذج موحد لنتيجة استعلام الطالب تشترك فيه جميع محركات الاستخراج
+
+المحركات والذاكرة المؤقتة وقاعدة البيانات تتبادل البيانات كقاموس بمفاتيح
+عربية ('المادة'، 'التقدير')؛ هذه السجلات تعطي نفس البيانات بصيغة مضغوطة
+(__slots__) مع تحويل في الاتجاهين، ورسالة تلغرام واحدة لجميع المحركات.
+"""
+
+from dataclasses import dataclass, field
+
+LOGIN_FAILED = 'فشل تسجيل الدخول. تحقق من الرقم الجامعي وكلمة المرور.'
+
+# مفاتيح قاموس النتيجة كما تستخرجها المحركات
+COURSE = 'المادة'
+GRADE = 'التقدير'
+
+
+@dataclass(slots=True, frozen=True)
+class CourseResult:
+    """تقدير مادة واحدة"""
+    course: str
+    grade: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(course=data[COURSE], grade=data[GRADE])
+
+    def to_dict(self):
+        return {GRADE: self.grade, COURSE: self.course}
+
+
+@dataclass(slots=True)
+class StudentInfo:
+    """البيانات الأساسية للطالب كما تظهر في البوابة (حقل ← قيمة)"""
+    fields: dict = field(default_factory=dict)
+
+    @property
+    def name(self):
+        return self.fields.get('الاسم')
+
+    def to_dict(self):
+        return dict(self.fields)
+
+
+@dataclass(slots=True)
+class LookupResult:
+    """نتيجة استعلام طالب واحد"""
+    success: bool
+    student_id: str = ''
+    student_info: StudentInfo = field(default_factory=StudentInfo)
+    results: list = field(default_factory=list)
+    error: str = ''
+    tier: str = ''
+
+    @classmethod
+    def failure(cls, error=LOGIN_FAILED, student_id=''):
+        return cls(success=False, student_id=student_id, error=error)
+
+    @classmethod
+    def from_dict(cls, data):
+        """تحويل قاموس get_all_data إلى سجل"""
+        return cls(
+            success=bool(data.get('success')),
+            student_id=data.get('student_id', ''),
+            student_info=StudentInfo(dict(data.get('student_info') or {})),
+            results=[CourseResult.from_dict(r) for r in data.get('results') or []],
+            error=data.get('error', ''),
+            tier=data.get('tier', ''),
+        )
+
+    def to_dict(self):
+        """القاموس بالصيغة التي تعيدها get_all_data (للذاكرة المؤقتة وقاعدة البيانات)"""
+        if not self.success:
+            data = {'success': False, 'error': self.error}
+            if self.student_id:
+                data['student_id'] = self.student_id
+            return data
+        data = {
+            'success': True,
+            'student_id': self.student_id,
+            'student_info': self.student_info.to_dict(),
+            'results': [r.to_dict() for r in self.results],
+        }
+        if self.tier:
+            data['tier'] = self.tier
+        return data
+
+
+def format_student_info(fields):
+    """
+    كتلة البيانات الأساسية في رسالة التلغرام
+
+    Args:
+        fields: قاموس الحقول أو StudentInfo
+
+    Returns:
+        str: الكتلة منسقة، أو نص فارغ إذا لم توجد بيانات
+    """
+    if isinstance(fields, StudentInfo):
+        fields = fields.fields
+    if not fields:
+        return ""
+    block = "👤 *البيانات الأساسية:*\n"
+    for key, value in fields.items():
+        block += f"• {key}: {value}\n"
+    return block + "\n"
+
+
+def format_results_message(data):
+    """
+    تنسيق البيانات لإرسالها عبر التلغرام
+
+    Args:
+        data: قاموس get_all_data أو LookupResult
+
+    Returns:
+        str: رسالة منسقة
+    """
+    if isinstance(data, dict):
+        data = LookupResult.from_dict(data)
+
+    if not data.success:
+        return f"❌ {data.error}"
+
+    message = "📊 *نتائج الطالب*\n"
+    message += "=" * 30 + "\n\n"
+
+    # البيانات الأساسية
+    message += format_student_info(data.student_info)
+
+    # النتائج
+    if data.results:
+        message += "📝 *النتائج الدراسية:*\n"
+        message += "─" * 30 + "\n"
+        for i, result in enumerate(data.results, 1):
+            message += f"{i}. {result.course}\n"
+            message += f"   التقدير: *{result.grade}*\n\n"
+    else:
+        message += "⚠️ لا توجد نتائج متاحة حالياً\n"
+
+    return message
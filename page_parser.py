@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تحليل صفحة الطالب باستخدام أسرع محلل متاح واستخراج الجدولين المطلوبين فقط
+
+ترتيب المحللات: selectolax (lexbor) ← lxml ← BeautifulSoup مع SoupStrainer.
+جميعها تعطي نفس المخرجات التي كانت تعطيها دوال BeautifulSoup السابقة.
+"""
+
+import os
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+# الكلمات التي تميز جدول النتائج في عناوين الأعمدة
+RESULTS_MARKERS = ('Grade', 'Course', 'التقدير')
+
+RESULTS_TABLE_XPATH = (
+    "//table[.//th[contains(., 'Grade') or contains(., 'Course') or contains(., 'التقدير')]]"
+)
+
+BACKENDS = ('selectolax', 'lxml', 'bs4')
+
+
+def _default_backend():
+    """اختيار أسرع محلل مثبت (يمكن فرض محلل عبر PARSER_BACKEND)"""
+    preferred = os.getenv('PARSER_BACKEND')
+    if preferred in BACKENDS:
+        return preferred
+    if LexborHTMLParser is not None:
+        return 'selectolax'
+    if lxml is not None:
+        return 'lxml'
+    return 'bs4'
+
+
+BACKEND = _default_backend()
+
+
+class Page:
+    """صفحة محللة مرة واحدة، تُمرر إلى جميع المستخلصات"""
+
+    __slots__ = ('backend', 'tree')
+
+    def __init__(self, html, backend=None):
+        self.backend = backend or BACKEND
+        if self.backend == 'selectolax':
+            self.tree = LexborHTMLParser(html)
+        elif self.backend == 'lxml':
+            self.tree = lxml.html.fromstring(html) if html.strip() else None
+        else:
+            # تحليل الجداول فقط وتجاهل بقية الصفحة
+            self.tree = BeautifulSoup(html, 'lxml' if lxml is not None else 'html.parser',
+                                      parse_only=SoupStrainer('table'))
+
+
+def parse(html, backend=None):
+    """
+    Args:
+        html: نص الصفحة
+        backend: المحلل المطلوب (افتراضياً أسرع محلل متاح)
+
+    Returns:
+        Page: الصفحة المحللة
+    """
+    return Page(html, backend)
+
+
+def _lxml_text(element):
+    # يطابق get_text(strip=True) في BeautifulSoup
+    return ''.join(text.strip() for text in element.itertext())
+
+
+def _first_table(page):
+    if page.backend == 'selectolax':
+        return page.tree.css_first('table')
+    if page.backend == 'lxml':
+        if page.tree is None:
+            return None
+        tables = page.tree.xpath('//table')
+        return tables[0] if tables else None
+    return page.tree.find('table')
+
+
+def _results_tables(page):
+    """الجداول التي تحتوي عناوينها على كلمات جدول النتائج"""
+    if page.backend == 'lxml':
+        return page.tree.xpath(RESULTS_TABLE_XPATH) if page.tree is not None else []
+
+    matches = []
+    if page.backend == 'selectolax':
+        for table in page.tree.css('table'):
+            header_text = ' '.join(th.text(deep=True) for th in table.css('th'))
+            if any(marker in header_text for marker in RESULTS_MARKERS):
+                matches.append(table)
+    else:
+        for table in page.tree.find_all('table'):
+            header_text = ' '.join(th.get_text() for th in table.find_all('th'))
+            if any(marker in header_text for marker in RESULTS_MARKERS):
+                matches.append(table)
+    return matches
+
+
+def _rows(page, table):
+    """صفوف الجدول كقوائم نصوص الخلايا td"""
+    if page.backend == 'selectolax':
+        return [[td.text(strip=True) for td in tr.css('td')] for tr in table.css('tr')]
+    if page.backend == 'lxml':
+        return [[_lxml_text(td) for td in tr.xpath('.//td')] for tr in table.xpath('.//tr')]
+    return [[td.get_text(strip=True) for td in tr.find_all('td')] for tr in table.find_all('tr')]
+
+
+def extract_student_info(page):
+    """
+    استخراج البيانات الأساسية من أول جدول في الصفحة
+
+    Args:
+        page: صفحة من parse()
+
+    Returns:
+        dict: قاموس يحتوي على بيانات الطالب
+    """
+    student_info = {}
+    table = _first_table(page)
+    if table is None:
+        return student_info
+
+    for cells in _rows(page, table):
+        # كل صف يحتوي على 4 خلايا: قيمة، مفتاح، قيمة، مفتاح
+        if len(cells) == 4:
+            value1, key1, value2, key2 = cells
+            if key1 and value1:
+                student_info[key1] = value1
+            if key2 and value2:
+                student_info[key2] = value2
+    return student_info
+
+
+def extract_results(page):
+    """
+    استخراج النتائج من جدول النتائج
+
+    Args:
+        page: صفحة من parse()
+
+    Returns:
+        list: قائمة تحتوي على النتائج
+    """
+    results = []
+    for table in _results_tables(page):
+        for cells in _rows(page, table)[1:]:  # تجاوز صف العناوين
+            if len(cells) >= 2:
+                grade, course = cells[0], cells[1]
+                if grade and course:
+                    results.append({
+                        'التقدير': grade,
+                        'المادة': course
+                    })
+    return results
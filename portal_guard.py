@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+التحكم في الدخول إلى البوابة: حد للتزامن، حد لمعدل الطلبات، وقاطع دائرة
+يوقف الطلبات مؤقتاً عندما تتكرر أعطال الاتصال بالبوابة.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+
+# الأخطاء التي تدل على أن البوابة نفسها معطلة أو بطيئة (وليس خطأ في بيانات الطالب)
+# ConnectionError يشمل engines.PortalUnavailable من المحركات المتزامنة
+PORTAL_FAILURES = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientResponseError,
+)
+
+CLOSED = 'closed'
+OPEN = 'open'
+# بدون شرطة سفلية: الحالة تظهر في رسالة /stats بتنسيق Markdown
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpen(Exception):
+    """البوابة متوقفة مؤقتاً بعد أعطال متكررة"""
+
+
+class PortalGuard:
+    """حارس مشترك أمام جميع محركات الاستخراج"""
+
+    def __init__(self, max_concurrent=8, rate=5.0, burst=10,
+                 failure_threshold=5, reset_timeout=30, half_open_max=1):
+        """
+        Args:
+            max_concurrent: أقصى عدد جلسات متزامنة مع البوابة
+            rate: أقصى عدد جلسات جديدة في الثانية
+            burst: عدد الجلسات المسموح بها دفعة واحدة
+            failure_threshold: عدد الأعطال المتتالية التي تفتح الدائرة
+            reset_timeout: المدة (بالثواني) قبل تجربة البوابة من جديد
+            half_open_max: عدد طلبات التجربة المسموح بها في الحالة نصف المفتوحة
+        """
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.consecutive_failures = 0
+
+        # إحصائيات
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.failures = 0
+        self.times_opened = 0
+
+    def _check_circuit(self):
+        """رفض الطلب فوراً إذا كانت الدائرة مفتوحة"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpen("البوابة غير متاحة حالياً بسبب أعطال متكررة، حاول بعد قليل")
+            self.state = HALF_OPEN
+            self._probes = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max:
+                self.rejected += 1
+                raise CircuitOpen("جاري التحقق من عودة البوابة، حاول بعد قليل")
+            self._probes += 1
+
+    async def _take_token(self):
+        """دلو الرموز: الانتظار حتى يسمح معدل الطلبات بجلسة جديدة"""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def _record_success(self):
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+
+    def _record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        الدخول إلى البوابة ضمن الحدود المسموح بها
+
+        Raises:
+            CircuitOpen: إذا كانت الدائرة مفتوحة
+        """
+        self._check_circuit()
+        async with self._semaphore:
+            await self._take_token()
+            self.in_flight += 1
+            self.admitted += 1
+            try:
+                yield
+            except PORTAL_FAILURES:
+                self._record_failure()
+                raise
+            except BaseException:
+                # خطأ لا علاقة له بحالة البوابة: نعيد فرصة التجربة
+                if self.state == HALF_OPEN:
+                    self._probes = max(0, self._probes - 1)
+                raise
+            else:
+                self._record_success()
+            finally:
+                self.in_flight -= 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: حالة الدائرة والطلبات الجارية والمرفوضة
+        """
+        return {
+            'state': self.state,
+            'in_flight': self.in_flight,
+            'max_concurrent': self.max_concurrent,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'times_opened': self.times_opened,
+        }
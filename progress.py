@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ردود تدريجية أثناء الاستعلام: المحركات تعلن عن كل مرحلة تنتهي، والبوت يعدل
+رسالة الانتظار بما وصل حتى الآن بدلاً من "⏳" ثابتة طوال جلسة المتصفح
+
+    with progress.listen(reply):
+        data = scraper.get_all_data(student_id, password)   # تستدعي progress.report(...)
+
+المستمع يُنقل عبر contextvars مثل تتبع metrics، فيصل إلى خيوط المنفذ
+(metrics.bind_context) دون تمريره في كل دالة.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from models import format_student_info
+
+logger = logging.getLogger(__name__)
+
+# مراحل الاستعلام التي تعلنها المحركات
+LOGGED_IN = 'logged_in'
+STUDENT_INFO = 'student_info'
+
+# أقل مدة بين تعديلين لنفس الرسالة (حدود تلغرام لتعديل الرسائل)
+EDIT_INTERVAL = 1.5
+
+_listener = contextvars.ContextVar('progress_listener', default=None)
+
+
+def report(stage, value=None):
+    """إعلان انتهاء مرحلة للمستمع الحالي إن وجد (آمنة من أي خيط)"""
+    listener = _listener.get()
+    if listener is not None:
+        listener(stage, value)
+
+
+@contextmanager
+def listen(listener):
+    """تمرير مراحل الاستعلام داخل هذا السياق إلى listener(المرحلة، القيمة)"""
+    token = _listener.set(listener)
+    try:
+        yield listener
+    finally:
+        _listener.reset(token)
+
+
+class ProgressiveReply:
+    """
+    رسالة انتظار تُعدل بالمراحل المكتملة، بحد أقصى مرة كل EDIT_INTERVAL ثانية
+
+    المراحل التي تصل خلال المهلة تُدمج في تعديل واحد، والاستعلام الذي ينتهي
+    قبلها (المسار السريع) لا يُرسل أي تعديل إضافي.
+    """
+
+    def __init__(self, message, interval=EDIT_INTERVAL):
+        """
+        Args:
+            message: رسالة الانتظار (تُعد لحظة إرسالها آخر تعديل)
+            interval: أقل مدة بين تعديلين بالثواني
+        """
+        self.message = message
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.stages = set()
+        self.student_info = None
+        self.last_edit = time.monotonic()
+        self.edits = 0
+        self._rendered = None
+        self._task = None
+        self._sending = False
+        self._closed = False
+
+    def __call__(self, stage, value=None):
+        # المحركات المتزامنة تعلن المراحل من خيوط المنفذ
+        self.loop.call_soon_threadsafe(self._update, stage, value)
+
+    def _update(self, stage, value):
+        if self._closed:
+            return
+        if stage not in (LOGGED_IN, STUDENT_INFO):
+            return
+        self.stages.add(stage)
+        if stage == STUDENT_INFO:
+            self.student_info = value or None
+        if self._task is None:
+            self._task = self.loop.create_task(self._flush())
+
+    def render(self):
+        """نص الرسالة بالمراحل المكتملة حتى الآن"""
+        if self.student_info:
+            return (
+                "✅ تم تسجيل الدخول\n\n"
+                + format_student_info(self.student_info)
+                + "⏳ جاري استخراج النتائج الدراسية..."
+            )
+        return "✅ تم تسجيل الدخول\n⏳ جاري استخراج البيانات الأساسية والنتائج..."
+
+    async def _flush(self):
+        try:
+            delay = self.last_edit + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text = self.render()
+            if text == self._rendered:
+                return
+            self._rendered = text
+            self._sending = True
+            await self.edit(text, parse_mode='Markdown')
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"تعذر تحديث رسالة التقدم: {e!r}")
+        finally:
+            self._sending = False
+            self._task = None
+        # مرحلة وصلت أثناء إرسال التعديل
+        if not self._closed and self.render() != self._rendered:
+            self._task = self.loop.create_task(self._flush())
+
+    async def edit(self, text, **kwargs):
+        """تعديل الرسالة بنص آخر (مثل الترتيب في الطابور) مع احتسابه في حد التعديلات"""
+        self.last_edit = time.monotonic()
+        self.edits += 1
+        await self.message.edit_text(text, **kwargs)
+
+    async def close(self):
+        """
+        إيقاف التعديلات قبل إرسال النتيجة النهائية
+
+        التعديل المجدول يُلغى، وإن كان يُرسل الآن ننتظره حتى لا يصل بعد النتيجة.
+        """
+        self._closed = True
+        task = self._task
+        if task is None:
+            return
+        if not self._sending:
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذاكرة مؤقتة لنتائج الطلاب مع مدة صلاحية وإخراج الأقدم استخداماً (LRU)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(student_id, password):
+    """
+    مفتاح الذاكرة المؤقتة: الرقم الجامعي مع بصمة كلمة المرور
+
+    لا تُحفظ كلمة المرور نفسها، وتغييرها يعطي مفتاحاً مختلفاً.
+    """
+    digest = hashlib.sha256(f"{student_id}:{password}".encode('utf-8')).hexdigest()[:16]
+    return f"{student_id}:{digest}"
+
+
+def content_hash(data):
+    """بصمة محتوى النتائج لمعرفة هل تغيرت منذ آخر استخراج"""
+    payload = json.dumps(
+        [data.get('student_info', {}), data.get('results', [])],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def results_hash(results):
+    """بصمة قائمة النتائج فقط (لمعرفة ظهور نتائج جديدة دون تأثر البيانات الأساسية)"""
+    payload = json.dumps(results, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultsCache:
+    """ذاكرة مؤقتة في الذاكرة مع تخزين اختياري في SQLite"""
+
+    def __init__(self, ttl=300, max_entries=1000, max_bytes=16 * 1024 * 1024, db_path=None):
+        """
+        Args:
+            ttl: مدة صلاحية النتيجة بالثواني
+            max_entries: أقصى عدد للطلاب في الذاكرة
+            max_bytes: أقصى حجم تقريبي للبيانات في الذاكرة
+            db_path: مسار ملف SQLite لحفظ النتائج بعد إعادة التشغيل (اختياري)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results_cache ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                "hash TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key, allow_stale=False):
+        """
+        Args:
+            key: مفتاح الطالب من make_key
+            allow_stale: إرجاع النتيجة حتى لو انتهت صلاحيتها (عند تعطل البوابة)
+
+        Returns:
+            dict: البيانات المحفوظة إذا كانت صالحة، وإلا None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._load(key)
+
+            if entry is None or (not allow_stale and now - entry['stored_at'] > self.ttl):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return json.loads(entry['data'])
+
+    def set(self, key, data):
+        """
+        حفظ نتيجة ناجحة
+
+        إذا لم يتغير المحتوى عن النسخة المحفوظة تُجدد صلاحيتها فقط دون إعادة كتابتها.
+
+        Returns:
+            bool: True إذا تغير محتوى النتائج عن النسخة المحفوظة سابقاً
+                (المستدعي يتجاوز حفظها في قاعدة البيانات عندما لم تتغير)
+        """
+        if not data.get('success'):
+            return False
+
+        digest = content_hash(data)
+        now = time.time()
+
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is None and self._db is not None:
+                previous = self._load(key)
+
+            if previous is not None and previous['hash'] == digest:
+                previous['stored_at'] = now
+                self._entries.move_to_end(key)
+                if self._db is not None:
+                    self._db.execute(
+                        "UPDATE results_cache SET stored_at = ? WHERE key = ?", (now, key)
+                    )
+                    self._db.commit()
+                return False
+
+            serialized = json.dumps(data, ensure_ascii=False)
+            self._put(key, {'data': serialized, 'hash': digest, 'stored_at': now})
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results_cache (key, data, hash, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, serialized, digest, now)
+                )
+                self._db.commit()
+        return True
+
+    def invalidate(self, key):
+        """حذف نتيجة طالب لإجبار الاستخراج من جديد"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self._bytes -= len(entry['data'])
+            if self._db is not None:
+                self._db.execute("DELETE FROM results_cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    def _load(self, key):
+        """تحميل نتيجة من SQLite إلى الذاكرة"""
+        row = self._db.execute(
+            "SELECT data, hash, stored_at FROM results_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = {'data': row[0], 'hash': row[1], 'stored_at': row[2]}
+        self._put(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old:
+            self._bytes -= len(old['data'])
+        self._entries[key] = entry
+        self._bytes += len(entry['data'])
+
+        # إخراج الأقدم استخداماً عند تجاوز العدد أو الحجم
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted['data'])
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: عدد الإصابات والإخفاقات والحجم الحالي
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قاعدة بيانات محلية (SQLite بوضع WAL) لبيانات الطلاب وتقديراتهم مع السجل الزمني
+
+كل استخراج ناجح يُحفظ هنا: البيانات الأساسية، والتقدير الحالي لكل مادة، وأي
+تغيير في التقدير كصف جديد مع وقت ظهوره. يمكن بعدها الإجابة عن أسئلة السجل
+و"ما الذي تغير" بدون الاتصال بالبوابة.
+"""
+
+import sqlite3
+import threading
+import time
+
+from results_cache import make_key, results_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY,
+    auth_key TEXT NOT NULL,
+    results_hash TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS student_info (
+    student_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (student_id, field)
+);
+CREATE TABLE IF NOT EXISTS grades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT NOT NULL,
+    course TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    previous_grade TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    current INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS grades_student_course ON grades (student_id, course, current);
+CREATE INDEX IF NOT EXISTS grades_course ON grades (course, current);
+CREATE INDEX IF NOT EXISTS grades_student_seen ON grades (student_id, first_seen);
+"""
+
+
+class ResultsStore:
+    """تخزين دائم لبيانات الطلاب وتقديراتهم"""
+
+    def __init__(self, db_path='results.db'):
+        """
+        Args:
+            db_path: مسار ملف SQLite
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL: القراءة لا تنتظر الكتابة، و NORMAL يكفي مع WAL دون fsync لكل عملية
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def record(self, data, password, fetched_at=None):
+        """
+        حفظ نتيجة استخراج ناجحة
+
+        Args:
+            data: بيانات الطالب من get_all_data
+            password: كلمة المرور (تُحفظ بصمتها فقط للتحقق من طلبات السجل)
+            fetched_at: وقت الاستخراج (افتراضياً الآن)
+
+        Returns:
+            list: التغييرات [{'المادة', 'التقدير', 'التقدير السابق'}]، فارغة إذا لم يتغير شيء
+        """
+        if not data.get('success'):
+            return []
+
+        student_id = data['student_id']
+        now = fetched_at or time.time()
+        results = data.get('results', [])
+        digest = results_hash(results)
+        changes = []
+
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT results_hash FROM students WHERE student_id = ?", (student_id,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT INTO students (student_id, auth_key, results_hash, updated_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(student_id) DO UPDATE SET "
+                "auth_key = excluded.auth_key, results_hash = excluded.results_hash, "
+                "updated_at = excluded.updated_at",
+                (student_id, make_key(student_id, password), digest, now)
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO student_info (student_id, field, value) VALUES (?, ?, ?)",
+                [(student_id, field, value) for field, value in data.get('student_info', {}).items()]
+            )
+
+            if row is not None and row[0] == digest:
+                # لم تتغير النتائج: تحديث وقت آخر مشاهدة فقط
+                self._db.execute(
+                    "UPDATE grades SET last_seen = ? WHERE student_id = ? AND current = 1",
+                    (now, student_id)
+                )
+                return []
+
+            # المادة قد تظهر أكثر من مرة (إعادة المادة)، فلكل مادة قائمة صفوف
+            current = {}
+            for grade_id, course, grade in self._db.execute(
+                "SELECT id, course, grade FROM grades WHERE student_id = ? AND current = 1 ORDER BY id",
+                (student_id,)
+            ):
+                current.setdefault(course, []).append((grade_id, grade))
+            fetched = {}
+            for result in results:
+                fetched.setdefault(result['المادة'], []).append(result['التقدير'])
+
+            for course, grades in fetched.items():
+                previous = current.pop(course, [])
+                # التقديرات التي بقيت كما هي تُطابق أولاً، فلا يظهر تغيير وهمي بين صفين
+                matches = []
+                for grade in grades:
+                    match = next((row for row in previous if row[1] == grade), None)
+                    if match is None:
+                        matches.append(None)
+                    else:
+                        previous.remove(match)
+                        matches.append(match)
+                for grade, match in zip(grades, matches):
+                    if match is not None:
+                        self._db.execute("UPDATE grades SET last_seen = ? WHERE id = ?", (now, match[0]))
+                        continue
+                    # ما تبقى من الصفوف القديمة يقابل التقديرات المعدلة بالترتيب
+                    old = previous.pop(0) if previous else None
+                    if old is not None:
+                        self._db.execute("UPDATE grades SET current = 0 WHERE id = ?", (old[0],))
+                    previous_grade = old[1] if old else None
+                    self._db.execute(
+                        "INSERT INTO grades (student_id, course, grade, previous_grade, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (student_id, course, grade, previous_grade, now, now)
+                    )
+                    changes.append({'المادة': course, 'التقدير': grade, 'التقدير السابق': previous_grade})
+                # صفوف لم تعد تظهر (إعادة حُذفت من الصفحة)
+                current[course] = previous
+
+            # مواد لم تعد تظهر في صفحة الطالب تبقى في السجل فقط
+            self._db.executemany(
+                "UPDATE grades SET current = 0 WHERE id = ?",
+                [(grade_id,) for rows in current.values() for grade_id, _ in rows]
+            )
+        return changes
+
+    def authorized(self, student_id, password):
+        """التحقق من أن كلمة المرور هي نفسها المستخدمة في آخر استخراج ناجح"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT auth_key FROM students WHERE student_id = ?", (student_id,)
+            ).fetchone()
+        return row is not None and row[0] == make_key(student_id, password)
+
+    def latest(self, student_id):
+        """
+        آخر بيانات محفوظة للطالب بنفس صيغة get_all_data
+
+        Returns:
+            dict: البيانات مع 'updated_at'، أو None إذا لم يُستخرج الطالب من قبل
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at FROM students WHERE student_id = ?", (student_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            info = self._db.execute(
+                "SELECT field, value FROM student_info WHERE student_id = ?", (student_id,)
+            ).fetchall()
+            grades = self._db.execute(
+                "SELECT course, grade FROM grades WHERE student_id = ? AND current = 1 ORDER BY id",
+                (student_id,)
+            ).fetchall()
+        return {
+            'success': True,
+            'student_id': student_id,
+            'student_info': dict(info),
+            'results': [{'التقدير': grade, 'المادة': course} for course, grade in grades],
+            'updated_at': row[0],
+        }
+
+    def history(self, student_id, course=None):
+        """
+        سجل تقديرات الطالب مرتباً زمنياً
+
+        Args:
+            course: مادة واحدة فقط (اختياري)
+
+        Returns:
+            list: [{'المادة', 'التقدير', 'التقدير السابق', 'first_seen', 'last_seen'}]
+        """
+        query = (
+            "SELECT course, grade, previous_grade, first_seen, last_seen FROM grades "
+            "WHERE student_id = ?"
+        )
+        params = [student_id]
+        if course is not None:
+            query += " AND course = ?"
+            params.append(course)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY first_seen, id", params).fetchall()
+        return [
+            {'المادة': c, 'التقدير': g, 'التقدير السابق': p, 'first_seen': f, 'last_seen': l}
+            for c, g, p, f, l in rows
+        ]
+
+    def changes(self, student_id, since=None):
+        """
+        ما الذي تغير: التقديرات الجديدة أو المعدلة منذ وقت معين
+
+        Args:
+            since: وقت البداية (افتراضياً آخر دفعة تغييرات للطالب)
+
+        Returns:
+            list: [{'المادة', 'التقدير', 'التقدير السابق', 'first_seen'}]
+        """
+        with self._lock:
+            if since is None:
+                row = self._db.execute(
+                    "SELECT MAX(first_seen) FROM grades WHERE student_id = ?", (student_id,)
+                ).fetchone()
+                if row[0] is None:
+                    return []
+                since = row[0]
+            rows = self._db.execute(
+                "SELECT course, grade, previous_grade, first_seen FROM grades "
+                "WHERE student_id = ? AND first_seen >= ? ORDER BY first_seen, id",
+                (student_id, since)
+            ).fetchall()
+        return [
+            {'المادة': c, 'التقدير': g, 'التقدير السابق': p, 'first_seen': f}
+            for c, g, p, f in rows
+        ]
+
+    def course_grades(self, course):
+        """
+        التقديرات الحالية لمادة عند جميع الطلاب المحفوظين
+
+        Returns:
+            list: [(الرقم الجامعي، التقدير)]
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT student_id, grade FROM grades WHERE course = ? AND current = 1 ORDER BY student_id",
+                (course,)
+            ).fetchall()
+
+    def stats(self):
+        """
+        Returns:
+            dict: عدد الطلاب وعدد صفوف التقديرات
+        """
+        with self._lock:
+            students = self._db.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+            grades = self._db.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+        return {'students': students, 'grades': grades}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
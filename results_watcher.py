@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+متابعة نتائج الطلاب المشتركين في الخلفية وإرسال إشعار عند ظهور نتائج جديدة
+
+يفحص المراقب كل طالب مشترك مرة كل interval ثانية (مع تذبذب عشوائي حتى لا
+تتزامن الفحوصات)، ويوزع الفحوصات على الوقت بحد أقصى rate فحص في الثانية.
+يُرسل الإشعار فقط عندما تتغير بصمة قائمة النتائج عن آخر لقطة.
+"""
+
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from results_cache import results_hash
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """اشتراك محادثة في متابعة نتائج طالب"""
+
+    __slots__ = ('chat_id', 'student_id', 'password', 'last_hash', 'next_check')
+
+    def __init__(self, chat_id, student_id, password, last_hash, next_check):
+        self.chat_id = chat_id
+        self.student_id = student_id
+        self.password = password
+        self.last_hash = last_hash
+        self.next_check = next_check
+
+
+class SubscriptionStore:
+    """الاشتراكات في SQLite، مع تشفير كلمات المرور (Fernet)"""
+
+    def __init__(self, db_path=':memory:', key=None):
+        """
+        Args:
+            db_path: مسار ملف SQLite
+            key: مفتاح Fernet (إذا لم يُحدد يُولد مفتاح مؤقت، وتُحذف الاشتراكات
+                التي لا يمكن فك تشفيرها بعد إعادة التشغيل)
+        """
+        if not key:
+            key = Fernet.generate_key()
+            if db_path != ':memory:':
+                logger.warning("لم يتم تحديد SESSION_KEY، لن تبقى الاشتراكات بعد إعادة التشغيل")
+        self._fernet = Fernet(key)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            "chat_id INTEGER NOT NULL, student_id TEXT NOT NULL, password BLOB NOT NULL, "
+            "last_hash TEXT, next_check REAL NOT NULL, "
+            "PRIMARY KEY (chat_id, student_id))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS subscriptions_next_check ON subscriptions (next_check)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS subscriptions_student ON subscriptions (student_id)"
+        )
+        self._db.commit()
+
+    def add(self, chat_id, student_id, password, last_hash, next_check):
+        """إضافة اشتراك أو تحديثه"""
+        token = self._fernet.encrypt(password.encode('utf-8'))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO subscriptions "
+                "(chat_id, student_id, password, last_hash, next_check) VALUES (?, ?, ?, ?, ?)",
+                (chat_id, student_id, token, last_hash, next_check)
+            )
+            self._db.commit()
+
+    def remove(self, chat_id, student_id=None):
+        """
+        إلغاء اشتراك طالب، أو جميع اشتراكات المحادثة إذا لم يُحدد الطالب
+
+        Returns:
+            int: عدد الاشتراكات المحذوفة
+        """
+        with self._lock:
+            if student_id is None:
+                cursor = self._db.execute("DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,))
+            else:
+                cursor = self._db.execute(
+                    "DELETE FROM subscriptions WHERE chat_id = ? AND student_id = ?",
+                    (chat_id, student_id)
+                )
+            self._db.commit()
+            return cursor.rowcount
+
+    def for_chat(self, chat_id):
+        """
+        Returns:
+            list: الأرقام الجامعية التي تتابعها المحادثة
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT student_id FROM subscriptions WHERE chat_id = ? ORDER BY student_id",
+                (chat_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def due(self, now, limit=50):
+        """
+        Returns:
+            list: الاشتراكات التي حان موعد فحصها (الأقدم أولاً)
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT chat_id, student_id, password, last_hash, next_check FROM subscriptions "
+                "WHERE next_check <= ? ORDER BY next_check LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return self._decrypt(rows)
+
+    def for_student(self, student_id):
+        """
+        Returns:
+            list: جميع اشتراكات الطالب في كل المحادثات
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT chat_id, student_id, password, last_hash, next_check FROM subscriptions "
+                "WHERE student_id = ?",
+                (student_id,)
+            ).fetchall()
+        return self._decrypt(rows)
+
+    def _decrypt(self, rows):
+        subscriptions = []
+        for chat_id, student_id, token, last_hash, next_check in rows:
+            try:
+                password = self._fernet.decrypt(token).decode('utf-8')
+            except InvalidToken:
+                logger.warning(f"تعذر فك تشفير اشتراك الطالب {student_id}، سيتم حذفه")
+                self.remove(chat_id, student_id)
+                continue
+            subscriptions.append(Subscription(chat_id, student_id, password, last_hash, next_check))
+        return subscriptions
+
+    def next_due(self):
+        """
+        Returns:
+            float: أقرب موعد فحص، أو None إذا لم توجد اشتراكات
+        """
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_check) FROM subscriptions").fetchone()
+        return row[0]
+
+    def update(self, subscription, last_hash, next_check):
+        """حفظ بصمة آخر فحص وموعد الفحص التالي"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE subscriptions SET last_hash = ?, next_check = ? "
+                "WHERE chat_id = ? AND student_id = ?",
+                (last_hash, next_check, subscription.chat_id, subscription.student_id)
+            )
+            self._db.commit()
+
+    def swap_hash(self, subscription, last_hash):
+        """
+        تحديث بصمة الاشتراك إذا كانت مختلفة (بدون تغيير موعد الفحص)
+
+        Returns:
+            bool: True إذا تغيرت البصمة، False إذا سبقه تحديث آخر بنفس البصمة
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE subscriptions SET last_hash = ? "
+                "WHERE chat_id = ? AND student_id = ? AND last_hash IS NOT ?",
+                (last_hash, subscription.chat_id, subscription.student_id, last_hash)
+            )
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class ResultsWatcher:
+    """مجدول في الخلفية يفحص الطلاب المشتركين ويرسل إشعاراً عند تغير النتائج"""
+
+    def __init__(self, store, fetch, notify, interval=1800, jitter=0.2, rate=0.5, idle_sleep=30):
+        """
+        Args:
+            store: مخزن الاشتراكات SubscriptionStore
+            fetch: دالة غير متزامنة fetch(chat_id, student_id, password) تعيد بيانات الطالب
+            notify: دالة غير متزامنة notify(subscription, data) لإرسال الإشعار
+            interval: المدة بين فحصين لنفس الطالب بالثواني
+            jitter: نسبة التذبذب العشوائي في المدة (0.2 = ±20%)
+            rate: أقصى عدد فحوصات في الثانية لجميع المشتركين
+            idle_sleep: أقصى مدة انتظار عندما لا يوجد فحص مستحق
+        """
+        self.store = store
+        self.fetch = fetch
+        self.notify = notify
+        self.interval = interval
+        self.jitter = jitter
+        self.spacing = 1.0 / rate if rate > 0 else 0.0
+        self.idle_sleep = idle_sleep
+        self._task = None
+
+        self.checks = 0
+        self.changes = 0
+        self.errors = 0
+
+    def next_check(self, now=None):
+        """موعد الفحص التالي مع تذبذب عشوائي"""
+        now = time.time() if now is None else now
+        return now + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def first_check(self, now=None):
+        """موعد أول فحص لاشتراك جديد: موزع عشوائياً على المدة كاملة"""
+        now = time.time() if now is None else now
+        return now + random.uniform(self.interval * (1 - self.jitter), self.interval)
+
+    def subscribe(self, chat_id, student_id, password, data):
+        """
+        إضافة اشتراك بلقطة النتائج الحالية كأساس للمقارنة
+
+        Args:
+            data: بيانات الطالب الحالية (نتيجة استعلام ناجح)
+        """
+        self.store.add(
+            chat_id, student_id, password,
+            results_hash(data.get('results', [])), self.first_check()
+        )
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # قراءات SQLite في خيط منفصل حتى لا تحجز حلقة الأحداث
+                due = await asyncio.to_thread(self.store.due, time.time())
+                if not due:
+                    next_due = await asyncio.to_thread(self.store.next_due)
+                    wait = self.idle_sleep if next_due is None else next_due - time.time()
+                    await asyncio.sleep(min(max(wait, 1), self.idle_sleep))
+                    continue
+
+                for subscription in due:
+                    await self.check(subscription)
+                    # توزيع الفحوصات على الوقت بدلاً من إرسالها دفعة واحدة
+                    await asyncio.sleep(self.spacing)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"خطأ في مراقب النتائج: {str(e)}", exc_info=True)
+                await asyncio.sleep(self.idle_sleep)
+
+    async def publish(self, student_id, password, data):
+        """
+        إشعار المشتركين في الطالب إذا اختلفت نتائجه عن آخر لقطة لديهم
+
+        يستدعيها البوت فور اكتشاف نتائج جديدة في أي استعلام، فيصل الإشعار دون
+        انتظار موعد الفحص التالي. الاشتراكات بكلمة مرور مختلفة لا تستلم البيانات.
+
+        Returns:
+            int: عدد الاشتراكات التي أُرسل لها إشعار
+        """
+        digest = results_hash(data.get('results', []))
+        notified = 0
+        for subscription in await asyncio.to_thread(self.store.for_student, student_id):
+            if subscription.password != password or subscription.last_hash == digest:
+                continue
+            # تحديث اللقطة قبل الإرسال: فحص متزامن سبق إليها أرسل الإشعار بنفسه
+            if not await asyncio.to_thread(self.store.swap_hash, subscription, digest):
+                continue
+            self.changes += 1
+            notified += 1
+            logger.info(f"تغيرت نتائج الطالب {student_id}، إرسال إشعار للمحادثة {subscription.chat_id}")
+            try:
+                await self.notify(subscription, data)
+            except Exception as e:
+                logger.warning(f"تعذر إرسال الإشعار للمحادثة {subscription.chat_id}: {str(e)}")
+        return notified
+
+    async def check(self, subscription):
+        """
+        فحص طالب واحد وإرسال إشعار إذا تغيرت النتائج
+
+        Returns:
+            bool: True إذا تغيرت النتائج منذ آخر فحص لهذا الاشتراك
+        """
+        self.checks += 1
+        try:
+            data = await self.fetch(subscription.chat_id, subscription.student_id, subscription.password)
+        except Exception as e:
+            # البوابة معطلة أو مشغولة: نؤجل الفحص دون تغيير اللقطة
+            self.errors += 1
+            logger.warning(f"تعذر فحص نتائج الطالب {subscription.student_id}: {e!r}")
+            await asyncio.to_thread(self.store.update, subscription, subscription.last_hash, self.next_check())
+            return False
+
+        if not data.get('success'):
+            self.errors += 1
+            await asyncio.to_thread(self.store.update, subscription, subscription.last_hash, self.next_check())
+            return False
+
+        # الإشعار ربما أُرسل أثناء fetch نفسها (publish من البوت)، فلا يتكرر
+        await self.publish(subscription.student_id, subscription.password, data)
+        digest = results_hash(data.get('results', []))
+        await asyncio.to_thread(self.store.update, subscription, digest, self.next_check())
+        return digest != subscription.last_hash
+
+    def stats(self):
+        """
+        Returns:
+            dict: عدد المشتركين والفحوصات والتغييرات
+        """
+        return {
+            'subscriptions': self.store.count(),
+            'checks': self.checks,
+            'changes': self.changes,
+            'errors': self.errors,
+        }
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+جدولة عادلة لعمليات الاستخراج بين المستخدمين
+
+- دلو رموز لكل محادثة: المستخدم الواحد لا يستطيع إغراق البوت بالطلبات.
+- ميزانية تزامن عامة لجميع عمليات الاستخراج.
+- مساران بأولويتين: استعلامات المستخدمين (INTERACTIVE) قبل التحديثات في الخلفية
+  (BACKGROUND: المتابعة و /batch)، مع حد لنصيب الخلفية حتى يبقى مكان للمستخدمين.
+- داخل كل مسار تُخدم المحادثات بالتناوب (round-robin)، فلا يحجز مستخدم لديه عدة
+  طلبات الطابور عن غيره.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+LANE_NAMES = ('interactive', 'background')
+
+# أقل مدة بين إشعارين بتغير الترتيب في الطابور (حدود تلغرام لتعديل الرسائل)
+POSITION_INTERVAL = 3
+
+
+class RateLimited(Exception):
+    """تجاوزت المحادثة معدل الطلبات المسموح"""
+
+
+class TokenBucket:
+    """دلو رموز لمحادثة واحدة"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """
+        Returns:
+            float: 0 إذا أُخذ رمز، وإلا عدد الثواني حتى يتوفر رمز
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ('chat_id', 'lane', 'future')
+
+    def __init__(self, chat_id, lane, future):
+        self.chat_id = chat_id
+        self.lane = lane
+        self.future = future
+
+
+class FairScheduler:
+    """مجدول مشترك أمام طبقة الاستخراج (يعمل داخل حلقة الأحداث)"""
+
+    def __init__(self, max_concurrent=8, user_rate=0.1, user_burst=3,
+                 background_share=0.5, max_buckets=10000):
+        """
+        Args:
+            max_concurrent: أقصى عدد عمليات استخراج متزامنة لجميع المستخدمين
+            user_rate: عدد الطلبات المسموح بها لكل محادثة في الثانية (0 لتعطيل الحد)
+            user_burst: عدد الطلبات المسموح بها دفعة واحدة لكل محادثة
+            background_share: أقصى نسبة من max_concurrent لمسار الخلفية
+            max_buckets: أقصى عدد دلاء محفوظة قبل حذف الممتلئة منها
+        """
+        self.max_concurrent = max_concurrent
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.background_limit = max(1, int(max_concurrent * background_share))
+        self.max_buckets = max_buckets
+
+        self._buckets = {}
+        # لكل مسار: المحادثة ← طلباتها المنتظرة، بترتيب دورها في التناوب
+        self._lanes = (OrderedDict(), OrderedDict())
+        self.running = [0, 0]
+
+        # إحصائيات
+        self.admitted = [0, 0]
+        self.queued = [0, 0]
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _check_rate(self, chat_id):
+        """
+        Raises:
+            RateLimited: إذا لم يبقَ في دلو المحادثة رموز
+        """
+        if self.user_rate <= 0:
+            return
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune_buckets()
+            bucket = self._buckets[chat_id] = TokenBucket(self.user_rate, self.user_burst)
+        wait = bucket.take()
+        if wait:
+            self.rate_limited += 1
+            raise RateLimited(
+                f"أرسلت طلبات كثيرة خلال وقت قصير، انتظر {math.ceil(wait)} ثانية ثم أعد المحاولة"
+            )
+
+    def _prune_buckets(self):
+        """حذف دلاء المحادثات التي امتلأت من جديد (لم تطلب شيئاً مؤخراً)"""
+        full_after = self.user_burst / self.user_rate
+        now = time.monotonic()
+        for chat_id in [c for c, b in self._buckets.items() if now - b.updated >= full_after]:
+            del self._buckets[chat_id]
+
+    def _can_run(self, lane):
+        if sum(self.running) >= self.max_concurrent:
+            return False
+        return lane == INTERACTIVE or self.running[BACKGROUND] < self.background_limit
+
+    def _waiting_ahead(self, lane):
+        """هل توجد طلبات منتظرة بنفس الأولوية أو أعلى"""
+        return any(self._lanes[i] for i in range(lane + 1))
+
+    def _dispatch(self):
+        """تشغيل المنتظرين ما دامت الميزانية تسمح: الأولوية أولاً ثم التناوب بين المحادثات"""
+        for lane, queue in enumerate(self._lanes):
+            while queue and self._can_run(lane):
+                chat_id, waiters = next(iter(queue.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    # دور المحادثة التالي بعد بقية المحادثات
+                    queue.move_to_end(chat_id)
+                else:
+                    del queue[chat_id]
+                if waiter.future.done():
+                    continue
+                self.running[lane] += 1
+                waiter.future.set_result(None)
+
+    def _remove(self, waiter):
+        queue = self._lanes[waiter.lane]
+        waiters = queue.get(waiter.chat_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del queue[waiter.chat_id]
+
+    def _release(self, lane):
+        self.running[lane] -= 1
+        self._dispatch()
+
+    def position(self, waiter):
+        """
+        ترتيب الطلب في الطابور (1 = التالي)، بنفس ترتيب _dispatch
+
+        Returns:
+            int: الترتيب، أو 0 إذا لم يعد الطلب في الطابور
+        """
+        queue = self._lanes[waiter.lane]
+        waiters = queue.get(waiter.chat_id)
+        if waiters is None or waiter not in waiters:
+            return 0
+        index = waiters.index(waiter)
+        ahead = sum(len(w) for lane in self._lanes[:waiter.lane] for w in lane.values())
+        before_me = True
+        for chat_id, others in queue.items():
+            if chat_id == waiter.chat_id:
+                before_me = False
+                ahead += index
+                continue
+            # في كل دورة تناوب تأخذ كل محادثة طلباً واحداً
+            ahead += min(len(others), index + 1 if before_me else index)
+        return ahead + 1
+
+    @asynccontextmanager
+    async def slot(self, chat_id, lane=INTERACTIVE, on_position=None):
+        """
+        حجز مكان لعملية استخراج واحدة
+
+        Args:
+            chat_id: المحادثة صاحبة الطلب
+            lane: INTERACTIVE أو BACKGROUND
+            on_position: دالة غير متزامنة on_position(الترتيب) تُستدعى عند تغير
+                ترتيب الطلب في الطابور (كل POSITION_INTERVAL ثانية على الأكثر)
+
+        Raises:
+            RateLimited: إذا تجاوزت المحادثة معدل الطلبات (المسار التفاعلي فقط)
+        """
+        if lane == INTERACTIVE:
+            self._check_rate(chat_id)
+
+        start = time.monotonic()
+        if not self._waiting_ahead(lane) and self._can_run(lane):
+            self.running[lane] += 1
+        else:
+            await self._wait(chat_id, lane, on_position)
+
+        waited = time.monotonic() - start
+        metrics.observe('schedule_wait', waited)
+        self.admitted[lane] += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    async def _wait(self, chat_id, lane, on_position):
+        """الانتظار في الطابور حتى يمنح _dispatch مكاناً"""
+        waiter = _Waiter(chat_id, lane, asyncio.get_running_loop().create_future())
+        self._lanes[lane].setdefault(chat_id, deque()).append(waiter)
+        self.queued[lane] += 1
+        reported = None
+        try:
+            while not waiter.future.done():
+                position = self.position(waiter)
+                if on_position is not None and position and position != reported:
+                    reported = position
+                    try:
+                        await on_position(position)
+                    except Exception as e:
+                        logger.warning(f"تعذر إرسال الترتيب في الطابور: {e!r}")
+                    if waiter.future.done():
+                        break
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), POSITION_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # حصل على مكان ثم أُلغي قبل استخدامه
+                self._release(lane)
+            else:
+                waiter.future.cancel()
+                self._remove(waiter)
+            raise
+
+    def stats(self):
+        """
+        Returns:
+            dict: الجاري والمنتظر لكل مسار، والطلبات المرفوضة، ومتوسط الانتظار
+        """
+        admitted = sum(self.admitted)
+        return {
+            'max_concurrent': self.max_concurrent,
+            'background_limit': self.background_limit,
+            'running': dict(zip(LANE_NAMES, self.running)),
+            'waiting': {
+                name: sum(len(w) for w in queue.values())
+                for name, queue in zip(LANE_NAMES, self._lanes)
+            },
+            'admitted': dict(zip(LANE_NAMES, self.admitted)),
+            'queued': dict(zip(LANE_NAMES, self.queued)),
+            'rate_limited': self.rate_limited,
+            'avg_wait': self.total_wait / admitted if admitted else 0.0,
+            'max_wait': self.max_wait,
+        }
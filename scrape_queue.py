@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تشغيل عمليات الاستخراج خارج حلقة asyncio مع حد للتزامن وطابور لكل مستخدم
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class UserQueueFull(Exception):
+    """لدى المستخدم عدد كبير من الطلبات قيد الانتظار"""
+
+
+class ScrapeExecutor:
+    """منفذ محدود لعمليات الاستخراج المتزامنة (blocking)"""
+
+    def __init__(self, max_workers=2, max_pending_per_user=3):
+        """
+        Args:
+            max_workers: أقصى عدد لعمليات الاستخراج المتزامنة
+            max_pending_per_user: أقصى عدد طلبات معلقة لكل مستخدم
+        """
+        self.max_workers = max_workers
+        self.max_pending_per_user = max_pending_per_user
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self._user_locks = {}
+        self._user_pending = {}
+        self.running = 0
+        self.queued = 0
+
+    @asynccontextmanager
+    async def queue(self, user_id):
+        """
+        انتظار دور المستخدم: طلباته تنفذ بالترتيب واحداً تلو الآخر
+
+        يُحجز الدور قبل أي مورد مشترك (مكان في المجدول أو حارس البوابة) حتى لا
+        يحتجزه الطلب وهو ينتظر طلبه السابق.
+
+        Args:
+            user_id: معرف المستخدم، أو None لطلبات الخلفية (بلا دور ولا حد)
+
+        Raises:
+            UserQueueFull: إذا تجاوز المستخدم الحد المسموح من الطلبات المعلقة
+        """
+        if user_id is None:
+            yield
+            return
+
+        pending = self._user_pending.get(user_id, 0)
+        if pending >= self.max_pending_per_user:
+            raise UserQueueFull("لديك طلبات قيد المعالجة بالفعل، انتظر حتى تكتمل")
+
+        self._user_pending[user_id] = pending + 1
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        self.queued += 1
+        started = False
+        try:
+            async with lock:
+                self.queued -= 1
+                started = True
+                yield
+        finally:
+            if not started:
+                self.queued -= 1
+            self._user_pending[user_id] -= 1
+            if not self._user_pending[user_id]:
+                del self._user_pending[user_id]
+                self._user_locks.pop(user_id, None)
+
+    async def run(self, func, *args):
+        """
+        تنفيذ دالة متزامنة في خيط منفصل (دون طابور المستخدم)
+
+        Returns:
+            نتيجة الدالة
+        """
+        submitted = time.monotonic()
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, metrics.bind_context(self._timed, submitted, func, *args)
+            )
+        finally:
+            self.running -= 1
+
+    async def submit(self, user_id, func, *args):
+        """
+        تنفيذ دالة متزامنة في خيط منفصل بعد دور المستخدم
+
+        طلبات المستخدم الواحد تنفذ بالترتيب واحداً تلو الآخر، بينما تتوزع
+        طلبات المستخدمين المختلفين على خيوط المنفذ.
+
+        Args:
+            user_id: معرف المستخدم أو المحادثة
+            func: الدالة المتزامنة المراد تنفيذها
+            *args: معاملات الدالة
+
+        Returns:
+            نتيجة الدالة
+
+        Raises:
+            UserQueueFull: إذا تجاوز المستخدم الحد المسموح من الطلبات المعلقة
+        """
+        async with self.queue(user_id):
+            return await self.run(func, *args)
+
+    @staticmethod
+    def _timed(submitted, func, *args):
+        # زمن الانتظار في الطابور: من الإرسال حتى بدء التنفيذ في خيط
+        metrics.observe('queue_wait', time.monotonic() - submitted)
+        return func(*args)
+
+    def stats(self):
+        """
+        Returns:
+            dict: عدد العمليات الجارية والمنتظرة وعدد المستخدمين النشطين
+        """
+        return {
+            'max_workers': self.max_workers,
+            'running': self.running,
+            'queued': self.queued,
+            'users': len(self._user_pending),
+        }
+
+    def shutdown(self):
+        """إيقاف المنفذ دون انتظار العمليات المعلقة"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
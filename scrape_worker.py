@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+عمليات عمال الاستخراج: كل عملية تحجز مهام من طابور job_queue وتنفذها بمحركها الخاص
+
+يشغلها البوت تلقائياً عند JOB_QUEUE=1 (عدد SCRAPE_WORKERS)، أو كخدمة مستقلة:
+
+    python scrape_worker.py --workers 4
+
+كل عامل عملية Python مستقلة بمجمع متصفحات وجلسة HTTP خاصة به، فلا يتقاسم
+العمال قفل GIL ولا ذاكرة Chrome مع البوت.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+import engines
+from job_queue import JobQueue
+from session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+# المدة بين فحصين للطابور عندما يكون فارغاً
+IDLE_POLL = 0.2
+# أقل مدة بين إعادتي تشغيل لنفس العامل (حتى لا يتكرر تعطل فوري بلا توقف)
+RESTART_DELAY = 5
+
+
+def run(worker_id, db_path, key, engine=None, stop=None):
+    """
+    حلقة العامل: حجز مهمة، استخراجها، وحفظ النتيجة، حتى يُضبط stop
+
+    Args:
+        worker_id: اسم العامل (يظهر في جدول المهام)
+        db_path: ملف طابور المهام
+        key: مفتاح Fernet المشترك مع البوت
+        engine: اسم المحرك (افتراضياً SCRAPER_ENGINE)
+        stop: multiprocessing.Event لإيقاف العامل بعد المهمة الحالية
+    """
+    logging.basicConfig(
+        format=f'%(asctime)s - {worker_id} - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    name = engines.resolve(engine)
+    if engines.is_async(name):
+        raise ValueError(f"المحرك {name} غير متزامن ولا يعمل داخل العامل")
+    queue = JobQueue(
+        db_path, key=key,
+        lease=int(os.getenv('JOB_LEASE', '180')),
+        max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    )
+    sessions = SessionStore(
+        key=key,
+        ttl=int(os.getenv('SESSION_TTL', '1800')),
+        db_path=os.getenv('SESSION_DB_PATH') or None
+    )
+    pool = None
+    if name in ('tiered', 'selenium'):
+        from driver_pool import DriverPool
+        pool = DriverPool(size=int(os.getenv('WORKER_POOL_SIZE', '1')))
+    logger.info(f"بدء العامل {worker_id} بمحرك {name}")
+
+    try:
+        while stop is None or not stop.is_set():
+            job = queue.claim(worker_id)
+            if job is None:
+                time.sleep(IDLE_POLL)
+                continue
+
+            scraper = engines.create_engine(name, pool=pool, sessions=sessions)
+            try:
+                data = scraper.get_all_data(job.student_id, job.password)
+                data.setdefault('tier', name)
+                queue.complete(job.id, data)
+            except Exception as e:
+                # البوابة المعطلة لا تُعاد محاولتها: البوت ينتظر النتيجة ويحسب العطل
+                retry = queue.fail(job.id, f"{type(e).__name__}: {str(e)}",
+                                   retry=not isinstance(e, engines.PortalUnavailable))
+                logger.warning(
+                    f"فشلت المهمة {job.id} للطالب {job.student_id} (المحاولة {job.attempts}): {e!r}"
+                    + ("، ستُعاد" if retry else "")
+                )
+            finally:
+                try:
+                    scraper.close()
+                except Exception:
+                    pass
+    finally:
+        if pool is not None:
+            pool.close()
+        sessions.close()
+        queue.close()
+        logger.info(f"توقف العامل {worker_id}")
+
+
+def spawn_worker(index, db_path, key, engine, stop):
+    """
+    تشغيل عملية عامل واحدة
+
+    تُستخدم طريقة spawn حتى لا ترث العملية حلقة الأحداث وخيوط البوت.
+    """
+    process = multiprocessing.get_context('spawn').Process(
+        target=run, args=(f"worker-{index + 1}", db_path, key, engine, stop),
+        name=f"scrape-worker-{index + 1}", daemon=True
+    )
+    process.start()
+    return process
+
+
+def start_workers(count, db_path, key, engine=None):
+    """
+    تشغيل عمليات العمال
+
+    Returns:
+        tuple: (قائمة العمليات، حدث الإيقاف)
+    """
+    stop = multiprocessing.get_context('spawn').Event()
+    processes = [spawn_worker(i, db_path, key, engine, stop) for i in range(count)]
+    return processes, stop
+
+
+def stop_workers(processes, stop, timeout=30):
+    """إيقاف العمال بعد إنهاء مهامهم الحالية (المهام غير المكتملة تعود للطابور)"""
+    stop.set()
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.terminate()
+            process.join(5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="تشغيل عمال الاستخراج على طابور المهام")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SCRAPE_WORKERS', '2')))
+    parser.add_argument('--db', default=os.getenv('JOB_DB_PATH', 'jobs.db'))
+    parser.add_argument('--engine', choices=list(engines.ENGINES), default=engines.DEFAULT_ENGINE)
+    parser.add_argument('--exit-with-parent', action='store_true',
+                        help="الإيقاف عند توقف العملية التي شغلت العمال (يستخدمه bot.py)")
+    args = parser.parse_args()
+    parent = os.getppid()
+
+    key = os.getenv('SESSION_KEY')
+    if not key:
+        parser.error("يجب تحديد SESSION_KEY (نفس مفتاح البوت)")
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    processes, stop = start_workers(args.workers, args.db, key, args.engine)
+    restart_at = [0.0] * len(processes)
+    # SIGTERM (إيقاف البوت أو Railway) يُعامل مثل Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            if args.exit_with_parent and os.getppid() != parent:
+                logger.warning("توقفت عملية البوت، إيقاف العمال")
+                break
+            # العامل الذي توقف (تعطل Chrome أو نفاد الذاكرة) يُستبدل، ومهمته تعود
+            # للطابور بعد انتهاء مهلتها
+            for i, process in enumerate(processes):
+                if not process.is_alive() and time.monotonic() >= restart_at[i]:
+                    logger.warning(
+                        f"توقف العامل {process.name} (رمز الخروج {process.exitcode})، إعادة تشغيله"
+                    )
+                    processes[i] = spawn_worker(i, args.db, key, args.engine, stop)
+                    restart_at[i] = time.monotonic() + RESTART_DELAY
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    stop_workers(processes, stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+عميل غير متزامن (aiohttp) لبوابة الطلاب: تسجيل الدخول ← البيانات ← النتائج
+
+يشترك جميع الطلاب في مجمع اتصالات واحد محدود الحجم مع البوابة، بينما
+يحصل كل طالب على cookies مستقلة.
+"""
+
+import asyncio
+import os
+
+import aiohttp
+from yarl import URL
+
+import metrics
+import page_parser
+import progress
+from page_parser import extract_results, extract_student_info
+from models import LookupResult
+from results_cache import make_key
+from scraper_simple import HEADERS, is_logged_in, login_form
+from session_store import export_cookies
+
+
+class AsyncPortalClient:
+    """عميل aiohttp مشترك لجميع عمليات الاستخراج عبر HTTP"""
+
+    name = 'async'
+
+    def __init__(self, max_connections=20, timeout=10, keepalive_timeout=30, sessions=None):
+        """
+        Args:
+            max_connections: أقصى عدد اتصالات مفتوحة مع البوابة
+            timeout: المهلة القصوى لكل طلب بالثواني
+            keepalive_timeout: مدة إبقاء الاتصال الخامل مفتوحاً لإعادة استخدامه
+            sessions: مخزن جلسات البوابة SessionStore لتجاوز تسجيل الدخول (اختياري)
+        """
+        self.sessions = sessions
+        self.base_url = os.getenv("PORTAL_URL", "http://212.0.143.242/portal/students")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.connector = aiohttp.TCPConnector(
+            limit=max_connections,
+            limit_per_host=max_connections,
+            keepalive_timeout=keepalive_timeout,
+        )
+
+    def _session(self):
+        """جلسة خاصة بطالب واحد (cookies مستقلة) فوق مجمع الاتصالات المشترك"""
+        return aiohttp.ClientSession(
+            connector=self.connector,
+            connector_owner=False,
+            # البوابة تعمل على عنوان IP، وهذا يتطلب unsafe لقبول cookies
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            headers=HEADERS,
+            timeout=self.timeout,
+        )
+
+    async def _restore_session(self, session, student_id, key):
+        """
+        استعادة جلسة محفوظة وجلب الصفحة الرئيسية بها
+
+        Returns:
+            str: صفحة الطالب إذا قبلت البوابة الجلسة، وإلا None
+        """
+        cookies = self.sessions.get(key)
+        if not cookies:
+            return None
+
+        session.cookie_jar.update_cookies(
+            {cookie['name']: cookie['value'] for cookie in cookies},
+            response_url=URL(self.base_url)
+        )
+        with metrics.span('session_restore', engine='http'):
+            async with session.get(f"{self.base_url}/index.php") as response:
+                if response.status >= 500:
+                    response.raise_for_status()
+                html = await response.text()
+
+        if response.status == 200 and is_logged_in(html, student_id):
+            self.sessions.mark_reused()
+            return html
+
+        # البوابة أعادت نموذج الدخول: الجلسة منتهية
+        self.sessions.invalidate(key)
+        session.cookie_jar.clear()
+        return None
+
+    async def get_all_data(self, student_id, password="123456"):
+        """
+        استخراج جميع بيانات الطالب
+
+        Args:
+            student_id: الرقم الجامعي
+            password: كلمة المرور
+
+        Returns:
+            dict: جميع بيانات الطالب والنتائج (نفس صيغة scraper_simple)
+        """
+        key = make_key(student_id, password)
+        async with self._session() as session:
+            html = None
+            if self.sessions is not None:
+                html = await self._restore_session(session, student_id, key)
+            restored = html is not None
+
+            if not restored:
+                # الحصول على صفحة تسجيل الدخول أولاً لأخذ cookies الجلسة
+                with metrics.span('page_load', engine='http'):
+                    async with session.get(f"{self.base_url}/") as response:
+                        # أخطاء 5xx تعني أن البوابة نفسها معطلة
+                        if response.status >= 500:
+                            response.raise_for_status()
+                        await response.read()
+
+                with metrics.span('submit', engine='http'):
+                    async with session.post(
+                        f"{self.base_url}/index.php", data=login_form(student_id, password)
+                    ) as response:
+                        if response.status >= 500:
+                            response.raise_for_status()
+                        html = await response.text()
+                        status = response.status
+
+                if status != 200 or not is_logged_in(html, student_id):
+                    return LookupResult.failure().to_dict()
+
+                if self.sessions is not None:
+                    self.sessions.set(key, export_cookies(session.cookie_jar))
+            progress.report(progress.LOGGED_IN)
+
+            with metrics.span('extraction', engine='http'):
+                page = page_parser.parse(html)
+                student_info = extract_student_info(page)
+                results = extract_results(page)
+
+            # الصفحة بعد تسجيل الدخول لم تحتوِ على النتائج، نعيد جلبها مرة واحدة
+            # (الجلسة المستعادة جلبت index.php نفسها، فلا فائدة من إعادتها)
+            if not results and not restored:
+                progress.report(progress.STUDENT_INFO, student_info)
+                with metrics.span('results', engine='http'):
+                    async with session.get(f"{self.base_url}/index.php") as response:
+                        html = await response.text()
+                with metrics.span('extraction', engine='http'):
+                    page = page_parser.parse(html)
+                    student_info = student_info or extract_student_info(page)
+                    results = extract_results(page)
+
+        return {
+            'success': True,
+            'student_id': student_id,
+            'student_info': student_info,
+            'results': results
+        }
+
+    async def close(self):
+        """إغلاق مجمع الاتصالات"""
+        await self.connector.close()
+
+
+async def main():
+    """دالة الاختبار"""
+    client = AsyncPortalClient()
+    try:
+        data = await client.get_all_data("1124693617", "123456")
+        print(data)
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,44 +10,273 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from contextlib import contextmanager
+import shutil
+import threading
 import time
 import os
 
+import metrics
+import progress
+from results_cache import make_key
+from engines import Engine, PortalUnavailable
+from models import LookupResult
+from scraper_simple import is_logged_in
 
-class StudentPortalScraper:
+
+# المهلة القصوى (بالثواني) لكل مرحلة من مراحل الاستخراج
+DEFAULT_TIMEOUTS = {
+    'page_load': 15,
+    'submit': 15,
+    'results': 10,
+}
+
+def is_portal_failure(error):
+    """هل خطأ WebDriver من البوابة نفسها (انتهاء مهلة التحميل أو خطأ شبكة في Chrome)"""
+    return isinstance(error, TimeoutException) or (
+        isinstance(error, WebDriverException) and 'net::ERR_' in str(error)
+    )
+
+
+# الوضع الخفيف: بدون صور أو CSS أو خطوط (نحتاج نص الجدولين فقط)
+LEAN_BROWSER = os.getenv('BROWSER_PROFILE', 'lean') != 'full'
+
+# حفظ لقطة شاشة عند فشل تسجيل الدخول (للتشخيص فقط)
+DEBUG = os.getenv('SCRAPER_DEBUG') == '1'
+
+# الموارد التي يحظرها الوضع الخفيف عبر Chrome DevTools
+BLOCKED_URLS = [
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.webp',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+]
+
+# قراءة جميع الجداول (العناوين ونصوص الخلايا) في استدعاء WebDriver واحد بدلاً من
+# استدعاء لكل جدول وصف وخلية. innerText يطابق ما تعيده WebElement.text
+TABLES_SCRIPT = """
+var limit = arguments[0];
+var tables = Array.prototype.slice.call(document.querySelectorAll('table'), 0, limit || undefined);
+return tables.map(function (table) {
+    var text = function (el) { return el.innerText || ''; };
+    return {
+        headers: Array.prototype.map.call(table.querySelectorAll('th'), text),
+        rows: Array.prototype.map.call(table.querySelectorAll('tr'), function (tr) {
+            return Array.prototype.map.call(tr.querySelectorAll('td'), text);
+        })
+    };
+});
+"""
+
+# جدول النتائج يُعرف من عناوين أعمدته
+RESULTS_TABLE_XPATH = (
+    "//table[.//th[contains(., 'Grade') or contains(., 'Course') or contains(., 'التقدير')]]"
+)
+
+
+# ملف يحفظ مسار ChromeDriver بعد تحديده في مرحلة البناء (install_driver)
+DRIVER_PATH_FILE = os.getenv(
+    'CHROMEDRIVER_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.chromedriver')
+)
+
+_driver_path = None
+_driver_lock = threading.Lock()
+
+
+def find_driver():
+    """
+    مسار ChromeDriver المتوفر محلياً بدون أي اتصال بالشبكة
+
+    الترتيب: CHROMEDRIVER_PATH، ثم المسار المحفوظ وقت البناء، ثم PATH.
+
+    Returns:
+        str: المسار، أو None إذا لم يوجد
+    """
+    cached = None
+    if os.path.exists(DRIVER_PATH_FILE):
+        with open(DRIVER_PATH_FILE, encoding='utf-8') as f:
+            cached = f.read().strip()
+    for path in (os.getenv('CHROMEDRIVER_PATH'), cached, shutil.which('chromedriver')):
+        if path and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def install_driver():
+    """
+    تحديد مسار ChromeDriver (وتنزيله عبر webdriver-manager عند الحاجة) وحفظه
+
+    يُستدعى في مرحلة البناء (nixpacks.toml) حتى لا يتأخر أول متصفح وقت التشغيل.
+
+    Returns:
+        str: مسار ChromeDriver
+    """
+    path = find_driver()
+    if path is None:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    try:
+        with open(DRIVER_PATH_FILE, 'w', encoding='utf-8') as f:
+            f.write(path)
+    except OSError as e:
+        print(f"تعذر حفظ مسار ChromeDriver: {str(e)}")
+    return path
+
+
+def driver_path():
+    """مسار ChromeDriver، يُحدد مرة واحدة لكل عملية"""
+    global _driver_path
+    with _driver_lock:
+        if _driver_path is None:
+            _driver_path = find_driver() or install_driver()
+        return _driver_path
+
+
+def create_driver(headless=True, lean=None):
+    """
+    تشغيل متصفح Chrome جديد بالإعدادات المستخدمة في البوابة
+    
+    Args:
+        headless: تشغيل المتصفح بدون واجهة
+        lean: الوضع الخفيف (افتراضياً حسب BROWSER_PROFILE)
+    
+    Returns:
+        webdriver.Chrome: المتصفح الجاهز
+    """
+    if lean is None:
+        lean = LEAN_BROWSER
+    
+    chrome_options = Options()
+    
+    # إعدادات للعمل على Railway
+    if headless:
+        chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-software-rasterizer')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--lang=ar')
+    if lean:
+        # نافذة صغيرة، بدون صور، ولا ننتظر تحميل الموارد الفرعية
+        chrome_options.add_argument('--window-size=800,600')
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.fonts': 2,
+        })
+        chrome_options.page_load_strategy = 'eager'
+    else:
+        chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    
+    # مسار ChromeDriver محدد مسبقاً (لا فحص ولا تنزيل مع كل متصفح)
+    try:
+        service = Service(driver_path())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except:
+        # محاولة بدون webdriver-manager
+        driver = webdriver.Chrome(options=chrome_options)
+    
+    # لا نستخدم الانتظار الضمني: كل فشل في find_element كان يكلف 10 ثوانٍ
+    driver.implicitly_wait(0)
+    
+    if lean:
+        # حظر CSS والخطوط وأدوات التتبع (يبقى الحظر فعالاً طوال عمر المتصفح)
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+        except Exception as e:
+            print(f"تعذر تفعيل حظر الموارد: {str(e)}")
+    return driver
+
+
+class StudentPortalScraper(Engine):
     """فئة للتعامل مع بوابة الطلاب واستخراج البيانات باستخدام Selenium"""
     
-    def __init__(self, headless=True):
-        self.base_url = "http://212.0.143.242/portal/students"
+    name = 'selenium'
+    
+    def __init__(self, headless=True, pool=None, timeouts=None, sessions=None):
+        self.base_url = os.getenv("PORTAL_URL", "http://212.0.143.242/portal/students")
         self.driver = None
         self.headless = headless
+        # مجمع متصفحات مشترك (اختياري) بدلاً من تشغيل Chrome لكل طلب
+        self.pool = pool
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        # مخزن جلسات البوابة SessionStore لتجاوز نموذج الدخول (اختياري)
+        self.sessions = sessions
+        # زمن كل مرحلة بالثواني لمعرفة أين يذهب الوقت
+        self.timings = {}
+    
+    @contextmanager
+    def _timed(self, step):
+        """قياس زمن مرحلة وحفظه في self.timings وفي مقاييس metrics"""
+        start = time.monotonic()
+        try:
+            with metrics.span(step, engine='selenium'):
+                yield
+        finally:
+            self.timings[step] = round(time.monotonic() - start, 3)
+    
+    def _wait(self, step):
+        """WebDriverWait بمهلة المرحلة المحددة"""
+        return WebDriverWait(self.driver, self.timeouts[step], poll_frequency=0.1)
     
     def _init_driver(self):
         """تهيئة متصفح Chrome"""
-        chrome_options = Options()
+        if self.pool:
+            self.driver = self.pool.acquire()
+        else:
+            self.driver = create_driver(self.headless)
+    
+    def _restore_session(self, student_id, password):
+        """
+        إضافة cookies الجلسة المحفوظة وفتح الصفحة الرئيسية بدلاً من ملء النموذج
         
-        # إعدادات للعمل على Railway
-        if self.headless:
-            chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--lang=ar')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        Returns:
+            bool: True إذا قبلت البوابة الجلسة
+        """
+        if self.sessions is None:
+            return False
+        key = make_key(student_id, password)
+        cookies = self.sessions.get(key)
+        if not cookies:
+            return False
         
-        # تثبيت ChromeDriver تلقائياً
-        try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        except:
-            # محاولة بدون webdriver-manager
-            self.driver = webdriver.Chrome(options=chrome_options)
+        with self._timed('restore'):
+            # المتصفح على صفحة الدخول (نفس النطاق)، فتُضاف cookies له مباشرة
+            for cookie in cookies:
+                self.driver.add_cookie({
+                    'name': cookie['name'],
+                    'value': cookie['value'],
+                    'path': cookie['path'],
+                })
+            self.driver.get(f"{self.base_url}/index.php")
+            restored = is_logged_in(self.driver.page_source, student_id)
+        
+        if restored:
+            print("تم استخدام الجلسة المحفوظة بدون تسجيل دخول")
+            self.sessions.mark_reused()
+            return True
         
-        self.driver.implicitly_wait(10)
+        # البوابة أعادت نموذج الدخول: الجلسة منتهية
+        print("انتهت الجلسة المحفوظة، سيتم تسجيل الدخول من جديد")
+        self.sessions.invalidate(key)
+        self.driver.delete_all_cookies()
+        self.driver.get(f"{self.base_url}/")
+        return False
+    
+    def _save_session(self, student_id, password):
+        """حفظ cookies الجلسة بعد تسجيل دخول ناجح"""
+        if self.sessions is None:
+            return
+        cookies = [
+            {'name': c['name'], 'value': c['value'],
+             'domain': c.get('domain', ''), 'path': c.get('path', '/')}
+            for c in self.driver.get_cookies()
+        ]
+        self.sessions.set(make_key(student_id, password), cookies)
     
     def login(self, student_id, password="123456"):
         """
@@ -59,31 +288,40 @@ class StudentPortalScraper:
         
         Returns:
             bool: True إذا نجح تسجيل الدخول، False إذا فشل
+        
+        Raises:
+            PortalUnavailable: إذا لم تُحمّل البوابة صفحة الدخول
         """
         try:
             if not self.driver:
-                self._init_driver()
+                with self._timed('driver'):
+                    self._init_driver()
             
             print(f"محاولة تسجيل الدخول للطالب: {student_id}")
             
-            # فتح صفحة تسجيل الدخول
-            self.driver.get(f"{self.base_url}/")
-            time.sleep(3)
+            # فتح صفحة تسجيل الدخول والانتظار حتى تظهر حقول الإدخال
+            with self._timed('page_load'):
+                self.driver.get(f"{self.base_url}/")
+                try:
+                    self._wait('page_load').until(
+                        EC.presence_of_element_located((By.TAG_NAME, 'input'))
+                    )
+                except TimeoutException as e:
+                    raise PortalUnavailable("انتهت مهلة تحميل صفحة تسجيل الدخول") from e
             
-            # البحث عن حقول الإدخال بطرق متعددة
-            try:
-                username_field = self.driver.find_element(By.CSS_SELECTOR, 'input[placeholder="الرقم الجامعي"]')
-            except:
-                # محاولة بديلة
-                inputs = self.driver.find_elements(By.TAG_NAME, 'input')
-                username_field = inputs[0] if len(inputs) > 0 else None
+            if self._restore_session(student_id, password):
+                return True
             
-            try:
-                password_field = self.driver.find_element(By.CSS_SELECTOR, 'input[placeholder="كلمة المرور"]')
-            except:
-                # محاولة بديلة
-                inputs = self.driver.find_elements(By.TAG_NAME, 'input')
-                password_field = inputs[1] if len(inputs) > 1 else None
+            # البحث عن حقول الإدخال بطرق متعددة (بدون انتظار ضمني)
+            inputs = self.driver.find_elements(By.TAG_NAME, 'input')
+            
+            fields = self.driver.find_elements(By.CSS_SELECTOR, 'input[placeholder="الرقم الجامعي"]')
+            # محاولة بديلة
+            username_field = fields[0] if fields else (inputs[0] if len(inputs) > 0 else None)
+            
+            fields = self.driver.find_elements(By.CSS_SELECTOR, 'input[placeholder="كلمة المرور"]')
+            # محاولة بديلة
+            password_field = fields[0] if fields else (inputs[1] if len(inputs) > 1 else None)
             
             if not username_field or not password_field:
                 print("لم يتم العثور على حقول الإدخال")
@@ -92,18 +330,18 @@ class StudentPortalScraper:
             # إدخال البيانات
             username_field.clear()
             username_field.send_keys(student_id)
-            time.sleep(0.5)
             
             password_field.clear()
             password_field.send_keys(password)
-            time.sleep(0.5)
             
             print("تم إدخال البيانات، البحث عن زر الدخول...")
             
+            login_url = self.driver.current_url
+            submit_start = time.monotonic()
+            
             # البحث عن زر الدخول والضغط عليه
-            login_buttons = self.driver.find_elements(By.TAG_NAME, 'input')
             clicked = False
-            for btn in login_buttons:
+            for btn in inputs:
                 btn_type = btn.get_attribute('type')
                 if btn_type in ['submit', 'button']:
                     try:
@@ -120,8 +358,19 @@ class StudentPortalScraper:
                 password_field.send_keys(Keys.RETURN)
                 print("تم الضغط على Enter")
             
-            # الانتظار حتى يتم تحميل الصفحة
-            time.sleep(4)
+            # الانتظار حتى تتغير الصفحة: تغير الرابط أو اختفاء نموذج الدخول
+            try:
+                self._wait('submit').until(EC.any_of(
+                    EC.url_changes(login_url),
+                    EC.staleness_of(password_field),
+                ))
+                self._wait('submit').until(
+                    lambda d: d.execute_script("return document.readyState") == "complete"
+                )
+            except TimeoutException:
+                print("انتهت مهلة انتظار الصفحة بعد تسجيل الدخول")
+            self.timings['submit'] = round(time.monotonic() - submit_start, 3)
+            metrics.observe('submit', self.timings['submit'], engine='selenium')
             
             # التحقق من نجاح تسجيل الدخول
             page_source = self.driver.page_source
@@ -136,23 +385,41 @@ class StudentPortalScraper:
                 'index.php' in current_url or
                 'البيانات الاساسية' in page_source):
                 print("تم تسجيل الدخول بنجاح")
+                self._save_session(student_id, password)
                 return True
             else:
                 print("فشل تسجيل الدخول")
                 # حفظ لقطة شاشة للتشخيص
-                try:
-                    self.driver.save_screenshot('/tmp/login_failed.png')
-                    print("تم حفظ لقطة شاشة في /tmp/login_failed.png")
-                except:
-                    pass
+                if DEBUG:
+                    try:
+                        self.driver.save_screenshot('/tmp/login_failed.png')
+                        print("تم حفظ لقطة شاشة في /tmp/login_failed.png")
+                    except:
+                        pass
                 return False
                 
+        except PortalUnavailable:
+            raise
         except Exception as e:
+            if is_portal_failure(e):
+                raise PortalUnavailable(f"البوابة لا تستجيب: {e}") from e
             print(f"خطأ في تسجيل الدخول: {str(e)}")
             import traceback
             traceback.print_exc()
             return False
     
+    def _read_tables(self, limit=0):
+        """
+        قراءة بنية الجداول من الصفحة الحالية
+        
+        Args:
+            limit: عدد الجداول المطلوبة من بداية الصفحة (0 للجميع)
+        
+        Returns:
+            list: قائمة من {'headers': [...], 'rows': [[...], ...]}
+        """
+        return self.driver.execute_script(TABLES_SCRIPT, limit) or []
+    
     def get_student_info(self):
         """
         استخراج البيانات الأساسية للطالب
@@ -164,18 +431,16 @@ class StudentPortalScraper:
             student_info = {}
             
             # البحث عن جدول البيانات الأساسية
-            tables = self.driver.find_elements(By.TAG_NAME, 'table')
+            tables = self._read_tables(limit=1)
             
             if tables:
                 # استخراج البيانات من أول جدول
-                rows = tables[0].find_elements(By.TAG_NAME, 'tr')
-                for row in rows:
-                    cells = row.find_elements(By.TAG_NAME, 'td')
+                for cells in tables[0]['rows']:
                     if len(cells) >= 2:
                         for i in range(0, len(cells), 2):
                             if i + 1 < len(cells):
-                                value = cells[i].text.strip()
-                                key = cells[i+1].text.strip()
+                                value = cells[i].strip()
+                                key = cells[i+1].strip()
                                 if key and value:
                                     student_info[key] = value
             
@@ -193,30 +458,34 @@ class StudentPortalScraper:
             list: قائمة تحتوي على النتائج
         """
         try:
-            # الضغط على قسم النتيجة
-            result_links = self.driver.find_elements(By.PARTIAL_LINK_TEXT, 'النتيجة')
-            if result_links:
-                result_links[0].click()
-                time.sleep(2)
+            # الضغط على قسم النتيجة والانتظار حتى يظهر جدول النتائج
+            with self._timed('results_nav'):
+                result_links = self.driver.find_elements(By.PARTIAL_LINK_TEXT, 'النتيجة')
+                if result_links:
+                    result_links[0].click()
+                    try:
+                        self._wait('results').until(
+                            EC.presence_of_element_located((By.XPATH, RESULTS_TABLE_XPATH))
+                        )
+                    except TimeoutException:
+                        print("لم يظهر جدول النتائج خلال المهلة المحددة")
             
             results = []
             
             # البحث عن جدول النتائج
-            tables = self.driver.find_elements(By.TAG_NAME, 'table')
+            tables = self._read_tables()
             
             for table in tables:
                 # البحث عن جدول النتائج
-                headers = table.find_elements(By.TAG_NAME, 'th')
-                header_text = ' '.join([h.text for h in headers])
+                header_text = ' '.join(table['headers'])
                 
                 if 'Grade' in header_text or 'Course' in header_text or 'التقدير' in header_text:
-                    rows = table.find_elements(By.TAG_NAME, 'tr')[1:]  # تجاوز صف العناوين
+                    rows = table['rows'][1:]  # تجاوز صف العناوين
                     
-                    for row in rows:
-                        cells = row.find_elements(By.TAG_NAME, 'td')
+                    for cells in rows:
                         if len(cells) >= 2:
-                            grade = cells[0].text.strip()
-                            course = cells[1].text.strip()
+                            grade = cells[0].strip()
+                            course = cells[1].strip()
                             
                             if grade and course:
                                 results.append({
@@ -241,15 +510,19 @@ class StudentPortalScraper:
         Returns:
             dict: جميع بيانات الطالب والنتائج
         """
+        self.timings = {}
         try:
-            if not self.login(student_id, password):
-                return {
-                    'success': False,
-                    'error': 'فشل تسجيل الدخول. تحقق من الرقم الجامعي وكلمة المرور.'
-                }
+            with self._timed('login'):
+                logged_in = self.login(student_id, password)
+            if not logged_in:
+                return LookupResult.failure().to_dict()
+            progress.report(progress.LOGGED_IN)
             
-            student_info = self.get_student_info()
-            results = self.get_results()
+            with self._timed('student_info'):
+                student_info = self.get_student_info()
+            progress.report(progress.STUDENT_INFO, student_info)
+            with self._timed('results'):
+                results = self.get_results()
             
             return {
                 'success': True,
@@ -259,50 +532,20 @@ class StudentPortalScraper:
             }
         finally:
             self.close()
+            print(f"أزمنة المراحل: {self.timings}")
     
     def close(self):
-        """إغلاق المتصفح"""
+        """إغلاق المتصفح أو إعادته إلى المجمع"""
         if self.driver:
-            try:
-                self.driver.quit()
-            except:
-                pass
+            if self.pool:
+                self.pool.release(self.driver)
+            else:
+                try:
+                    self.driver.quit()
+                except:
+                    pass
             self.driver = None
     
-    def format_results_message(self, data):
-        """
-        تنسيق البيانات لإرسالها عبر التلغرام
-        
-        Args:
-            data: البيانات المستخرجة
-        
-        Returns:
-            str: رسالة منسقة
-        """
-        if not data['success']:
-            return f"❌ {data['error']}"
-        
-        message = "📊 *نتائج الطالب*\n"
-        message += "=" * 30 + "\n\n"
-        
-        # البيانات الأساسية
-        if data['student_info']:
-            message += "👤 *البيانات الأساسية:*\n"
-            for key, value in data['student_info'].items():
-                message += f"• {key}: {value}\n"
-            message += "\n"
-        
-        # النتائج
-        if data['results']:
-            message += "📝 *النتائج الدراسية:*\n"
-            message += "─" * 30 + "\n"
-            for i, result in enumerate(data['results'], 1):
-                message += f"{i}. {result['المادة']}\n"
-                message += f"   التقدير: *{result['التقدير']}*\n\n"
-        else:
-            message += "⚠️ لا توجد نتائج متاحة حالياً\n"
-        
-        return message
 
 
 def main():
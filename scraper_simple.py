@@ -5,56 +5,119 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
 import re
+import os
 
+import metrics
+import page_parser
+import progress
+from page_parser import extract_student_info, extract_results
+from results_cache import make_key
+from engines import Engine, PortalUnavailable
+from models import LookupResult
+from session_store import export_cookies
 
-class StudentPortalScraper:
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ar,en-US;q=0.7,en;q=0.3',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+
+def login_form(student_id, password):
+    """بيانات نموذج تسجيل الدخول بأسماء الحقول الصحيحة"""
+    return {
+        'action': 'login',
+        'username': student_id,
+        'password': password,
+        'submit': 'دخول'
+    }
+
+
+def portal_request(session, method, url, **kwargs):
+    """
+    طلب HTTP إلى البوابة مع تحويل أعطالها إلى PortalUnavailable
+
+    Raises:
+        PortalUnavailable: عند انتهاء المهلة أو تعذر الاتصال أو خطأ 5xx
+    """
+    kwargs.setdefault('timeout', 10)
+    try:
+        response = session.request(method, url, **kwargs)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        raise PortalUnavailable(f"البوابة لا تستجيب: {e}") from e
+    if response.status_code >= 500:
+        raise PortalUnavailable(f"البوابة أعادت الخطأ {response.status_code}")
+    return response
+
+
+def is_logged_in(html, student_id):
+    """التحقق من أن الصفحة هي صفحة الطالب بعد تسجيل الدخول"""
+    return ('Logout' in html or
+            'تسجيل الخروج' in html or
+            student_id in html or
+            'البيانات الاساسية' in html)
+
+
+class StudentPortalScraper(Engine):
     """فئة للتعامل مع بوابة الطلاب واستخراج البيانات"""
     
-    def __init__(self):
-        self.base_url = "http://212.0.143.242/portal/students"
+    name = 'simple'
+    
+    def __init__(self, sessions=None):
+        """
+        Args:
+            sessions: مخزن جلسات البوابة SessionStore لتجاوز تسجيل الدخول (اختياري)
+        """
+        self.sessions = sessions
+        self.base_url = os.getenv("PORTAL_URL", "http://212.0.143.242/portal/students")
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ar,en-US;q=0.7,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        })
+        self.session.headers.update(HEADERS)
+        # لقطة الصفحة بعد تسجيل الدخول: تُجلب وتُحلل مرة واحدة لكل طالب
+        self.page_html = None
+        self.page = None
+        self._refetched = False
     
     def login(self, student_id, password="123456"):
-        """تسجيل الدخول إلى البوابة"""
+        """
+        تسجيل الدخول إلى البوابة
+
+        Returns:
+            bool: True إذا نجح تسجيل الدخول، False إذا رفضت البوابة البيانات
+
+        Raises:
+            PortalUnavailable: إذا كانت البوابة نفسها لا تستجيب
+        """
         try:
             print(f"محاولة تسجيل الدخول للطالب: {student_id}")
             
             # الحصول على صفحة تسجيل الدخول أولاً
-            login_page = self.session.get(f"{self.base_url}/", timeout=10)
+            with metrics.span('page_load', engine='requests'):
+                login_page = portal_request(self.session, 'GET', f"{self.base_url}/")
             print(f"حالة الطلب الأولي: {login_page.status_code}")
             
             # إرسال بيانات تسجيل الدخول
             login_url = f"{self.base_url}/index.php"
             
             # إرسال بيانات تسجيل الدخول مع الحقول الصحيحة
-            login_data = {
-                'action': 'login',
-                'username': student_id,
-                'password': password,
-                'submit': 'دخول'
-            }
+            login_data = login_form(student_id, password)
             
-            response = self.session.post(login_url, data=login_data, allow_redirects=True, timeout=10)
+            with metrics.span('submit', engine='requests'):
+                response = portal_request(self.session, 'POST', login_url, data=login_data)
             print(f"حالة تسجيل الدخول: {response.status_code}")
             print(f"URL بعد تسجيل الدخول: {response.url}")
             
             # التحقق من نجاح تسجيل الدخول
-            if (response.status_code == 200 and 
-                ('Logout' in response.text or 
-                 'تسجيل الخروج' in response.text or 
-                 student_id in response.text or
-                 'البيانات الاساسية' in response.text)):
+            if response.status_code == 200 and is_logged_in(response.text, student_id):
                 print("تم تسجيل الدخول بنجاح")
+                # الصفحة الناتجة هي index.php نفسها، نحفظها بدلاً من جلبها مجدداً
+                self.page_html = response.text
+                self.page = None
+                self._refetched = False
                 return True
             else:
                 print("فشل تسجيل الدخول")
@@ -63,49 +126,97 @@ class StudentPortalScraper:
                     f.write(response.text[:1000])
                 return False
                 
+        except PortalUnavailable:
+            raise
         except Exception as e:
             print(f"خطأ في تسجيل الدخول: {str(e)}")
             import traceback
             traceback.print_exc()
             return False
     
+    def restore_session(self, student_id, password):
+        """
+        استعادة جلسة محفوظة بدلاً من تسجيل الدخول
+
+        Returns:
+            bool: True إذا قبلت البوابة الجلسة (الصفحة جاهزة في اللقطة)
+        """
+        if self.sessions is None:
+            return False
+        key = make_key(student_id, password)
+        cookies = self.sessions.get(key)
+        if not cookies:
+            return False
+
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path']
+            )
+        try:
+            self._fetch_page()
+        except PortalUnavailable:
+            # تسجيل الدخول من جديد سينتظر نفس المهلة دون فائدة
+            self.session.cookies.clear()
+            raise
+        except Exception as e:
+            print(f"خطأ في استعادة الجلسة: {str(e)}")
+            self.session.cookies.clear()
+            return False
+        
+        if is_logged_in(self.page_html, student_id):
+            print("تم استخدام الجلسة المحفوظة بدون تسجيل دخول")
+            self.sessions.mark_reused()
+            return True
+
+        # البوابة أعادت نموذج الدخول: الجلسة منتهية
+        print("انتهت الجلسة المحفوظة، سيتم تسجيل الدخول من جديد")
+        self.sessions.invalidate(key)
+        self.session.cookies.clear()
+        self.page_html = None
+        self.page = None
+        self._refetched = False
+        return False
+    
+    def save_session(self, student_id, password):
+        """حفظ cookies الجلسة بعد تسجيل دخول ناجح"""
+        if self.sessions is not None:
+            self.sessions.set(make_key(student_id, password), export_cookies(self.session.cookies))
+    
+    def _fetch_page(self):
+        """جلب الصفحة الرئيسية من البوابة وتحليلها"""
+        with metrics.span('results', engine='requests'):
+            response = portal_request(self.session, 'GET', f"{self.base_url}/index.php")
+        self.page_html = response.text
+        with metrics.span('extraction', engine='requests'):
+            self.page = page_parser.parse(response.text)
+        self._refetched = True
+        return self.page
+    
+    def _snapshot(self):
+        """لقطة الصفحة بعد تسجيل الدخول (تُحلل عند أول استخدام فقط)"""
+        if self.page is None:
+            if self.page_html is None:
+                return self._fetch_page()
+            with metrics.span('extraction', engine='requests'):
+                self.page = page_parser.parse(self.page_html)
+        return self.page
+    
+    def _extract(self, extractor):
+        """تطبيق المستخلص على اللقطة، وإعادة الجلب مرة واحدة إذا لم يوجد القسم المطلوب"""
+        result = extractor(self._snapshot())
+        if not result and not self._refetched:
+            print("القسم المطلوب غير موجود في اللقطة، إعادة جلب الصفحة")
+            result = extractor(self._fetch_page())
+        return result
+    
     def get_student_info(self):
         """استخراج البيانات الأساسية للطالب"""
         try:
-            response = self.session.get(f"{self.base_url}/index.php", timeout=10)
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            student_info = {}
+            student_info = self._extract(extract_student_info)
             
             # حفظ الصفحة للتشخيص
             with open('/tmp/student_page.html', 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            
-            # استخراج البيانات من الجدول
-            tables = soup.find_all('table')
-            print(f"عدد الجداول الموجودة: {len(tables)}")
-            
-            if tables:
-                # الجدول الأول يحتوي على البيانات الأساسية
-                first_table = tables[0]
-                rows = first_table.find_all('tr')
-                
-                for row in rows:
-                    cells = row.find_all('td')
-                    if len(cells) == 4:  # كل صف يحتوي على 4 خلايا
-                        # الخلية الأولى: القيمة 1
-                        # الخلية الثانية: المفتاح 1
-                        # الخلية الثالثة: القيمة 2
-                        # الخلية الرابعة: المفتاح 2
-                        value1 = cells[0].get_text(strip=True)
-                        key1 = cells[1].get_text(strip=True)
-                        value2 = cells[2].get_text(strip=True)
-                        key2 = cells[3].get_text(strip=True)
-                        
-                        if key1 and value1:
-                            student_info[key1] = value1
-                        if key2 and value2:
-                            student_info[key2] = value2
+                f.write(self.page_html)
             
             print(f"تم استخراج {len(student_info)} حقل من البيانات الأساسية")
             return student_info
@@ -119,37 +230,9 @@ class StudentPortalScraper:
     def get_results(self):
         """استخراج نتائج الامتحانات"""
         try:
-            response = self.session.get(f"{self.base_url}/index.php", timeout=10)
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            results = []
-            
-            # البحث عن جدول النتائج
-            tables = soup.find_all('table')
-            print(f"فحص {len(tables)} جدول للبحث عن النتائج")
-            
-            for idx, table in enumerate(tables):
-                headers = table.find_all('th')
-                header_text = ' '.join([h.get_text() for h in headers])
-                print(f"الجدول {idx}: {header_text[:50]}")
-                
-                if 'Grade' in header_text or 'Course' in header_text or 'التقدير' in header_text:
-                    print(f"تم العثور على جدول النتائج في الجدول {idx}")
-                    rows = table.find_all('tr')[1:]  # تجاوز صف العناوين
-                    
-                    for row in rows:
-                        cells = row.find_all('td')
-                        if len(cells) >= 2:
-                            grade = cells[0].get_text(strip=True)
-                            course = cells[1].get_text(strip=True)
-                            
-                            if grade and course:
-                                results.append({
-                                    'التقدير': grade,
-                                    'المادة': course
-                                })
-                                print(f"  - {course}: {grade}")
-            
+            results = self._extract(extract_results)
+            for result in results:
+                print(f"  - {result['المادة']}: {result['التقدير']}")
             print(f"تم استخراج {len(results)} نتيجة")
             return results
             
@@ -161,13 +244,14 @@ class StudentPortalScraper:
     
     def get_all_data(self, student_id, password="123456"):
         """استخراج جميع بيانات الطالب"""
-        if not self.login(student_id, password):
-            return {
-                'success': False,
-                'error': 'فشل تسجيل الدخول. تحقق من الرقم الجامعي وكلمة المرور.'
-            }
+        if not self.restore_session(student_id, password):
+            if not self.login(student_id, password):
+                return LookupResult.failure().to_dict()
+            self.save_session(student_id, password)
+        progress.report(progress.LOGGED_IN)
         
         student_info = self.get_student_info()
+        progress.report(progress.STUDENT_INFO, student_info)
         results = self.get_results()
         
         return {
@@ -177,32 +261,9 @@ class StudentPortalScraper:
             'results': results
         }
     
-    def format_results_message(self, data):
-        """تنسيق البيانات لإرسالها عبر التلغرام"""
-        if not data['success']:
-            return f"❌ {data['error']}"
-        
-        message = "📊 *نتائج الطالب*\n"
-        message += "=" * 30 + "\n\n"
-        
-        # البيانات الأساسية
-        if data['student_info']:
-            message += "👤 *البيانات الأساسية:*\n"
-            for key, value in data['student_info'].items():
-                message += f"• {key}: {value}\n"
-            message += "\n"
-        
-        # النتائج
-        if data['results']:
-            message += "📝 *النتائج الدراسية:*\n"
-            message += "─" * 30 + "\n"
-            for i, result in enumerate(data['results'], 1):
-                message += f"{i}. {result['المادة']}\n"
-                message += f"   التقدير: *{result['التقدير']}*\n\n"
-        else:
-            message += "⚠️ لا توجد نتائج متاحة حالياً\n"
-        
-        return message
+    def close(self):
+        """إغلاق جلسة requests"""
+        self.session.close()
 
 
 def main():
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+استخراج النتائج على مستويين: requests أولاً ثم Selenium عند الحاجة فقط
+"""
+
+import time
+
+import scraper_simple
+from engines import Engine, PortalUnavailable, record_tier
+
+
+class StudentPortalScraper(Engine):
+    """فئة تجرب المسار السريع (HTTP) وتلجأ إلى المتصفح إذا دخلت ولم يظهر جدول النتائج"""
+
+    name = 'tiered'
+
+    def __init__(self, headless=True, pool=None, http_first=True, sessions=None):
+        """
+        Args:
+            headless: تشغيل المتصفح بدون واجهة
+            pool: مجمع متصفحات مشترك (اختياري)
+            http_first: تجربة المسار السريع أولاً؛ False عندما يكون قد جُرب مسبقاً
+                (مثلاً عبر scraper_async)
+            sessions: مخزن جلسات البوابة المشترك بين المستويين (اختياري)
+        """
+        self.headless = headless
+        self.pool = pool
+        self.http_first = http_first
+        self.sessions = sessions
+        self.http = scraper_simple.StudentPortalScraper(sessions=sessions)
+        self.browser = None
+        self.timings = {}
+
+    def get_all_data(self, student_id, password="123456"):
+        """
+        استخراج جميع بيانات الطالب
+
+        Args:
+            student_id: الرقم الجامعي
+            password: كلمة المرور
+
+        Returns:
+            dict: جميع بيانات الطالب والنتائج، مع المستوى الذي خدم الطلب في 'tier'
+        """
+        self.timings = {}
+        if self.http_first:
+            start = time.monotonic()
+            try:
+                data = self.http.get_all_data(student_id, password)
+            except PortalUnavailable:
+                # البوابة نفسها لا تستجيب، المتصفح لن يساعد
+                raise
+            except Exception as e:
+                print(f"فشل المسار السريع: {str(e)}")
+                data = None
+            self.timings['http'] = round(time.monotonic() - start, 3)
+
+            # الجدول موجود في HTML مباشرة، أو فشل تسجيل الدخول (كلمة مرور خاطئة)
+            # ولن ينجح في المتصفح أيضاً: لا حاجة للمتصفح
+            if data is not None and (not data['success'] or data['results']):
+                data['tier'] = 'http'
+                record_tier('http')
+                return data
+
+        # المحتوى يُحمّل عبر JavaScript أو تعذر المسار السريع بخطأ غير متوقع
+        print("لم يتم العثور على جدول النتائج عبر HTTP، التحويل إلى Selenium")
+        # Selenium يُستورد عند أول طلب يحتاجه فقط
+        import scraper_selenium
+        self.browser = scraper_selenium.StudentPortalScraper(
+            headless=self.headless, pool=self.pool, sessions=self.sessions
+        )
+        data = self.browser.get_all_data(student_id, password)
+        self.timings.update(self.browser.timings)
+        data['tier'] = 'selenium'
+        record_tier('selenium')
+        return data
+
+    def close(self):
+        """إغلاق الجلسة والمتصفح إن وجد"""
+        self.http.close()
+        if self.browser:
+            self.browser.close()
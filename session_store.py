@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مخزن مشفر لجلسات البوابة (cookies) لكل طالب
+
+بعد تسجيل دخول ناجح تُحفظ cookies الجلسة مشفرة (Fernet)، وفي الاستعلام التالي
+تُستعاد مباشرة بدلاً من تسجيل الدخول من جديد. إذا أعادت البوابة نموذج الدخول
+فالجلسة منتهية، فتُحذف ويُسجل الدخول كالمعتاد.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from cryptography.fernet import Fernet, InvalidToken
+
+logger = logging.getLogger(__name__)
+
+
+def export_cookies(cookies):
+    """
+    تحويل cookies من requests أو aiohttp إلى قائمة قواميس قابلة للحفظ
+
+    Args:
+        cookies: RequestsCookieJar أو aiohttp.CookieJar
+
+    Returns:
+        list: قواميس تحتوي على name و value و domain و path
+    """
+    exported = []
+    for cookie in cookies:
+        if hasattr(cookie, 'key'):
+            # aiohttp يعيد Morsel
+            exported.append({
+                'name': cookie.key,
+                'value': cookie.value,
+                'domain': cookie['domain'],
+                'path': cookie['path'] or '/',
+            })
+        else:
+            exported.append({
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path or '/',
+            })
+    return exported
+
+
+class SessionStore:
+    """جلسات البوابة المشفرة، في الذاكرة مع تخزين اختياري في SQLite"""
+
+    def __init__(self, key=None, ttl=1800, max_entries=5000, db_path=None):
+        """
+        Args:
+            key: مفتاح Fernet (إذا لم يُحدد يُولد مفتاح مؤقت لا يبقى بعد إعادة التشغيل)
+            ttl: أقصى عمر للجلسة المحفوظة بالثواني
+            max_entries: أقصى عدد جلسات في الذاكرة
+            db_path: مسار ملف SQLite لحفظ الجلسات بعد إعادة التشغيل (اختياري)
+        """
+        if not key:
+            key = Fernet.generate_key()
+            if db_path:
+                logger.warning("لم يتم تحديد SESSION_KEY، لن تُستعاد الجلسات المحفوظة بعد إعادة التشغيل")
+        self._fernet = Fernet(key)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.reused = 0
+        self.misses = 0
+        self.expired = 0
+        self.saved = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS portal_sessions ("
+                "key TEXT PRIMARY KEY, token BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """
+        Args:
+            key: مفتاح الطالب من results_cache.make_key (يتضمن بصمة كلمة المرور)
+
+        Returns:
+            list: cookies الجلسة إذا كانت محفوظة ولم تتجاوز ttl، وإلا None
+        """
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT token FROM portal_sessions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    token = row[0]
+                    self._put(key, token)
+
+            if token is None:
+                self.misses += 1
+                return None
+
+            try:
+                # Fernet يحفظ وقت التشفير داخل الرمز، فيتحقق من العمر بنفسه
+                cookies = json.loads(self._fernet.decrypt(token, ttl=self.ttl))
+            except InvalidToken:
+                self._delete(key)
+                self.misses += 1
+                return None
+
+            self._tokens.move_to_end(key)
+            return cookies
+
+    def set(self, key, cookies):
+        """حفظ cookies جلسة بعد تسجيل دخول ناجح"""
+        if not cookies:
+            return
+        token = self._fernet.encrypt(json.dumps(cookies).encode('utf-8'))
+        with self._lock:
+            self._put(key, token)
+            self.saved += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO portal_sessions (key, token) VALUES (?, ?)",
+                    (key, token)
+                )
+                self._db.commit()
+
+    def mark_reused(self):
+        """تسجيل استعادة جلسة ناجحة (تجاوز تسجيل الدخول)"""
+        with self._lock:
+            self.reused += 1
+
+    def invalidate(self, key):
+        """حذف جلسة رفضتها البوابة (انتهت صلاحيتها)"""
+        with self._lock:
+            if self._delete(key):
+                self.expired += 1
+
+    def _delete(self, key):
+        removed = self._tokens.pop(key, None) is not None
+        if self._db is not None:
+            removed = self._db.execute(
+                "DELETE FROM portal_sessions WHERE key = ?", (key,)
+            ).rowcount > 0 or removed
+            self._db.commit()
+        return removed
+
+    def _put(self, key, token):
+        self._tokens.pop(key, None)
+        self._tokens[key] = token
+        while len(self._tokens) > self.max_entries:
+            self._tokens.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns:
+            dict: عدد الجلسات وعدد مرات الاستعادة والانتهاء
+        """
+        with self._lock:
+            return {
+                'entries': len(self._tokens),
+                'reused': self.reused,
+                'misses': self.misses,
+                'expired': self.expired,
+                'saved': self.saved,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+دمج الطلبات المتزامنة لنفس الطالب في عملية استخراج واحدة
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    أثناء تنفيذ عملية لمفتاح معين، تنتظر الطلبات اللاحقة بنفس المفتاح
+    نتيجة العملية الجارية بدلاً من بدء عملية جديدة.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, func):
+        """
+        Args:
+            key: مفتاح العملية (مثلاً الرقم الجامعي مع بصمة كلمة المرور)
+            func: دالة بدون معاملات تعيد coroutine للتنفيذ
+
+        Returns:
+            نتيجة العملية المشتركة (أو يُعاد رفع الاستثناء لجميع المنتظرين)
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        # إلغاء انتظار أحد المستخدمين لا يلغي العملية المشتركة
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self):
+        """
+        Returns:
+            dict: العمليات الجارية وعدد الطلبات التي تم دمجها
+        """
+        return {
+            'in_flight': len(self._calls),
+            'started': self.started,
+            'coalesced': self.coalesced,
+        }
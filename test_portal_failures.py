@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار وصول أعطال البوابة من المحركات المتزامنة إلى حارس البوابة
+
+    python -m unittest test_portal_failures
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet
+
+import engines
+from engines import PortalUnavailable
+from job_queue import JobQueue
+from mock_portal import MockPortal
+from portal_guard import PortalGuard, CircuitOpen, OPEN
+from scrape_queue import ScrapeExecutor
+
+SYNC_ENGINES = ('simple', 'legacy', 'tiered')
+
+
+def closed_port_url():
+    """رابط بوابة على منفذ محلي لا يستمع عليه أحد (رفض اتصال فوري)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/portal/students"
+
+
+class SyncEnginesTest(unittest.TestCase):
+    """المحركات المتزامنة ترفع PortalUnavailable بدلاً من إعادة فشل تسجيل الدخول"""
+
+    def scrape(self, name, portal_url, password="123456"):
+        with mock.patch.dict(os.environ, {'PORTAL_URL': portal_url}):
+            engine = engines.create_engine(name)
+        try:
+            return engine.get_all_data('1000000001', password)
+        finally:
+            engine.close()
+
+    def test_connection_refused(self):
+        url = closed_port_url()
+        for name in SYNC_ENGINES:
+            with self.subTest(engine=name):
+                with self.assertRaises(PortalUnavailable):
+                    self.scrape(name, url)
+
+    def test_server_error(self):
+        portal = MockPortal(failure_rate=1.0)
+        portal.start()
+        try:
+            for name in SYNC_ENGINES:
+                with self.subTest(engine=name):
+                    with self.assertRaises(PortalUnavailable):
+                        self.scrape(name, portal.url)
+        finally:
+            portal.stop()
+
+    def test_wrong_password_is_not_a_portal_failure(self):
+        portal = MockPortal()
+        portal.start()
+        try:
+            data = self.scrape('simple', portal.url, password='wrong')
+            self.assertFalse(data['success'])
+            data = self.scrape('tiered', portal.url, password='wrong')
+            self.assertFalse(data['success'])
+            self.assertEqual(data['tier'], 'http')
+        finally:
+            portal.stop()
+
+
+class SeleniumLoginTest(unittest.TestCase):
+    """أخطاء WebDriver الناتجة عن البوابة تتحول إلى PortalUnavailable"""
+
+    def setUp(self):
+        import scraper_selenium
+        self.scraper_selenium = scraper_selenium
+
+    def login(self, driver):
+        scraper = self.scraper_selenium.StudentPortalScraper(timeouts={'page_load': 0.3})
+        scraper.driver = driver
+        return scraper.login('1000000001', '123456')
+
+    def test_network_error(self):
+        from selenium.common.exceptions import WebDriverException
+        driver = mock.Mock()
+        driver.get.side_effect = WebDriverException("unknown error: net::ERR_CONNECTION_REFUSED")
+        with self.assertRaises(PortalUnavailable):
+            self.login(driver)
+
+    def test_login_page_timeout(self):
+        from selenium.common.exceptions import NoSuchElementException
+        driver = mock.Mock()
+        driver.find_element.side_effect = NoSuchElementException()
+        with self.assertRaises(PortalUnavailable):
+            self.login(driver)
+
+    def test_driver_error_is_not_a_portal_failure(self):
+        from selenium.common.exceptions import WebDriverException
+        driver = mock.Mock()
+        driver.get.side_effect = WebDriverException("chrome not reachable")
+        self.assertFalse(self.login(driver))
+
+
+class GuardTest(unittest.TestCase):
+    """الدائرة تُفتح عند تعطل البوابة مع المحركات المتزامنة في المنفذ"""
+
+    def test_circuit_opens(self):
+        url = closed_port_url()
+
+        def scrape():
+            with mock.patch.dict(os.environ, {'PORTAL_URL': url}):
+                engine = engines.create_engine('simple')
+            try:
+                return engine.get_all_data('1000000001', '123456')
+            finally:
+                engine.close()
+
+        async def main():
+            guard = PortalGuard(failure_threshold=3, reset_timeout=60)
+            executor = ScrapeExecutor(max_workers=1)
+            for _ in range(3):
+                with self.assertRaises(PortalUnavailable):
+                    async with guard.admit():
+                        await executor.submit(1, scrape)
+            self.assertEqual(guard.state, OPEN)
+            with self.assertRaises(CircuitOpen):
+                async with guard.admit():
+                    pass
+
+        asyncio.run(main())
+
+
+class JobQueueTest(unittest.TestCase):
+    """عطل البوابة في العامل يصل إلى البوت كـ PortalUnavailable دون إعادة المحاولة"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmp.name, 'jobs.db'), key=Fernet.generate_key())
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_portal_failure(self):
+        job_id = self.queue.enqueue('1000000001', '123456')
+        job = self.queue.claim('worker-1')
+        retry = self.queue.fail(job.id, "PortalUnavailable: البوابة لا تستجيب", retry=False)
+        self.assertFalse(retry)
+        with self.assertRaises(PortalUnavailable):
+            self.queue.result(job_id)
+
+    def test_other_failure(self):
+        job_id = self.queue.enqueue('1000000001', '123456')
+        self.queue.claim('worker-1')
+        self.assertTrue(self.queue.fail(job_id, "ValueError: خطأ"))
+        self.assertIsNone(self.queue.result(job_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار سجل التقديرات في ResultsStore
+
+    python -m unittest test_results_store
+"""
+
+import unittest
+
+from results_store import ResultsStore
+
+STUDENT_ID = '1000000001'
+
+
+def lookup(*rows):
+    """نتيجة get_all_data بقائمة (المادة، التقدير)"""
+    return {
+        'success': True,
+        'student_id': STUDENT_ID,
+        'student_info': {'الاسم': 'طالب تجريبي'},
+        'results': [{'المادة': course, 'التقدير': grade} for course, grade in rows],
+    }
+
+
+class RecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ResultsStore(':memory:')
+
+    def tearDown(self):
+        self.store.close()
+
+    def current(self):
+        return sorted(
+            (r['المادة'], r['التقدير']) for r in self.store.latest(STUDENT_ID)['results']
+        )
+
+    def test_grade_change(self):
+        self.store.record(lookup(('رياضيات', 'B'), ('فيزياء', 'A')), '123456', fetched_at=1)
+        changes = self.store.record(lookup(('رياضيات', 'A'), ('فيزياء', 'A')), '123456', fetched_at=2)
+        self.assertEqual(changes, [{'المادة': 'رياضيات', 'التقدير': 'A', 'التقدير السابق': 'B'}])
+        self.assertEqual(self.current(), [('رياضيات', 'A'), ('فيزياء', 'A')])
+
+    def test_repeated_course(self):
+        # المادة المعادة تظهر مرتين في صفحة النتائج
+        self.store.record(lookup(('رياضيات', 'F'), ('رياضيات', 'B'), ('فيزياء', 'A')), '123456', fetched_at=1)
+
+        # تغير مادة أخرى: لا تغيير وهمي بين صفي المادة المعادة
+        changes = self.store.record(
+            lookup(('رياضيات', 'F'), ('رياضيات', 'B'), ('فيزياء', 'B')), '123456', fetched_at=2
+        )
+        self.assertEqual(changes, [{'المادة': 'فيزياء', 'التقدير': 'B', 'التقدير السابق': 'A'}])
+        self.assertEqual(self.current(), [('رياضيات', 'B'), ('رياضيات', 'F'), ('فيزياء', 'B')])
+
+        # تعديل تقدير أحد الصفين فقط
+        changes = self.store.record(
+            lookup(('رياضيات', 'F'), ('رياضيات', 'A'), ('فيزياء', 'B')), '123456', fetched_at=3
+        )
+        self.assertEqual(changes, [{'المادة': 'رياضيات', 'التقدير': 'A', 'التقدير السابق': 'B'}])
+        self.assertEqual(self.current(), [('رياضيات', 'A'), ('رياضيات', 'F'), ('فيزياء', 'B')])
+
+        # حذف أحد الصفين من الصفحة يبقيه في السجل فقط
+        changes = self.store.record(lookup(('رياضيات', 'A'), ('فيزياء', 'B')), '123456', fetched_at=4)
+        self.assertEqual(changes, [])
+        self.assertEqual(self.current(), [('رياضيات', 'A'), ('فيزياء', 'B')])
+        self.assertEqual(len(self.store.history(STUDENT_ID, 'رياضيات')), 3)
+
+    def test_password_change_updates_auth_key(self):
+        data = lookup(('رياضيات', 'B'))
+        for password in ('A', 'B', 'A'):
+            self.store.record(data, password)
+        self.assertTrue(self.store.authorized(STUDENT_ID, 'A'))
+        self.assertFalse(self.store.authorized(STUDENT_ID, 'B'))
+
+
+if __name__ == '__main__':
+    unittest.main()
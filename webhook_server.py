@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خادم HTTP لاستقبال تحديثات تلغرام عبر Webhook بدلاً من polling
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import signal
+
+from aiohttp import web
+from telegram import Update
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def derive_secret(token):
+    """
+    رمز سري ثابت مشتق من رمز البوت
+
+    نفسه في جميع النسخ التي تشغل نفس البوت (فلا تلغي نسخة رمز أخرى عند
+    set_webhook)، ولا يمكن معرفته بدون رمز البوت.
+    """
+    return hmac.new(token.encode('utf-8'), b'telegram-webhook-secret', hashlib.sha256).hexdigest()
+
+
+def create_web_app(application, secret_token, path="/telegram", ready_check=None):
+    """
+    إنشاء تطبيق aiohttp يستقبل التحديثات ويوفر نقاط فحص الحالة و /metrics
+
+    Args:
+        application: تطبيق python-telegram-bot
+        secret_token: الرمز السري الذي يرسله تلغرام في الترويسة (إلزامي)
+        path: مسار استقبال التحديثات
+        ready_check: دالة تعيد True عندما يكون البوت جاهزاً لاستقبال الطلبات
+
+    Returns:
+        web.Application: تطبيق الويب
+
+    Raises:
+        ValueError: إذا لم يُحدد الرمز السري (أي طلب POST سيُقبل كتحديث من تلغرام)
+    """
+    if not secret_token:
+        raise ValueError("خادم Webhook يتطلب رمزاً سرياً")
+
+    async def telegram_update(request):
+        # رفض أي طلب لا يحمل الرمز السري الصحيح
+        # مقارنة bytes: compare_digest يرفض النصوص غير ASCII بخطأ TypeError
+        received = request.headers.get(SECRET_HEADER, '').encode('utf-8', 'replace')
+        if not hmac.compare_digest(received, secret_token.encode('utf-8')):
+            return web.Response(status=403)
+
+        try:
+            payload = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        update = Update.de_json(payload, application.bot)
+        await application.update_queue.put(update)
+        return web.Response()
+
+    async def healthz(request):
+        return web.Response(text="ok")
+
+    async def readyz(request):
+        ready = application.running and (ready_check is None or ready_check())
+        return web.Response(status=200 if ready else 503, text="ready" if ready else "not ready")
+
+    app = web.Application()
+    app.router.add_post(path, telegram_update)
+    app.router.add_get('/healthz', healthz)
+    app.router.add_get('/readyz', readyz)
+    app.router.add_get('/metrics', metrics.metrics_handler)
+    return app
+
+
+async def run_webhook(application, webhook_url, port=8080, path="/telegram",
+                      secret_token=None, allowed_updates=None, ready_check=None,
+                      post_init=None, post_shutdown=None):
+    """
+    تشغيل البوت في وضع Webhook حتى استقبال إشارة الإيقاف
+
+    Args:
+        application: تطبيق python-telegram-bot
+        webhook_url: الرابط العام للخادم (بدون المسار)
+        port: المنفذ المحلي للاستماع
+        path: مسار استقبال التحديثات
+        secret_token: الرمز السري للتحقق من أن الطلب من تلغرام (إذا لم يُحدد
+            يُشتق من رمز البوت، فيتطابق في جميع النسخ)
+        allowed_updates: أنواع التحديثات المطلوبة من تلغرام
+        ready_check: دالة فحص الجاهزية لنقطة /readyz
+        post_init: دالة async تُستدعى بعد تهيئة التطبيق
+        post_shutdown: دالة async تُستدعى بعد إيقاف التطبيق
+    """
+    if not secret_token:
+        # بدون رمز يستطيع أي شخص يعرف الرابط إرسال تحديثات مزيفة
+        secret_token = derive_secret(application.bot.token)
+        logger.info("لم يتم تحديد WEBHOOK_SECRET، استخدام رمز مشتق من رمز البوت")
+    web_app = create_web_app(application, secret_token, path, ready_check)
+    runner = web.AppRunner(web_app)
+
+    await application.initialize()
+    if post_init:
+        await post_init(application)
+
+    await runner.setup()
+    site = web.TCPSite(runner, '0.0.0.0', port)
+    await site.start()
+    logger.info(f"خادم Webhook يستمع على المنفذ {port}")
+
+    await application.bot.set_webhook(
+        url=f"{webhook_url.rstrip('/')}{path}",
+        secret_token=secret_token,
+        allowed_updates=allowed_updates,
+    )
+    await application.start()
+
+    # الانتظار حتى إشارة الإيقاف
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    await stop.wait()
+
+    logger.info("إيقاف خادم Webhook...")
+    await application.stop()
+    await runner.cleanup()
+    await application.shutdown()
+    if post_shutdown:
+        await post_shutdown(application)